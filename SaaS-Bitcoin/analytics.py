@@ -0,0 +1,174 @@
+"""Cálculos do dashboard, separados da renderização do Streamlit.
+
+As funções recebem Series/arrays (ou DataFrames) e devolvem resultados, sem
+tocar em estado global nem em widgets. Todas aceitam o argumento nomeado
+'version': quando informado, o resultado é memorizado por essa versão (por
+exemplo, a watermark das tabelas de entrada) e reaproveitado enquanto os dados
+não mudarem.
+"""
+import functools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# Resultados memorizados por função
+MEMO_SIZE = 64
+
+
+def memoize_by_version(fn):
+    """Memoriza 'fn' pela versão dos dados em vez de pelo conteúdo dos argumentos.
+
+    A chamada com version=None apenas executa a função. Com uma versão, os
+    argumentos posicionais (DataFrames, arrays) não entram na chave: a versão
+    deve identificá-los por completo. Argumentos nomeados entram na chave.
+    """
+    cache = OrderedDict()
+    lock = threading.Lock()
+
+    @functools.wraps(fn)
+    def wrapper(*args, version=None, **kwargs):
+        if version is None:
+            return fn(*args, **kwargs)
+        key = (version, tuple(sorted(kwargs.items())))
+        with lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        result = fn(*args, **kwargs)
+        with lock:
+            cache[key] = result
+            while len(cache) > MEMO_SIZE:
+                cache.popitem(last=False)
+        return result
+
+    wrapper.cache_clear = cache.clear
+    return wrapper
+
+
+def _values(values) -> np.ndarray:
+    """Converte uma Series/lista para float64 (valores inválidos viram NaN)."""
+    if isinstance(values, pd.Series):
+        return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+    return np.asarray(values, dtype=np.float64)
+
+
+@memoize_by_version
+def last_change(values):
+    """Último valor, o anterior e a variação entre eles (absoluta e relativa).
+
+    Retorna None com menos de dois pontos. 'pct' é a fração (0.01 = 1%).
+    """
+    values = _values(values)
+    if len(values) < 2:
+        return None
+    latest, previous = values[-1], values[-2]
+    pct = (latest - previous) / previous if previous != 0 else np.nan
+    return {"latest": latest, "previous": previous, "delta": latest - previous, "pct": pct}
+
+
+@memoize_by_version
+def pct_change(values) -> np.ndarray:
+    """Variação percentual entre pontos consecutivos (o primeiro é NaN), em %."""
+    values = _values(values)
+    out = np.full(len(values), np.nan)
+    if len(values) > 1:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[1:] = (values[1:] - values[:-1]) / values[:-1] * 100
+    return out
+
+
+@memoize_by_version
+def correlation(x, y) -> float:
+    """Correlação de Pearson usando só os pares com os dois valores válidos."""
+    x, y = _values(x), _values(y)
+    valid = np.isfinite(x) & np.isfinite(y)
+    x, y = x[valid], y[valid]
+    if len(x) < 2:
+        return np.nan
+    x = x - x.mean()
+    y = y - y.mean()
+    denominator = np.sqrt((x * x).sum() * (y * y).sum())
+    return float((x * y).sum() / denominator) if denominator else np.nan
+
+
+@memoize_by_version
+def daily_return_correlation(a, b):
+    """Variações diárias (%) de duas séries e a correlação entre elas."""
+    var_a, var_b = pct_change(a), pct_change(b)
+    return var_a, var_b, correlation(var_a, var_b)
+
+
+@memoize_by_version
+def high_low(values):
+    """Maior e menor valor do período e a distância (%) de cada um ao primeiro valor."""
+    values = _values(values)
+    if len(values) == 0 or np.isnan(values).all():
+        return None
+    high, low, first = np.nanmax(values), np.nanmin(values), values[0]
+    return {
+        "high": high,
+        "low": low,
+        "first": first,
+        "delta_high": (high - first) / first * 100,
+        "delta_low": (low - first) / first * 100,
+    }
+
+
+# Pares válidos mínimos para a correlação de uma defasagem (menos que isso vira NaN)
+LAG_MIN_PAIRS = 20
+
+
+def _cross_sums(a: np.ndarray, b: np.ndarray, max_lag: int) -> np.ndarray:
+    """sum_t a[t] · b[t + k] para k de -max_lag a +max_lag, por FFT (colunas de 'b' em lote)."""
+    n = len(a)
+    # Tamanho sem sobreposição circular entre as defasagens positivas e negativas
+    size = 1 << max(2 * n - 1, 1).bit_length()
+    full = np.fft.irfft(np.conj(np.fft.rfft(a, size))[:, None] * np.fft.rfft(b, size, axis=0), size, axis=0)
+    return full[np.arange(-max_lag, max_lag + 1) % size]
+
+
+@memoize_by_version
+def lagged_correlation(x, y, max_lag: int):
+    """Correlação de Pearson entre x[t] e y[t + k] para cada defasagem k em [-max_lag, max_lag].
+
+    k > 0 mede quanto 'x' antecipa 'y' em k períodos. 'y' pode ter várias
+    colunas (uma curva por coluna). Como correlation(), cada defasagem usa só
+    os pares com os dois valores válidos; as seis somas de todas as defasagens
+    (pares, Σx, Σy, Σx², Σy², Σxy) são correlações cruzadas calculadas por
+    FFT, em O(n log n) no lugar de um corr() por defasagem. Devolve as
+    defasagens e a matriz (defasagens × colunas), ou um vetor se 'y' for 1-D.
+    """
+    x = _values(x)
+    y = np.asarray(y, dtype=np.float64)
+    column = y.ndim == 1
+    y = y[:, None] if column else y
+    max_lag = max(min(int(max_lag), len(x) - 1), 0)
+    lags = np.arange(-max_lag, max_lag + 1)
+    if len(x) == 0 or y.shape[1] == 0:
+        out = np.full((len(lags), y.shape[1]), np.nan)
+        return lags, out[:, 0] if column else out
+    valid_x, valid_y = np.isfinite(x), np.isfinite(y)
+    # Centralizar antes das somas evita cancelamento numérico
+    x = np.where(valid_x, x - (np.nanmean(x) if valid_x.any() else 0.0), 0.0)
+    with np.errstate(invalid="ignore"):
+        means = np.where(valid_y.any(axis=0), np.nanmean(np.where(valid_y, y, np.nan), axis=0), 0.0)
+    y = np.where(valid_y, y - means, 0.0)
+    mask_x, mask_y = valid_x.astype(np.float64), valid_y.astype(np.float64)
+    pairs = np.rint(_cross_sums(mask_x, mask_y, max_lag))
+    sum_x = _cross_sums(x, mask_y, max_lag)
+    sum_y = _cross_sums(mask_x, y, max_lag)
+    sum_xx = _cross_sums(x * x, mask_y, max_lag)
+    sum_yy = _cross_sums(mask_x, y * y, max_lag)
+    sum_xy = _cross_sums(x, y, max_lag)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var_x = pairs * sum_xx - sum_x * sum_x
+        var_y = pairs * sum_yy - sum_y * sum_y
+        corr = (pairs * sum_xy - sum_x * sum_y) / np.sqrt(var_x * var_y)
+    # Variância nula (ou só ruído da FFT) e defasagens com poucos pares não têm correlação
+    flat = (var_x <= 1e-10 * pairs * np.abs(sum_xx)) | (var_y <= 1e-10 * pairs * np.abs(sum_yy))
+    corr[(pairs < LAG_MIN_PAIRS) | flat | ~np.isfinite(corr)] = np.nan
+    corr = np.clip(corr, -1.0, 1.0)
+    return lags, corr[:, 0] if column else corr
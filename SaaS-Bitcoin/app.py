@@ -1,9 +1,33 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from supabase import create_client, Client
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 from datetime import datetime, timedelta, timezone 
+import html
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import analytics
+import asset_matrix
+import data_sync
+import event_study
+import indicators
+import local_store
+import local_supabase
+import news_index
+import perf
+import pg_backend
+import rollups
+import shared_cache
+import weekly_report
+from downsampling import downsample
 
 
 # --- CONFIGURAÇÃO INICIAL E ESTILO ---
@@ -81,11 +105,39 @@ html {
 
 
 
+# --- Conexão direta ao PostgreSQL (opcional, [database] backend = "postgres") ---
+@st.cache_resource
+def get_postgres_client(dsn: str, pool_size: int):
+    """Pool de conexões compartilhado por todas as sessões."""
+    return pg_backend.connect(dsn, pool_size=pool_size)
+
+
+# --- Base sintética local (opcional, SAAS_BTC_LOCAL_ROWS=<linhas>) ---
+@st.cache_resource
+def get_local_client(rows: int, seed: int):
+    """Cliente local compartilhado por todas as sessões e reexecuções.
+
+    Mantém as tabelas já geradas e o mesmo instante final: um cliente novo a
+    cada execução regeraria as tabelas e deslocaria os dados sob a watermark
+    da sincronização.
+    """
+    return local_supabase.LocalClient(rows=rows, seed=seed)
+
+
 # --- Carregando dados do toml
 try:
-    url = st.secrets["supabase"]["url"]
-    key = st.secrets["supabase"]["key"]
-    supabase: Client = create_client(url, key)
+    # Base sintética local para testes de carga
+    local_settings = local_supabase.env_settings()
+    supabase = get_local_client(*local_settings) if local_settings else None
+    database = st.secrets.get("database", {}) if supabase is None else {}
+    if database.get("backend") == "postgres":
+        supabase = get_postgres_client(
+            database["dsn"], int(database.get("pool_size", pg_backend.DEFAULT_POOL_SIZE))
+        )
+    elif supabase is None:
+        url = st.secrets["supabase"]["url"]
+        key = st.secrets["supabase"]["key"]
+        supabase: Client = create_client(url, key)
 except Exception as e:
     st.error("Erro: Não foi possível carregar as credenciais do Supabase. Verifique se o arquivo .streamlit/secrets.toml está correto.")
     st.stop()
@@ -116,30 +168,379 @@ st.markdown("""
 
 
 
+# --- Base local alimentada pelo ingest_worker.py (opcional) ---
+def get_store_path():
+    """Caminho da base local (SAAS_BTC_STORE ou [store] path no secrets.toml), se configurada."""
+    path = os.environ.get("SAAS_BTC_STORE")
+    if path:
+        return path
+    try:
+        return st.secrets.get("store", {}).get("path")
+    except Exception:  # sem secrets.toml
+        return None
+
+
+STORE_PATH = get_store_path()
+
+
+# --- Cache compartilhado entre réplicas (opcional, ver shared_cache) ---
+def get_shared_cache():
+    """Cache compartilhado (SAAS_BTC_SHARED_CACHE ou [shared_cache] no secrets.toml), se configurado."""
+    try:
+        config = st.secrets.get("shared_cache", {})
+    except Exception:  # sem secrets.toml
+        config = {}
+    return shared_cache.from_config(config.get("path"), ttl=float(config.get("ttl", shared_cache.DEFAULT_TTL)))
+
+
+SHARED_CACHE = get_shared_cache()
+
+
+def shared(parts: tuple, load):
+    """Resultado de 'load()' pelo cache compartilhado: uma réplica carrega, as demais leem."""
+    return SHARED_CACHE.get_or_load(parts, load) if SHARED_CACHE else load()
+
+# Colunas efetivamente usadas pelo dashboard em cada tabela (select projetado)
+TABLE_COLUMNS = data_sync.TABLE_COLUMNS
+
+
+# Orçamento de pontos por série de cada gráfico de linha (LTTB antes de plotar)
+CHART_POINTS = {
+    "tendencia_diaria": 1000,
+    "preco": 1500,
+    "indicadores": 1500,
+    "volume": 1000,
+    "market_cap": 1000,
+    "dominancia": 1000,
+    "sentimento": 1000,
+    "altcoins": 600,
+    "tradicionais": 600,
+}
+
+# Intervalo (segundos) entre consultas dos cartões no modo ao vivo
+LIVE_REFRESH_SECONDS = 15
+# Maior defasagem (dias) da análise de lead/lag da Aba 2
+LEAD_LAG_DAYS = 90
+
+
 @st.cache_data(ttl=600) # Cachea os dados por 10 minutos
-def load_data_api(table_name: str) -> pd.DataFrame:
-    """Busca dados da tabela especificada no Supabase e retorna um DataFrame."""
+def load_data_api(table_name: str, start=None, end=None, columns=None) -> pd.DataFrame:
+    """Busca dados da tabela especificada no Supabase e retorna um DataFrame.
+
+    A carga é incremental: a primeira chamada baixa a janela pedida e, a cada
+    expiração do cache, apenas as linhas posteriores ao último timestamp visto são
+    pedidas ao Supabase e anexadas ao histórico já em memória (ver data_sync).
+    A janela (start, end) vira filtros gte/lte na consulta e apenas as colunas
+    de TABLE_COLUMNS são selecionadas; passe a janela já normalizada
+    (data_sync.normalize_window) para que a chave do cache seja estável.
+    """
+    columns = columns or TABLE_COLUMNS.get(table_name)
+    perf.annotate(cache="miss")
+    def load():
+        if STORE_PATH:
+            # Base local mantida pelo worker: nenhuma consulta ao Supabase nesta sessão
+            return local_store.load(STORE_PATH, table_name, columns, start, end)
+        return data_sync.sync_table(supabase, table_name, start=start, end=end, columns=columns)
     try:
-        # A função 'select' é uma string vazia para selecionar todas as colunas
-        response = supabase.table(table_name).select("*").execute()
-        # O data está no índice [1] da resposta
-        data = response.data
-        # Converte para DataFrame do Pandas
-        df = pd.DataFrame(data)
-        # Converte a coluna 'timestamp' para datetime E GARANTE O FUSO HORÁRIO
-        if 'timestamp' in df.columns:
-            # 1. Converte o timestamp para objeto datetime
-            df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce') 
-            # 2. SE o Pandas ainda não souber o fuso horário (tz is None), 
-            #    ele é forçado a ser UTC para combinar com as datas do filtro.
-            if df['timestamp'].dt.tz is None:
-                df['timestamp'] = df['timestamp'].dt.tz_localize('UTC')
-        return df
+        # A chave inclui o esquema da tabela: mudar os tipos declarados invalida as entradas
+        return shared(("load_data_api", table_name, start, end, tuple(columns), data_sync.SCHEMAS.get(table_name)), load)
     except Exception as e:
         st.error(f"Erro ao carregar dados da tabela '{table_name}': {e}")
         return pd.DataFrame()
 
 
+@st.cache_data(ttl=600)
+def load_rollup(table_name: str, resolution: str, start=None, end=None) -> pd.DataFrame:
+    """Agregado OHLC da janela já normalizada: SQL na base local ou o agregado de data_sync."""
+    def load():
+        if STORE_PATH:
+            return local_store.aggregate(STORE_PATH, table_name, resolution, start, end, TABLE_COLUMNS[table_name])
+        aggregate = data_sync.rollup(table_name, resolution, start, end, TABLE_COLUMNS[table_name])
+        if aggregate.empty:
+            # Tabela lida do cache compartilhado (não sincronizada neste processo): agrega a janela
+            aggregate = rollups.build(load_data_api(table_name, start, end), resolution)
+        return aggregate
+    return shared(("load_rollup", table_name, resolution, start, end), load)
+
+
+# --- FUNÇÃO DE BUSCA E CACHE PARA ATIVOS TRADICIONAIS ---
+@st.cache_data(ttl=600)
+def fetch_traditional_assets(_supabase_conn): 
+    perf.annotate(cache="miss")
+    if not _supabase_conn:
+        st.error("Conexão com Supabase indisponível.")
+        return pd.DataFrame()
+    return shared(
+        ("fetch_traditional_assets", data_sync.SCHEMAS["traditional_assets_prices"]),
+        lambda: load_traditional_assets(_supabase_conn)
+    )
+
+
+def load_traditional_assets(_supabase_conn) -> pd.DataFrame:
+    """Busca e limpa a tabela de ativos tradicionais (sem cache)."""
+    def prepare_page(df):
+        # Limpeza e Preparação dos dados (aplicada a cada página buscada)
+        if df.empty:
+            return pd.DataFrame({'timestamp': [], 'symbol': [], 'price_usd': []})
+        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce').dt.normalize()
+        df['price_usd'] = pd.to_numeric(df['price_usd'], errors='coerce')
+        # CORREÇÃO CRÍTICA: Limpa o símbolo para garantir que 'XAUUSD' seja reconhecido
+        df['symbol'] = df['symbol'].astype(str).str.strip() 
+        df.dropna(subset=['timestamp', 'price_usd', 'symbol'], inplace=True) 
+        return df[['timestamp', 'symbol', 'price_usd']]
+    def finish(df):
+        # Tipos declarados (data_sync.SCHEMAS) e a ordem exigida pelo recorte binário
+        df = data_sync.apply_schema(df, "traditional_assets_prices").rename(columns={'price_usd': 'price'})
+        return df.sort_values('timestamp', kind='stable', ignore_index=True)
+    if STORE_PATH:
+        return finish(prepare_page(local_store.load(STORE_PATH, "traditional_assets_prices", ["timestamp", "symbol", "price_usd"])))
+    if hasattr(_supabase_conn, "fetch_frame"):
+        # Conexão direta ao Postgres: uma única consulta via COPY
+        with perf.span("postgres traditional_assets_prices", "fetch", table="traditional_assets_prices"):
+            df = prepare_page(_supabase_conn.fetch_frame(
+                "traditional_assets_prices", ["timestamp", "symbol", "price_usd"], "timestamp"
+            ))
+        return finish(df)
+    # Busca paginada e paralela (evita o corte no limite de linhas do PostgREST)
+    with perf.span("supabase traditional_assets_prices", "fetch", table="traditional_assets_prices"):
+        df = data_sync.fetch_paginated(
+            lambda count=None: _supabase_conn.table("traditional_assets_prices")
+            .select("timestamp, symbol, price_usd", count=count)
+            .order("timestamp"),
+            convert=prepare_page
+        )
+    return finish(df)
+
+
+class DashboardData:
+    """Tabelas do dashboard carregadas sob demanda, uma única vez por execução do script.
+
+    Nada é buscado na construção: prefetch() carrega em paralelo as tabelas da
+    aba aberta e cada recorte (atributo) é calculado no primeiro acesso, a
+    partir das tabelas que usa. Abas fechadas não buscam nem transformam nada.
+    Os recortes são compartilhados entre as abas: use-os apenas para leitura.
+    """
+
+    def __init__(self, start, end, window_start, window_end):
+        self.start = start
+        self.end = end
+        self.window_start = window_start
+        self.window_end = window_end
+        # Agregados OHLC: resolução mais grossa que ainda dá pontos suficientes no período
+        self.resolution = rollups.pick_resolution(start, end)
+        self.raw = {}
+        # Versão de cada tabela carregada (linhas e último timestamp): chave do cache de figuras
+        self.versions = {}
+        self._lock = threading.Lock()
+
+    def _loader(self, name):
+        if name == "news_events":
+            return lambda: load_data_api("news_events")
+        if name == "traditional_assets_prices":
+            return lambda: fetch_traditional_assets(supabase)
+        return lambda: load_data_api(name, self.window_start, self.window_end)
+
+    def prefetch(self, *tables) -> None:
+        """Carrega em paralelo as tabelas pedidas que ainda não foram carregadas."""
+        missing = [name for name in dict.fromkeys(tables) if name not in self.raw]
+        if not missing:
+            return
+        # Threads herdam o contexto do script (st.cache_data/st.error) e o rastro de perf
+        ctx = get_script_run_ctx()
+        trace_state = perf.current()
+        def run(name):
+            add_script_run_ctx(threading.current_thread(), ctx)
+            perf.attach(trace_state)
+            # Acerto do st.cache_data, a menos que a função carregadora anote "miss"
+            with perf.span(f"carregar {name}", "load", table=name, cache="hit") as args:
+                df = self._loader(name)()
+                args["rows"] = len(df)
+                return df
+        with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+            futures = {name: pool.submit(run, name) for name in missing}
+            loaded = {name: future.result() for name, future in futures.items()}
+        with self._lock:
+            for name, df in loaded.items():
+                self.raw.setdefault(name, df)
+                self.versions.setdefault(name, self._version(df))
+        # Linhas lidas contadas uma vez, na carga (ver perf.touch)
+        perf.touch(sum(len(df) for df in loaded.values()))
+
+    def table(self, name) -> pd.DataFrame:
+        """Tabela inteira como carregada (buscada agora se a aba não a pediu antes)."""
+        if name not in self.raw:
+            self.prefetch(name)
+        return self.raw[name]
+
+    # --- Recortes e conversões, calculados no primeiro acesso ---
+    @cached_property
+    def prices(self):
+        return self._window(self.table("prices_btc"))
+
+    @cached_property
+    def market(self):
+        return self._window(self.table("market_global"))
+
+    @cached_property
+    def sentiment(self):
+        return self._window(self.table("sentiment"))
+
+    @cached_property
+    def altcoins(self):
+        return self._window(self.table("altcoin_prices"))
+
+    @cached_property
+    def prices_rollup(self):
+        return self._rollup("prices_btc", self.resolution)
+
+    @cached_property
+    def prices_rollup_anchored(self):
+        """Agregado do BTC desde o início normalizado da janela: semente estável dos indicadores."""
+        return self._rollup("prices_btc", self.resolution, self.window_start)
+
+    @cached_property
+    def market_rollup(self):
+        return self._rollup("market_global", self.resolution)
+
+    @cached_property
+    def prices_by_day(self):
+        return self._rollup("prices_btc", "1D")
+
+    @cached_property
+    def market_by_day(self):
+        return self._rollup("market_global", "1D")
+
+    @cached_property
+    def news(self):
+        """Notícias mais recentes primeiro (data já convertida na carga, ver data_sync.SCHEMAS)."""
+        df_news = self.table("news_events")
+        if not df_news.empty:
+            with perf.span("transformar news_events", "transform"):
+                df_news = df_news.sort_values("date", ascending=False, ignore_index=True)
+        return df_news
+
+    @cached_property
+    def prices_daily(self):
+        """Preços da Aba 5: dias inteiros do período e timestamps sem fuso."""
+        # Recorta primeiro (busca binária) e só então converte, para não copiar o histórico inteiro
+        first_day = pd.Timestamp(self.start).ceil('D') if self.start is not None else None
+        prices_daily = self._window(self.table("prices_btc"), first_day)
+        if prices_daily.empty:
+            return pd.DataFrame({'timestamp': [], 'price_usd': []})
+        with perf.span("transformar prices_daily", "transform"):
+            return pd.DataFrame({
+                'timestamp': prices_daily['timestamp'].dt.normalize().dt.tz_localize(None),
+                'price_usd': pd.to_numeric(prices_daily['price_usd'], errors='coerce'),
+            }).dropna(subset=['timestamp', 'price_usd'])
+
+    @cached_property
+    def altcoins_naive(self):
+        altcoins_naive = self.altcoins
+        if not altcoins_naive.empty:
+            altcoins_naive = altcoins_naive.assign(timestamp=altcoins_naive['timestamp'].dt.tz_localize(None))
+        return altcoins_naive
+
+    @cached_property
+    def traditional(self):
+        traditional = self.table("traditional_assets_prices")
+        if not traditional.empty and traditional['timestamp'].dt.tz is not None:
+            traditional = self._window(traditional)
+            traditional = traditional.assign(timestamp=traditional['timestamp'].dt.tz_localize(None))
+        elif self.start is not None:
+            traditional = self._window(traditional, pd.Timestamp(self.start).tz_localize(None),
+                                       pd.Timestamp(self.end).tz_localize(None))
+        return traditional
+
+    @cached_property
+    def assets(self):
+        """Matriz diária alinhada (datas × ativos) dos comparativos da Aba 5.
+
+        Refeita só quando alguma das três tabelas ou a janela muda.
+        """
+        self.prefetch('prices_btc', 'altcoin_prices', 'traditional_assets_prices')
+        return asset_matrix.comparison_matrix(
+            self.prices_daily, self.altcoins_naive, self.traditional,
+            version=self.version('prices_btc', 'altcoin_prices', 'traditional_assets_prices')
+        )
+
+    @staticmethod
+    def _version(df):
+        """Identifica o conteúdo da tabela sem percorrê-la: nº de linhas e watermark."""
+        if df.empty:
+            return (0, None)
+        time_column = 'timestamp' if 'timestamp' in df.columns else df.columns[0]
+        return (len(df), str(df[time_column].iloc[-1]))
+
+    def version(self, *tables):
+        """Versão dos dados de entrada: tabelas usadas e janela normalizada."""
+        self.prefetch(*tables)
+        return (tuple(self.versions.get(t) for t in tables), self.window_start, self.window_end)
+
+    def _rollup(self, table_name, resolution, start=None):
+        """Agregado OHLC da tabela no período selecionado (a partir de 'start', se informado)."""
+        start = self.start if start is None else start
+        if STORE_PATH or SHARED_CACHE:
+            aggregate = load_rollup(table_name, resolution, self.window_start, self.window_end)
+            if not aggregate.empty and start is not None:
+                aggregate = aggregate.loc[pd.Timestamp(start).floor(resolution):self.end]
+        else:
+            # O agregado de data_sync é mantido pela sincronização da própria tabela
+            self.table(table_name)
+            aggregate = data_sync.rollup(table_name, resolution, start, self.end, TABLE_COLUMNS[table_name])
+        perf.touch(len(aggregate))
+        return aggregate
+
+    def _window(self, df, start=None, end=None):
+        """Recorta o DataFrame pelo período selecionado (busca binária em 'timestamp')."""
+        start = self.start if start is None else start
+        end = self.end if end is None else end
+        if start is not None:
+            df = data_sync.time_slice(df, start, end)
+        # Recortes são calculados uma vez por execução (cached_property): cada um conta uma vez
+        perf.touch(len(df))
+        return df
+
+
+# --- CACHE DE FIGURAS PLOTLY ---
+# Máximo de figuras mantidas (as mais antigas são descartadas primeiro)
+FIGURE_CACHE_SIZE = 256
+
+
+@st.cache_resource
+def _figure_cache() -> dict:
+    """Figuras já construídas, compartilhadas entre execuções e sessões."""
+    return {"figures": OrderedDict(), "lock": threading.Lock()}
+
+
+def figure_key(chart_id: str, tables) -> tuple:
+    """Chave de um gráfico: id, versão das tabelas usadas e período selecionado."""
+    return (chart_id, data.version(*tables), selected_period)
+
+
+def cached_figure(chart_id: str, tables, build):
+    """Retorna a figura do gráfico, chamando 'build' só quando os dados ou o período mudam.
+
+    A chave combina o id do gráfico, a versão (watermark) das tabelas usadas e o
+    período selecionado; num acerto a figura Plotly já validada é reutilizada e
+    nenhuma transformação ou construção de gráfico é refeita.
+    """
+    key = figure_key(chart_id, tables)
+    cache = _figure_cache()
+    with perf.span(f"figura {chart_id}", "figure", cache="hit"):
+        with cache["lock"]:
+            fig = cache["figures"].get(key)
+            if fig is not None:
+                cache["figures"].move_to_end(key)
+                return fig
+        perf.annotate(cache="miss")
+        fig = build()
+        with cache["lock"]:
+            cache["figures"][key] = fig
+            while len(cache["figures"]) > FIGURE_CACHE_SIZE:
+                cache["figures"].popitem(last=False)
+        return fig
+
+
 # --- FUNÇÃO PARA CARREGAR DADOS E FILTRO LATERAL ---
 DATE_OPTIONS = {
     "Últimas 24 Horas": 1,
@@ -173,500 +574,692 @@ else:
         start_date = end_date - timedelta(days=days)
     else:
         start_date = None
+# Janela enviada ao Supabase (início na hora cheia, fim aberto se for "agora")
+window_start, window_end = data_sync.normalize_window(start_date, end_date)
+# Diagnóstico: spans de busca, cache, transformações e figuras desta execução
+show_diagnostics = st.sidebar.toggle("🩺 Diagnóstico de desempenho", key="show_diagnostics")
+# Modo ao vivo: os cartões da Visão Geral se atualizam sozinhos, sem reexecutar o painel
+live_refresh = st.sidebar.toggle(
+    "⏱️ Cartões ao vivo", key="live_refresh",
+    help=f"Atualiza preço, capitalização e Fear & Greed a cada {LIVE_REFRESH_SECONDS} segundos."
+)
+# Relatório de desempenho desta execução (tempo e linhas lidas por aba)
+st.session_state["perf_report"] = perf.begin_run(trace=show_diagnostics)
+# Tabelas carregadas sob demanda: só as da aba aberta são buscadas (ver TAB_TABLES)
+data = DashboardData(start_date, end_date, window_start, window_end)
 
 
 
 
 # ----------------- ESTRUTURA DE ABAS (Baseada no Modelo BI) -----------------
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Visão Geral", 
-                                       "Preço e Tendências", 
-                                             "Adoção e Uso", 
-                                    "Sentimento e Notícias",
-                                             "Comparativos",
-                                        "Relatório Semanal"])
+# Tabelas usadas por cada aba, carregadas em paralelo quando ela é aberta
+TAB_TABLES = {
+    "Visão Geral": ("prices_btc", "market_global", "sentiment"),
+    "Preço e Tendências": ("prices_btc", "sentiment"),
+    "Adoção e Uso": ("prices_btc", "market_global", "sentiment"),
+    "Sentimento e Notícias": ("sentiment", "news_events", "prices_btc"),
+    "Comparativos": ("prices_btc", "market_global", "altcoin_prices", "traditional_assets_prices"),
+    "Relatório Semanal": ("prices_btc", "market_global", "sentiment", "news_events"),
+}
+# Com on_change="rerun" só a aba aberta executa (tab.open); trocar de aba reexecuta o
+# script, e o que ela já calculou antes vem dos caches de dados e de figuras
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(list(TAB_TABLES), key="active_tab", on_change="rerun")
+active_tab = next(label for label, tab in zip(TAB_TABLES, (tab1, tab2, tab3, tab4, tab5, tab6)) if tab.open)
+with perf.section("carga"):
+    data.prefetch(*TAB_TABLES[active_tab])
+
+
+
+# --- ATUALIZAÇÃO AO VIVO DOS CARTÕES ---
+def live_frame(table_name: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Dados dos cartões: no modo ao vivo, só as linhas mais novas da tabela (consulta mínima)."""
+    if not live_refresh:
+        return df
+    if STORE_PATH:
+        latest = local_store.latest_rows(STORE_PATH, table_name, TABLE_COLUMNS[table_name])
+    else:
+        latest = data_sync.latest_rows(supabase, table_name, TABLE_COLUMNS[table_name])
+    return latest if not latest.empty else df
+
 
+def kpi_version(table_name: str, column: str):
+    """Chave de memoização do KPI (nenhuma no modo ao vivo, em que os dados mudam a cada ciclo)."""
+    return None if live_refresh else (data.version(table_name), column)
 
 
 # ==============================================================================
 # ABA 1 - VISÃO GERAL
 # ==============================================================================
-with tab1:
-    # --- SEÇÃO A: PREÇOS ATUAIS (USD, BRL, CAPITALIZAÇÃO) ---
-    col_price_usd, col_price_brl, col_market_cap = st.columns([1.5, 1.5, 1.5])
-    df_prices = load_data_api("prices_btc")
-    if not df_prices.empty and start_date:
-        df_prices = df_prices[
-            (df_prices['timestamp'] >= start_date) & 
-            (df_prices['timestamp'] <= end_date)
-        ].reset_index(drop=True)
-    if not df_prices.empty and len(df_prices) >= 2:
-        latest_usd = df_prices['price_usd'].iloc[-1]
-        latest_brl = df_prices['price_brl'].iloc[-1]
-        previous_usd = df_prices['price_usd'].iloc[-2]
-        previous_brl = df_prices['price_brl'].iloc[-2]
-        change_usd = (latest_usd - previous_usd) / previous_usd
-        change_brl = (latest_brl - previous_brl) / previous_brl
-        delta_usd_str = f"{change_usd * 100:.2f} %"
-        delta_brl_str = f"{change_brl * 100:.2f} %"
-        has_data = True
-    else:
-        has_data = False
-        delta_usd_str = "N/A"
-        delta_brl_str = "N/A"
-    # --- Cartões de preço USD e BRL ---
-    with col_price_usd:
-        if has_data:
-            st.metric("PREÇO ATUAL (USD)", f"$ {latest_usd:,.2f}", delta_usd_str)
-        else:
-            st.warning("⚠️ Dados de preço não disponíveis.")
-    with col_price_brl:
-        if has_data:
-            # Mantém a formatação de BRL
-            st.metric(
-                "PREÇO ATUAL (BRL)",
-                f"R$ {latest_brl:,.2f}".replace(",", "_TEMP_").replace(".", ",").replace("_TEMP_", "."),
-                delta_brl_str
-            )
-    # --- Card de Capitalização de Mercado (AGORA PADRONIZADO COM st.metric) ---
-    df_market = load_data_api("market_global")
-    if not df_market.empty and start_date:
-        df_market = df_market[
-            (df_market['timestamp'] >= start_date) & 
-            (df_market['timestamp'] <= end_date)
-        ].reset_index(drop=True)
-    with col_market_cap:
-        if not df_market.empty and 'total_market_cap' in df_market.columns and len(df_market) >= 2:
-            latest_market_cap = df_market['total_market_cap'].iloc[-1]
-            previous_market_cap = df_market['total_market_cap'].iloc[-2]
-            # Cálculo e formatação do Delta
-            change_market_cap = (latest_market_cap - previous_market_cap) / previous_market_cap
-            delta_str = f"{change_market_cap * 100:,.2f}%"
-            # Formatação do Valor em Bilhões (B)
-            market_cap_billions = latest_market_cap / 1_000_000_000
-            value_str = f"${market_cap_billions:,.2f} B"
-            # USANDO st.metric para padronização
-            st.metric(
-                "CAPITALIZAÇÃO DE MERCADO",
-                value_str,
-                delta_str
-            )
-        else:
-            st.warning("⚠️ Dados de Capitalização de Mercado indisponíveis.")   
-    st.markdown("---")
-    # --- SEÇÃO B: KPI’s SECUNDÁRIOS (Gauge + Volume) ---
-    GRAPH_HEIGHT = 250
-    col_gauge, col_volume = st.columns([1.2, 1.8])
-    # Gauge (Fear & Greed)
-    df_sentiment = load_data_api("sentiment")
-    with col_gauge:
-        if not df_sentiment.empty and 'fear_greed_index' in df_sentiment.columns:
-            latest_score = df_sentiment['fear_greed_index'].iloc[-1]
-            latest_sentiment_text = df_sentiment['sentiment_text'].iloc[-1]
-            fig_gauge = go.Figure(go.Indicator(
-                mode="gauge+number",
-                value=latest_score,
-                title={
-                    'text': f"Índice Medo & Ganância<br><span style='font-size:0.9em; color:#FFFFFF;'>{latest_sentiment_text.upper()}</span>", 
-                    'font': {'size': 18, 'color': '#00BFFF'}
-                },
-                gauge={
-                    'axis': {'range': [0, 100], 'tickcolor': "#777"},
-                    'bar': {'color': "rgba(0,0,0,0)"},
-                    'steps': [
-                        {'range': [0, 25], 'color': "#8B0000"},
-                        {'range': [25, 50], 'color': "#CC0000"},
-                        {'range': [50, 75], 'color': "#009900"},
-                        {'range': [75, 100], 'color': "#006400"},
-                    ],
-                    'threshold': {'line': {'color': "#FFF", 'width': 4}, 'value': latest_score}
-                }
-            ))
-            fig_gauge.update_layout(paper_bgcolor="#2D2D2D", height=GRAPH_HEIGHT, font={'color': "white"})
-            st.plotly_chart(fig_gauge, use_container_width=True, config={'displayModeBar': False})
-        else:
-            st.warning("⚠️ Dados de Sentimento indisponíveis.")
-    # Volume de Negociação (Gráfico de Barras) 
-    with col_volume:
-        if not df_market.empty and 'total_volume' in df_market.columns:
-            # --- AGREGAÇÃO DIÁRIA DO VOLUME ---
-            df_volume = df_market[['timestamp', 'total_volume']].copy()
-            df_volume = df_volume.set_index('timestamp')
-            df_volume_diario = df_volume.resample('D')['total_volume'].sum().reset_index()
-            df_volume_diario = df_volume_diario[df_volume_diario['total_volume'] > 0]
-            # --- PLOTAGEM COM DADOS AGREGADOS E ESTILIZAÇÃO NEON ---
-            NEON_PURPLE = "#50C878"
-            fig_vol = go.Figure(data=[
-                go.Bar(
-                    x=df_volume_diario['timestamp'], 
-                    y=df_volume_diario['total_volume'], 
-                    # Cor roxo neon nas barras
-                    marker_color=NEON_PURPLE, 
-                    marker_line_color=NEON_PURPLE,
-                    marker_line_width=1.5,
-                    # Adiciona e posiciona o rótulo
-                    text=df_volume_diario['total_volume'],
-                    textposition='outside'
-                )
-            ])
-            # Configuração do formato e cor do rótulo (branco)
-            fig_vol.update_traces(
-                texttemplate='$%{text:.2s}', 
-                textfont=dict(color="white", size=11), 
-                textangle=0,
-                cliponaxis=False 
-            )
-            # Ajustes nos eixos
-            fig_vol.update_yaxes(
-                title_text="Volume (USD)",
-                tickformat=".2s", 
-                hoverformat="$,.2f",
-                title_standoff=0
-            )
-            # Ajusta o layout para centralizar o título e alinhar a altura com o Gauge
-            fig_vol.update_layout(
-                title=f"Volume de Negociação Diário ({selected_period})",
-                title_x=0.2, # Centraliza o título
-                title_font_color=NEON_PURPLE, 
-                paper_bgcolor="#2D2D2D",
-                plot_bgcolor="#2D2D2D",
-                font=dict(color="white"),
-                height=GRAPH_HEIGHT, # Alinha a altura com o Gauge
-                margin=dict(l=20, r=20, t=60, b=30), # Aumenta a margem superior para acomodar o rótulo
-                xaxis={'title': {'standoff': 15}, 'color': NEON_PURPLE}, 
-                yaxis={'color': NEON_PURPLE} 
-            )
-            st.plotly_chart(fig_vol, use_container_width=True, config={'displayModeBar': False})
-        else:
-            st.warning("⚠️ Dados de Volume não encontrados.")
+if tab1.open:
+    with tab1, perf.section("tab1"):
+        # --- SEÇÃO A: PREÇOS ATUAIS (USD, BRL, CAPITALIZAÇÃO) ---
+        @st.fragment(run_every=LIVE_REFRESH_SECONDS if live_refresh else None)
+        def price_cards():
+            """Cartões de preço e capitalização (reexecutados sozinhos no modo ao vivo)."""
+            col_price_usd, col_price_brl, col_market_cap = st.columns([1.5, 1.5, 1.5])
+            df_prices = live_frame('prices_btc', data.prices)
+            if not df_prices.empty and len(df_prices) >= 2:
+                kpi_usd = analytics.last_change(df_prices['price_usd'], version=kpi_version('prices_btc', 'price_usd'))
+                kpi_brl = analytics.last_change(df_prices['price_brl'], version=kpi_version('prices_btc', 'price_brl'))
+                latest_usd = kpi_usd["latest"]
+                latest_brl = kpi_brl["latest"]
+                delta_usd_str = f"{kpi_usd['pct'] * 100:.2f} %"
+                delta_brl_str = f"{kpi_brl['pct'] * 100:.2f} %"
+                has_data = True
+            else:
+                has_data = False
+                delta_usd_str = "N/A"
+                delta_brl_str = "N/A"
+            # --- Cartões de preço USD e BRL ---
+            with col_price_usd:
+                if has_data:
+                    st.metric("PREÇO ATUAL (USD)", f"$ {latest_usd:,.2f}", delta_usd_str)
+                else:
+                    st.warning("⚠️ Dados de preço não disponíveis.")
+            with col_price_brl:
+                if has_data:
+                    # Mantém a formatação de BRL
+                    st.metric(
+                        "PREÇO ATUAL (BRL)",
+                        f"R$ {latest_brl:,.2f}".replace(",", "_TEMP_").replace(".", ",").replace("_TEMP_", "."),
+                        delta_brl_str
+                    )
+            # --- Card de Capitalização de Mercado (AGORA PADRONIZADO COM st.metric) ---
+            df_market = live_frame('market_global', data.market)
+            with col_market_cap:
+                if not df_market.empty and 'total_market_cap' in df_market.columns and len(df_market) >= 2:
+                    kpi_market_cap = analytics.last_change(
+                        df_market['total_market_cap'], version=kpi_version('market_global', 'total_market_cap')
+                    )
+                    latest_market_cap = kpi_market_cap["latest"]
+                    # Formatação do Delta
+                    delta_str = f"{kpi_market_cap['pct'] * 100:,.2f}%"
+                    # Formatação do Valor em Bilhões (B)
+                    market_cap_billions = latest_market_cap / 1_000_000_000
+                    value_str = f"${market_cap_billions:,.2f} B"
+                    # USANDO st.metric para padronização
+                    st.metric(
+                        "CAPITALIZAÇÃO DE MERCADO",
+                        value_str,
+                        delta_str
+                    )
+                else:
+                    st.warning("⚠️ Dados de Capitalização de Mercado indisponíveis.")   
+        price_cards()
+        st.markdown("---")
+        # --- SEÇÃO B: KPI’s SECUNDÁRIOS (Gauge + Volume) ---
+        GRAPH_HEIGHT = 250
+        col_gauge, col_volume = st.columns([1.2, 1.8])
+        # Gauge (Fear & Greed)
+        with col_gauge:
+            @st.fragment(run_every=LIVE_REFRESH_SECONDS if live_refresh else None)
+            def sentiment_gauge():
+                df_sentiment = live_frame('sentiment', data.sentiment)
+                if not df_sentiment.empty and 'fear_greed_index' in df_sentiment.columns:
+                    latest_score = df_sentiment['fear_greed_index'].iloc[-1]
+                    latest_sentiment_text = df_sentiment['sentiment_text'].iloc[-1]
+                    def build_gauge():
+                        fig_gauge = go.Figure(go.Indicator(
+                            mode="gauge+number",
+                            value=latest_score,
+                            title={
+                                'text': f"Índice Medo & Ganância<br><span style='font-size:0.9em; color:#FFFFFF;'>{latest_sentiment_text.upper()}</span>", 
+                                'font': {'size': 18, 'color': '#00BFFF'}
+                            },
+                            gauge={
+                                'axis': {'range': [0, 100], 'tickcolor': "#777"},
+                                'bar': {'color': "rgba(0,0,0,0)"},
+                                'steps': [
+                                    {'range': [0, 25], 'color': "#8B0000"},
+                                    {'range': [25, 50], 'color': "#CC0000"},
+                                    {'range': [50, 75], 'color': "#009900"},
+                                    {'range': [75, 100], 'color': "#006400"},
+                                ],
+                                'threshold': {'line': {'color': "#FFF", 'width': 4}, 'value': latest_score}
+                            }
+                        ))
+                        fig_gauge.update_layout(paper_bgcolor="#2D2D2D", height=GRAPH_HEIGHT, font={'color': "white"})
+                        return fig_gauge
+                    # No modo ao vivo o valor muda sem mudar a versão da tabela: sem cache
+                    fig_gauge = build_gauge() if live_refresh else cached_figure("gauge", ['sentiment'], build_gauge)
+                    st.plotly_chart(fig_gauge, use_container_width=True, config={'displayModeBar': False})
+                else:
+                    st.warning("⚠️ Dados de Sentimento indisponíveis.")
+            sentiment_gauge()
+        # Volume de Negociação (Gráfico de Barras) 
+        df_market = data.market
+        with col_volume:
+            if not df_market.empty and 'total_volume' in df_market.columns:
+                def build_volume_diario():
+                    # --- AGREGAÇÃO DIÁRIA DO VOLUME (agregado diário já mantido) ---
+                    df_volume_diario = rollups.to_frame(data.market_by_day, "sum")[['timestamp', 'total_volume']]
+                    df_volume_diario = df_volume_diario[df_volume_diario['total_volume'] > 0]
+                    # --- PLOTAGEM COM DADOS AGREGADOS E ESTILIZAÇÃO NEON ---
+                    NEON_PURPLE = "#50C878"
+                    fig_vol = go.Figure(data=[
+                        go.Bar(
+                            x=df_volume_diario['timestamp'], 
+                            y=df_volume_diario['total_volume'], 
+                            # Cor roxo neon nas barras
+                            marker_color=NEON_PURPLE, 
+                            marker_line_color=NEON_PURPLE,
+                            marker_line_width=1.5,
+                            # Adiciona e posiciona o rótulo
+                            text=df_volume_diario['total_volume'],
+                            textposition='outside'
+                        )
+                    ])
+                    # Configuração do formato e cor do rótulo (branco)
+                    fig_vol.update_traces(
+                        texttemplate='$%{text:.2s}', 
+                        textfont=dict(color="white", size=11), 
+                        textangle=0,
+                        cliponaxis=False 
+                    )
+                    # Ajustes nos eixos
+                    fig_vol.update_yaxes(
+                        title_text="Volume (USD)",
+                        tickformat=".2s", 
+                        hoverformat="$,.2f",
+                        title_standoff=0
+                    )
+                    # Ajusta o layout para centralizar o título e alinhar a altura com o Gauge
+                    fig_vol.update_layout(
+                        title=f"Volume de Negociação Diário ({selected_period})",
+                        title_x=0.2, # Centraliza o título
+                        title_font_color=NEON_PURPLE, 
+                        paper_bgcolor="#2D2D2D",
+                        plot_bgcolor="#2D2D2D",
+                        font=dict(color="white"),
+                        height=GRAPH_HEIGHT, # Alinha a altura com o Gauge
+                        margin=dict(l=20, r=20, t=60, b=30), # Aumenta a margem superior para acomodar o rótulo
+                        xaxis={'title': {'standoff': 15}, 'color': NEON_PURPLE}, 
+                        yaxis={'color': NEON_PURPLE} 
+                    )
+                    return fig_vol
+                fig_vol = cached_figure("volume_diario", ['market_global'], build_volume_diario)
+                st.plotly_chart(fig_vol, use_container_width=True, config={'displayModeBar': False})
+            else:
+                st.warning("⚠️ Dados de Volume não encontrados.")
  
  
 # ==============================================================================
 # ABA 2 - PREÇO E TENDÊNCIAS
 # ==============================================================================
-with tab2:
-    st.markdown("<h2 style='text-align:center; color:white;'>📊 Preço e Tendências</h2>", unsafe_allow_html=True)
-    # --- Carrega dados ---
-    df_prices = load_data_api("prices_btc")
-    # --- Filtragem de acordo com o filtro lateral ---
-    if not df_prices.empty and start_date:
-        df_prices = df_prices[
-            (df_prices['timestamp'] >= start_date) & 
-            (df_prices['timestamp'] <= end_date)
-        ].reset_index(drop=True)
-    # --- Verifica se há dados ---
-    if df_prices.empty:
-        st.warning("⚠️ Nenhum dado de preço disponível para o período selecionado.")
-    else:
-        # SEÇÃO 1 - Correlação de Tendência (BTC/USD vs BTC/BRL)
-        st.markdown("### 🔍 Correlação de Tendência entre BTC/USD e BTC/BRL")
-        # Converter timestamps para data e calcular médias diárias
-        df_prices['date'] = pd.to_datetime(df_prices['timestamp']).dt.date
-        df_avg = df_prices.groupby('date', as_index=False)[['price_usd', 'price_brl']].mean()
-        # Calcular variação percentual diária
-        df_avg['var_usd'] = df_avg['price_usd'].pct_change() * 100
-        df_avg['var_brl'] = df_avg['price_brl'].pct_change() * 100
-        # Calcular correlação
-        corr_value = df_avg[['var_usd', 'var_brl']].corr().iloc[0, 1]
-        # Interpretação da correlação
-        if corr_value > 0.8:
-            corr_text = "🔒 Altamente correlacionado (movem-se quase juntos)"
-            corr_color = "#00FF7F"  # verde forte
-        elif corr_value > 0.5:
-            corr_text = "📈 Moderadamente correlacionado"
-            corr_color = "#ADFF2F"  # verde limão
-        elif corr_value > 0:
-            corr_text = "⚖️ Correlação fraca"
-            corr_color = "#FFD700"  # amarelo
+if tab2.open:
+    with tab2, perf.section("tab2"):
+        st.markdown("<h2 style='text-align:center; color:white;'>📊 Preço e Tendências</h2>", unsafe_allow_html=True)
+        # --- Dados já filtrados de acordo com o filtro lateral ---
+        df_prices = data.prices
+        # --- Verifica se há dados ---
+        if df_prices.empty:
+            st.warning("⚠️ Nenhum dado de preço disponível para o período selecionado.")
         else:
-            corr_text = "🔻 Correlação negativa (movem-se em sentidos opostos)"
-            corr_color = "#FF6347"  # vermelho claro
-        # Gráfico de linhas — variação percentual no período
-        fig_lines = go.Figure()
-        fig_lines.add_trace(go.Scatter(
-            x=df_avg['date'], y=df_avg['var_usd'], mode='lines',
-            name='BTC/USD', line=dict(color="#00BFFF", width=2)
-        ))
-        fig_lines.add_trace(go.Scatter(
-            x=df_avg['date'], y=df_avg['var_brl'], mode='lines',
-            name='BTC/BRL', line=dict(color="#39FF14", width=2)
-        ))
-        fig_lines.update_layout(
-            title=dict(text="Tendência Diária - Variação Percentual", font=dict(color="white"), x=0.5),
-            paper_bgcolor="#2D2D2D", plot_bgcolor="#2D2D2D",
-            font=dict(color="white"), height=300,
-            margin=dict(l=40, r=40, t=50, b=40),
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
-        )
-        st.plotly_chart(fig_lines, use_container_width=True, config={'displayModeBar': False})
-        # --- Heatmap pequeno, didático e simétrico ---
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            st.markdown(
-                "<h5 style='text-align:center; color:white;'>🧭 Correlação BTC/USD × BTC/BRL</h5>",
-                unsafe_allow_html=True
-            )
-            fig_heatmap = go.Figure(data=go.Heatmap(
-                z=[[corr_value]],
-                x=["BTC/USD"],
-                y=["BTC/BRL"],
-                colorscale=[[0, "#FF6347"], [0.5, "#FFD700"], [1, "#00FF7F"]],
-                zmin=-1, zmax=1,
-                showscale=True,
-                colorbar=dict(
-                    tickvals=[-1, 0, 1],
-                    ticktext=["-1 (oposto)", "0 (sem relação)", "+1 (juntos)"],
-                    title="Correlação"
-                ),
-                text=[[f"{corr_value:.2f}"]],
-                texttemplate="%{text}",
-                textfont={"color": "black", "size": 16}
-            ))
-            fig_heatmap.update_layout(
-                paper_bgcolor="#2D2D2D",
-                plot_bgcolor="#2D2D2D",
-                font=dict(color="white"),
-                xaxis=dict(showgrid=False, showticklabels=True),
-                yaxis=dict(showgrid=False, showticklabels=True),
-                height=260,
-                width=500,
-                margin=dict(l=60, r=60, t=40, b=20)
+            # SEÇÃO 1 - Correlação de Tendência (BTC/USD vs BTC/BRL)
+            st.markdown("### 🔍 Correlação de Tendência entre BTC/USD e BTC/BRL")
+            # Médias diárias a partir do agregado diário (usadas também na Seção 4)
+            df_avg = rollups.to_frame(data.prices_by_day, "mean", column="date")
+            # Variação percentual diária e correlação entre elas
+            var_usd, var_brl, corr_value = analytics.daily_return_correlation(
+                df_avg['price_usd'], df_avg['price_brl'], version=data.version('prices_btc')
             )
-            st.plotly_chart(fig_heatmap, use_container_width=False)
-            st.markdown(
-                f"<p style='text-align:center; color:{corr_color}; font-size:16px; font-weight:500;'>{corr_text}</p>",
-                unsafe_allow_html=True
+            df_avg['var_usd'] = var_usd
+            df_avg['var_brl'] = var_brl
+            # Interpretação da correlação
+            if corr_value > 0.8:
+                corr_text = "🔒 Altamente correlacionado (movem-se quase juntos)"
+                corr_color = "#00FF7F"  # verde forte
+            elif corr_value > 0.5:
+                corr_text = "📈 Moderadamente correlacionado"
+                corr_color = "#ADFF2F"  # verde limão
+            elif corr_value > 0:
+                corr_text = "⚖️ Correlação fraca"
+                corr_color = "#FFD700"  # amarelo
+            else:
+                corr_text = "🔻 Correlação negativa (movem-se em sentidos opostos)"
+                corr_color = "#FF6347"  # vermelho claro
+            def build_tendencia_diaria():
+                # Gráfico de linhas — variação percentual no período
+                df_avg_plot = downsample(df_avg, 'date', ['var_usd', 'var_brl'], CHART_POINTS["tendencia_diaria"])
+                fig_lines = go.Figure()
+                fig_lines.add_trace(go.Scatter(
+                    x=df_avg_plot['date'], y=df_avg_plot['var_usd'], mode='lines',
+                    name='BTC/USD', line=dict(color="#00BFFF", width=2)
+                ))
+                fig_lines.add_trace(go.Scatter(
+                    x=df_avg_plot['date'], y=df_avg_plot['var_brl'], mode='lines',
+                    name='BTC/BRL', line=dict(color="#39FF14", width=2)
+                ))
+                fig_lines.update_layout(
+                    title=dict(text="Tendência Diária - Variação Percentual", font=dict(color="white"), x=0.5),
+                    paper_bgcolor="#2D2D2D", plot_bgcolor="#2D2D2D",
+                    font=dict(color="white"), height=300,
+                    margin=dict(l=40, r=40, t=50, b=40),
+                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
+                )
+                return fig_lines
+            fig_lines = cached_figure("tendencia_diaria", ['prices_btc'], build_tendencia_diaria)
+            st.plotly_chart(fig_lines, use_container_width=True, config={'displayModeBar': False})
+            # --- Heatmap pequeno, didático e simétrico ---
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col2:
+                st.markdown(
+                    "<h5 style='text-align:center; color:white;'>🧭 Correlação BTC/USD × BTC/BRL</h5>",
+                    unsafe_allow_html=True
+                )
+                def build_correlacao():
+                    fig_heatmap = go.Figure(data=go.Heatmap(
+                        z=[[corr_value]],
+                        x=["BTC/USD"],
+                        y=["BTC/BRL"],
+                        colorscale=[[0, "#FF6347"], [0.5, "#FFD700"], [1, "#00FF7F"]],
+                        zmin=-1, zmax=1,
+                        showscale=True,
+                        colorbar=dict(
+                            tickvals=[-1, 0, 1],
+                            ticktext=["-1 (oposto)", "0 (sem relação)", "+1 (juntos)"],
+                            title="Correlação"
+                        ),
+                        text=[[f"{corr_value:.2f}"]],
+                        texttemplate="%{text}",
+                        textfont={"color": "black", "size": 16}
+                    ))
+                    fig_heatmap.update_layout(
+                        paper_bgcolor="#2D2D2D",
+                        plot_bgcolor="#2D2D2D",
+                        font=dict(color="white"),
+                        xaxis=dict(showgrid=False, showticklabels=True),
+                        yaxis=dict(showgrid=False, showticklabels=True),
+                        height=260,
+                        width=500,
+                        margin=dict(l=60, r=60, t=40, b=20)
+                    )
+                    return fig_heatmap
+                fig_heatmap = cached_figure("correlacao", ['prices_btc'], build_correlacao)
+                st.plotly_chart(fig_heatmap, use_container_width=False)
+                st.markdown(
+                    f"<p style='text-align:center; color:{corr_color}; font-size:16px; font-weight:500;'>{corr_text}</p>",
+                    unsafe_allow_html=True
+                )
+            st.markdown("---")
+            # SEÇÃO 2 - Gráfico principal (linha), na resolução escolhida para o período
+            def build_preco():
+                df_line = rollups.to_frame(data.prices_rollup)
+                df_line = downsample(df_line, 'timestamp', ['price_usd', 'price_brl'], CHART_POINTS["preco"])
+                fig_line = go.Figure()
+                fig_line.add_trace(go.Scatter(
+                    x=df_line['timestamp'],
+                    y=df_line['price_usd'],
+                    mode='lines+markers',
+                    name='BTC/USD',
+                    line=dict(color="#00BFFF", width=2),
+                    marker=dict(size=4)
+                ))
+                fig_line.add_trace(go.Scatter(
+                    x=df_line['timestamp'],
+                    y=df_line['price_brl'],
+                    mode='lines+markers',
+                    name='BTC/BRL',
+                    line=dict(color="#39FF14", width=2),
+                    marker=dict(size=4)
+                ))
+                fig_line.update_layout(
+                    title="Evolução do Preço (USD vs BRL)",
+                    paper_bgcolor="#2D2D2D",
+                    plot_bgcolor="#2D2D2D",
+                    font=dict(color="white"),
+                    height=400,
+                    margin=dict(l=40, r=40, t=60, b=40),
+                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
+                )
+                return fig_line
+            fig_line = cached_figure("preco", ['prices_btc'], build_preco)
+            st.plotly_chart(fig_line, use_container_width=True, config={'displayModeBar': False})
+            # SEÇÃO 2b - Indicadores técnicos (BTC/USD), mantidos de forma incremental (ver indicators)
+            st.markdown("### 📐 Indicadores Técnicos (BTC/USD)")
+            indicator_options = {
+                f"SMA {indicators.SMA_WINDOW}": ["sma"],
+                f"EMA {indicators.EMA_SPAN}": ["ema"],
+                f"Bollinger ({indicators.BOLLINGER_WINDOW}, {indicators.BOLLINGER_WIDTH:g}σ)": ["bb_upper", "bb_lower"],
+                f"RSI {indicators.RSI_WINDOW}": ["rsi"],
+                f"ATR {indicators.ATR_WINDOW}": ["atr"],
+                f"Volatilidade realizada ({indicators.VOLATILITY_WINDOW})": ["volatility"],
+            }
+            selected_indicators = st.multiselect(
+                "Indicadores:", options=list(indicator_options), default=list(indicator_options)[:1],
+                key="indicator_overlays"
             )
-        st.markdown("---")
-        # SEÇÃO 2 - Gráfico principal (linha)
-        fig_line = go.Figure()
-        fig_line.add_trace(go.Scatter(
-            x=df_prices['timestamp'],
-            y=df_prices['price_usd'],
-            mode='lines+markers',
-            name='BTC/USD',
-            line=dict(color="#00BFFF", width=2),
-            marker=dict(size=4)
-        ))
-        fig_line.add_trace(go.Scatter(
-            x=df_prices['timestamp'],
-            y=df_prices['price_brl'],
-            mode='lines+markers',
-            name='BTC/BRL',
-            line=dict(color="#39FF14", width=2),
-            marker=dict(size=4)
-        ))
-        fig_line.update_layout(
-            title="Evolução do Preço (USD vs BRL)",
-            paper_bgcolor="#2D2D2D",
-            plot_bgcolor="#2D2D2D",
-            font=dict(color="white"),
-            height=400,
-            margin=dict(l=40, r=40, t=60, b=40),
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
-        )
-        st.plotly_chart(fig_line, use_container_width=True, config={'displayModeBar': False})
-        # SEÇÃO 3 - Variação de preço no período selecionado
-        # Obtém o período selecionado no filtro global
-        selected_period = st.session_state.get("selected_period", "Últimas 24 Horas")
-        # Define o título e o número de dias conforme o filtro
-        if selected_period == "Últimas 24 Horas":
-            label = "💰 Variação Diária (24h)"
-            days = 1
-        elif selected_period == "Últimos 7 Dias":
-            label = "💰 Variação Semanal (7 dias)"
-            days = 7
-        elif selected_period == "Últimos 30 Dias":
-            label = "💰 Variação Mensal (30 dias)"
-            days = 30
-        elif selected_period == "Últimos 90 Dias":
-            label = "💰 Variação Trimestral (90 dias)"
-            days = 90
-        elif selected_period == "Desde o Início":
-            label = "💰 Variação Acumulada (Desde o Início)"
-            days = None
-        else:
-            label = "💰 Variação de Preço"
-            days = None
-        st.markdown(f"### {label}")
-        # Determina o intervalo de dados com base no filtro
-        if not df_prices.empty:
-            end_date = df_prices['timestamp'].max()
-            if days is not None:
-                start_date = end_date - timedelta(days=days)
-                df_period = df_prices[(df_prices['timestamp'] >= start_date) & (df_prices['timestamp'] <= end_date)]
+            # SMA, EMA e Bollinger sobre o preço; os demais em painéis próprios
+            overlays = [name for name in selected_indicators if indicator_options[name][0] in ("sma", "ema", "bb_upper")]
+            panels = [name for name in selected_indicators if name not in overlays]
+            def build_indicadores():
+                bars = data.prices_rollup
+                # Calculados desde o início normalizado da janela (semente estável) e recortados ao período
+                values = indicators.compute(
+                    ("prices_btc", data.resolution), data.prices_rollup_anchored, "price_usd", data.resolution
+                ).reindex(bars.index)
+                columns = [c for name in selected_indicators for c in indicator_options[name]]
+                df_ind = values[columns].assign(close=bars["price_usd_close"].to_numpy()).rename_axis("timestamp").reset_index()
+                df_ind = downsample(df_ind, "timestamp", ["close"] + columns, CHART_POINTS["indicadores"])
+                fig_ind = make_subplots(
+                    rows=1 + len(panels), cols=1, shared_xaxes=True, vertical_spacing=0.04,
+                    row_heights=[3] + [1] * len(panels), subplot_titles=[""] + panels
+                )
+                fig_ind.add_trace(go.Scatter(
+                    x=df_ind["timestamp"], y=df_ind["close"], mode="lines", name="BTC/USD",
+                    line=dict(color="#00BFFF", width=2)
+                ), row=1, col=1)
+                colors = {"sma": "#FFD700", "ema": "#FF8C00", "bb_upper": "#AAAAAA", "bb_lower": "#AAAAAA"}
+                for name in overlays:
+                    for column in indicator_options[name]:
+                        fig_ind.add_trace(go.Scatter(
+                            x=df_ind["timestamp"], y=df_ind[column], mode="lines", name=name,
+                            line=dict(color=colors[column], width=1, dash="dot" if column.startswith("bb_") else None),
+                            showlegend=column != "bb_lower"
+                        ), row=1, col=1)
+                for row, name in enumerate(panels, start=2):
+                    column = indicator_options[name][0]
+                    fig_ind.add_trace(go.Scatter(
+                        x=df_ind["timestamp"], y=df_ind[column], mode="lines", name=name,
+                        line=dict(color="#39FF14", width=1.5)
+                    ), row=row, col=1)
+                    if column == "rsi":
+                        fig_ind.update_yaxes(range=[0, 100], row=row, col=1)
+                        for level in (30, 70):
+                            fig_ind.add_hline(y=level, line=dict(color="#666666", dash="dash", width=1), row=row, col=1)
+                fig_ind.update_layout(
+                    paper_bgcolor="#2D2D2D", plot_bgcolor="#2D2D2D", font=dict(color="white"),
+                    height=400 + 160 * len(panels), margin=dict(l=40, r=40, t=40, b=40),
+                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
+                )
+                return fig_ind
+            if data.prices_rollup.empty:
+                st.info("Sem barras suficientes para os indicadores no período.")
             else:
-                df_period = df_prices.copy()  # Pega tudo se for "Desde o Início"
-            if not df_period.empty:
-                # Calcula o maior e menor preço no período
-                high_price = df_period['price_usd'].max()
-                low_price = df_period['price_usd'].min()
-                # Calcula a diferença percentual para exibir como delta
-                first_price = df_period['price_usd'].iloc[0]
-                delta_high = ((high_price - first_price) / first_price) * 100
-                delta_low = ((low_price - first_price) / first_price) * 100
-                # Exibe os cards de métrica com setas
-                col_high, col_low = st.columns(2)
-                with col_high:
-                    st.metric(
-                        label="Maior preço",
-                        value=f"$ {high_price:,.2f}",
-                        delta=f"{delta_high:+.2f}%",
-                        delta_color="normal"  # seta verde para positivo, vermelha para negativo
+                fig_ind = cached_figure("indicadores:" + ",".join(selected_indicators), ['prices_btc'], build_indicadores)
+                st.plotly_chart(fig_ind, use_container_width=True, config={'displayModeBar': False})
+            # SEÇÃO 3 - Variação de preço no período selecionado
+            # Obtém o período selecionado no filtro global
+            selected_period = st.session_state.get("selected_period", "Últimas 24 Horas")
+            # Define o título e o número de dias conforme o filtro
+            if selected_period == "Últimas 24 Horas":
+                label = "💰 Variação Diária (24h)"
+                days = 1
+            elif selected_period == "Últimos 7 Dias":
+                label = "💰 Variação Semanal (7 dias)"
+                days = 7
+            elif selected_period == "Últimos 30 Dias":
+                label = "💰 Variação Mensal (30 dias)"
+                days = 30
+            elif selected_period == "Últimos 90 Dias":
+                label = "💰 Variação Trimestral (90 dias)"
+                days = 90
+            elif selected_period == "Desde o Início":
+                label = "💰 Variação Acumulada (Desde o Início)"
+                days = None
+            else:
+                label = "💰 Variação de Preço"
+                days = None
+            st.markdown(f"### {label}")
+            # Determina o intervalo de dados com base no filtro
+            if not df_prices.empty:
+                period_end = df_prices['timestamp'].max()
+                if days is not None:
+                    period_start = period_end - timedelta(days=days)
+                    df_period = data_sync.time_slice(df_prices, period_start, period_end)
+                else:
+                    df_period = df_prices  # Pega tudo se for "Desde o Início"
+                # Maior e menor preço no período e a diferença percentual para o primeiro
+                extremes = analytics.high_low(df_period['price_usd'], version=(data.version('prices_btc'), days))
+                if extremes is not None:
+                    high_price, low_price = extremes["high"], extremes["low"]
+                    delta_high, delta_low = extremes["delta_high"], extremes["delta_low"]
+                    # Exibe os cards de métrica com setas
+                    col_high, col_low = st.columns(2)
+                    with col_high:
+                        st.metric(
+                            label="Maior preço",
+                            value=f"$ {high_price:,.2f}",
+                            delta=f"{delta_high:+.2f}%",
+                            delta_color="normal"  # seta verde para positivo, vermelha para negativo
+                        )
+                    with col_low:
+                        st.metric(
+                            label="Menor preço",
+                            value=f"$ {low_price:,.2f}",
+                            delta=f"{delta_low:+.2f}%",
+                            delta_color="inverse"  # inverte: seta vermelha pra baixo
+                        )
+                else:
+                    st.warning("⚠️ Sem dados disponíveis para o período selecionado.")
+            else:
+                st.warning("⚠️ Dados de preços não encontrados.")
+            st.markdown("---")
+            # SEÇÃO 4 - Comparação BTC/USD vs BTC/BRL (barras duplas)
+            st.markdown("### 💹 Comparação BTC/USD vs BTC/BRL")
+            # Médias diárias (df_avg) já calculadas na Seção 1
+            def build_comparacao_usd_brl():
+                # Criar gráfico de barras duplas com rótulos
+                fig_compare = go.Figure(data=[
+                    go.Bar(
+                        name='BTC/USD',
+                        x=df_avg['date'],
+                        y=df_avg['price_usd'],
+                        text=[f"$ {v:,.2f}" for v in df_avg['price_usd']],  # adiciona valores formatados
+                        textposition='outside',  # pode ser 'outside', 'auto', ou 'inside'
+                        marker_color="#00BFFF"
+                    ),
+                    go.Bar(
+                        name='BTC/BRL',
+                        x=df_avg['date'],
+                        y=df_avg['price_brl'],
+                        text=[f"R$ {v:,.2f}" for v in df_avg['price_brl']],
+                        textposition='outside',
+                        marker_color="#39FF14"
                     )
-                with col_low:
-                    st.metric(
-                        label="Menor preço",
-                        value=f"$ {low_price:,.2f}",
-                        delta=f"{delta_low:+.2f}%",
-                        delta_color="inverse"  # inverte: seta vermelha pra baixo
+                ])
+                # Configuração do layout e rótulos
+                fig_compare.update_layout(
+                    title=dict(
+                        text="Comparação do Preço Médio Diário do Bitcoin em USD e BRL",
+                        font=dict(size=16, color="white"),
+                        x=0.5,
+                    ),
+                    xaxis=dict(
+                        title=dict(text="Data", font=dict(color="white")),
+                        tickfont=dict(color="white")
+                    ),
+                    yaxis=dict(
+                        title=dict(text="Preço Médio", font=dict(color="white")),
+                        tickfont=dict(color="white"),
+                        showgrid=True,
+                        gridcolor="#444444"
+                    ),
+                    barmode='group',
+                    paper_bgcolor="#2D2D2D",
+                    plot_bgcolor="#2D2D2D",
+                    font=dict(color="white"),
+                    height=450,
+                    margin=dict(l=40, r=40, t=60, b=40),
+                    legend=dict(
+                        title="Cotação",
+                        orientation="h",
+                        yanchor="bottom",
+                        y=1.02,
+                        xanchor="center",
+                        x=0.5
                     )
-            else:
-                st.warning("⚠️ Sem dados disponíveis para o período selecionado.")
-        else:
-            st.warning("⚠️ Dados de preços não encontrados.")
-        st.markdown("---")
-        # SEÇÃO 4 - Comparação BTC/USD vs BTC/BRL (barras duplas)
-        st.markdown("### 💹 Comparação BTC/USD vs BTC/BRL")
-        # Converter timestamps para data e calcular médias diárias
-        df_prices['date'] = pd.to_datetime(df_prices['timestamp']).dt.date
-        df_avg = df_prices.groupby('date', as_index=False)[['price_usd', 'price_brl']].mean()
-        # Criar gráfico de barras duplas com rótulos
-        fig_compare = go.Figure(data=[
-            go.Bar(
-                name='BTC/USD',
-                x=df_avg['date'],
-                y=df_avg['price_usd'],
-                text=[f"$ {v:,.2f}" for v in df_avg['price_usd']],  # adiciona valores formatados
-                textposition='outside',  # pode ser 'outside', 'auto', ou 'inside'
-                marker_color="#00BFFF"
-            ),
-            go.Bar(
-                name='BTC/BRL',
-                x=df_avg['date'],
-                y=df_avg['price_brl'],
-                text=[f"R$ {v:,.2f}" for v in df_avg['price_brl']],
-                textposition='outside',
-                marker_color="#39FF14"
-            )
-        ])
-        # Configuração do layout e rótulos
-        fig_compare.update_layout(
-            title=dict(
-                text="Comparação do Preço Médio Diário do Bitcoin em USD e BRL",
-                font=dict(size=16, color="white"),
-                x=0.5,
-            ),
-            xaxis=dict(
-                title=dict(text="Data", font=dict(color="white")),
-                tickfont=dict(color="white")
-            ),
-            yaxis=dict(
-                title=dict(text="Preço Médio", font=dict(color="white")),
-                tickfont=dict(color="white"),
-                showgrid=True,
-                gridcolor="#444444"
-            ),
-            barmode='group',
-            paper_bgcolor="#2D2D2D",
-            plot_bgcolor="#2D2D2D",
-            font=dict(color="white"),
-            height=450,
-            margin=dict(l=40, r=40, t=60, b=40),
-            legend=dict(
-                title="Cotação",
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="center",
-                x=0.5
-            )
-        )
-        # Exibir gráfico
-        st.plotly_chart(fig_compare, use_container_width=True, config={'displayModeBar': False})
+                )
+                # Exibir gráfico
+                return fig_compare
+            fig_compare = cached_figure("comparacao_usd_brl", ['prices_btc'], build_comparacao_usd_brl)
+            st.plotly_chart(fig_compare, use_container_width=True, config={'displayModeBar': False})
+            st.markdown("---")
+            # SEÇÃO 5 - Defasagens (lead/lag): correlação cruzada de todas as defasagens por FFT
+            st.markdown("### ⏱️ Quem Antecipa Quem? Correlação com Defasagem")
+            try:
+                lead_lag_mode = st.radio(
+                    "Comparação", ["Fear & Greed × retorno do BTC", "BTC × outros ativos"],
+                    horizontal=True, key="lead_lag_mode"
+                )
+                max_lag = st.slider("Defasagem máxima (dias)", 5, LEAD_LAG_DAYS, 30, step=5, key="lead_lag_days")
+                if lead_lag_mode.startswith("Fear"):
+                    # Nível do índice no dia × retorno diário do BTC terminado nesse dia
+                    df_sentiment = data.sentiment
+                    lead_lag_tables = ['prices_btc', 'sentiment']
+                    matrix = asset_matrix.AssetMatrix.build({
+                        "BTC": (data.prices_daily['timestamp'], data.prices_daily['price_usd']),
+                        "Fear & Greed": (df_sentiment['timestamp'].dt.tz_localize(None), df_sentiment['fear_greed_index']),
+                    })
+                    reference, targets, reference_levels = "Fear & Greed", ["BTC"], True
+                else:
+                    # Retornos diários do BTC × retornos de cada altcoin e ativo tradicional
+                    lead_lag_tables = ['prices_btc', 'altcoin_prices', 'traditional_assets_prices']
+                    matrix = data.assets
+                    reference, reference_levels = "BTC", False
+                    targets = [a for a in matrix.assets if a != reference]
+                targets = [a for a in targets if a in matrix.assets]
+                if reference not in matrix.assets or not targets or len(matrix.dates) <= analytics.LAG_MIN_PAIRS:
+                    st.warning("⚠️ Dados diários insuficientes para a análise de defasagem neste período.")
+                else:
+                    returns = matrix.returns()
+                    position = matrix.assets.index(reference)
+                    reference_values = matrix.values[1:, position] if reference_levels else returns[:, position]
+                    returns = returns[:, [matrix.assets.index(a) for a in targets]]
+                    # Todas as defasagens até LEAD_LAG_DAYS de uma vez; o controle só recorta a exibição
+                    lags, lagged = analytics.lagged_correlation(
+                        reference_values, returns, max_lag=LEAD_LAG_DAYS,
+                        version=(data.version(*lead_lag_tables), lead_lag_mode)
+                    )
+                    shown = np.abs(lags) <= max_lag
+                    lags, lagged = lags[shown], lagged[shown]
+                    st.caption(f"Defasagem positiva: {reference} antecipa o outro ativo em k dias "
+                               f"(correlação entre {reference} no dia t e o outro no dia t + k). Defasagens com menos de "
+                               f"{analytics.LAG_MIN_PAIRS} dias em comum ficam de fora.")
+                    def build_defasagem():
+                        fig_lag = go.Figure()
+                        for j, name in enumerate(targets):
+                            fig_lag.add_trace(go.Scatter(x=lags, y=lagged[:, j], mode='lines', name=name))
+                        fig_lag.add_vline(x=0, line_color="#AAAAAA", line_dash="dot")
+                        fig_lag.add_hline(y=0, line_color="#666666")
+                        fig_lag.update_layout(
+                            title=dict(text=f"Correlação de {reference} com Defasagem", font=dict(color="#00BFFF"), x=0.5),
+                            xaxis_title="Defasagem (dias)", yaxis_title="Correlação",
+                            paper_bgcolor="#2D2D2D", plot_bgcolor="#2D2D2D", font=dict(color="white"),
+                            height=380, margin=dict(l=40, r=40, t=60, b=40),
+                            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
+                        )
+                        return fig_lag
+                    fig_lag = cached_figure(
+                        f"defasagem:{lead_lag_mode}:{max_lag}", lead_lag_tables, build_defasagem
+                    )
+                    st.plotly_chart(fig_lag, use_container_width=True)
+                    # Defasagem de maior correlação (em módulo) de cada par
+                    peaks = []
+                    for j, name in enumerate(targets):
+                        curve = lagged[:, j]
+                        if np.isfinite(curve).any():
+                            best = int(np.nanargmax(np.abs(curve)))
+                            peaks.append({
+                                "Par": f"{reference} × {name}", "Defasagem de pico (dias)": int(lags[best]),
+                                "Correlação no pico": round(float(curve[best]), 3),
+                                "Correlação sem defasagem": round(float(curve[lags == 0][0]), 3),
+                            })
+                    if peaks:
+                        st.dataframe(pd.DataFrame(peaks), hide_index=True, use_container_width=True)
+            except Exception as e:
+                st.error(f"Erro na análise de defasagem: {e}")
 
 
 # ==============================================================================
 # ABA 3 - ADOÇÃO E USO (COMPATÍVEL COM SUAS COLUNAS REAIS)
 # ==============================================================================
-with tab3:
-    st.markdown("### 🔗 3. Adoção e Uso do Bitcoin")
-    st.markdown("---")
-
-    # Carregando tabelas
-    df_btc = load_data_api("prices_btc")
-    df_global = load_data_api("market_global")
-    df_sentiment = load_data_api("sentiment")
-    if df_btc.empty or df_global.empty:
-        st.warning("Dados insuficientes para montar esta aba.")
-        st.stop()
-
-    # Filtro por data
-    df_btc_filtered = df_btc[(df_btc["timestamp"] >= start_date) &
-                             (df_btc["timestamp"] <= end_date)].copy()
-    df_global_filtered = df_global[(df_global["timestamp"] >= start_date) &
-                                   (df_global["timestamp"] <= end_date)].copy()
-    df_sentiment_filtered = df_sentiment[(df_sentiment["timestamp"] >= start_date) &
-                                         (df_sentiment["timestamp"] <= end_date)].copy()
-
-    # 1) VOLUME TOTAL DE NEGOCIAÇÃO
-    st.subheader("📊 Volume Total de Negociação")
-    if "total_volume" in df_global_filtered.columns:
-        fig = px.line(
-            df_global_filtered,
-            x="timestamp",
-            y="total_volume",
-            title="Volume total de negociação",
-            labels={"timestamp": "Data", "total_volume": "Volume"}
-        )
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("A coluna 'total_volume' não existe em market_global.")
-    st.markdown("---")
-
-    # 2) MARKET CAP DO BITCOIN (total_market_cap)
-    st.subheader("💰 Market Cap Total")
-    if "total_market_cap" in df_global_filtered.columns:
-        fig = px.line(
-            df_global_filtered,
-            x="timestamp",
-            y="total_market_cap",
-            title="Capitalização de Mercado (Market Cap)",
-            labels={"timestamp": "Data", "total_market_cap": "Market Cap"}
-        )
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("A coluna 'total_market_cap' não existe em market_global.")
-    st.markdown("---")
-
-    # 3) DOMINÂNCIA DO BITCOIN
-    st.subheader("🟠 Dominância do Bitcoin (%)")
-    if "btc_dominance" in df_global_filtered.columns:
-        fig = px.area(
-            df_global_filtered,
-            x="timestamp",
-            y="btc_dominance",
-            title="Dominância do BTC no Mercado (%)",
-            labels={"timestamp": "Data", "btc_dominance": "Dominância (%)"}
-        )
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("A coluna 'btc_dominance' não existe em market_global.")
-    st.markdown("---")
+if tab3.open:
+    with tab3, perf.section("tab3"):
+        st.markdown("### 🔗 3. Adoção e Uso do Bitcoin")
+        st.markdown("---")
+
+        # Tabelas já filtradas por data
+        df_btc_filtered = data.prices
+        df_global_filtered = data.market
+        df_sentiment_filtered = data.sentiment
+        if df_btc_filtered.empty or df_global_filtered.empty:
+            st.warning("Dados insuficientes para montar esta aba.")
+            st.stop()
+        # Gráficos de mercado usam o agregado na resolução escolhida para o período
+        df_global_chart = rollups.to_frame(data.market_rollup)
+
+        # 1) VOLUME TOTAL DE NEGOCIAÇÃO
+        st.subheader("📊 Volume Total de Negociação")
+        if "total_volume" in df_global_chart.columns:
+            def build_volume_total():
+                fig = px.line(
+                    downsample(df_global_chart, "timestamp", "total_volume", CHART_POINTS["volume"]),
+                    x="timestamp",
+                    y="total_volume",
+                    title="Volume total de negociação",
+                    labels={"timestamp": "Data", "total_volume": "Volume"}
+                )
+                return fig
+            fig = cached_figure("volume_total", ['market_global'], build_volume_total)
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("A coluna 'total_volume' não existe em market_global.")
+        st.markdown("---")
+
+        # 2) MARKET CAP DO BITCOIN (total_market_cap)
+        st.subheader("💰 Market Cap Total")
+        if "total_market_cap" in df_global_chart.columns:
+            def build_market_cap():
+                fig = px.line(
+                    downsample(df_global_chart, "timestamp", "total_market_cap", CHART_POINTS["market_cap"]),
+                    x="timestamp",
+                    y="total_market_cap",
+                    title="Capitalização de Mercado (Market Cap)",
+                    labels={"timestamp": "Data", "total_market_cap": "Market Cap"}
+                )
+                return fig
+            fig = cached_figure("market_cap", ['market_global'], build_market_cap)
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("A coluna 'total_market_cap' não existe em market_global.")
+        st.markdown("---")
+
+        # 3) DOMINÂNCIA DO BITCOIN
+        st.subheader("🟠 Dominância do Bitcoin (%)")
+        if "btc_dominance" in df_global_chart.columns:
+            def build_dominancia():
+                fig = px.area(
+                    downsample(df_global_chart, "timestamp", "btc_dominance", CHART_POINTS["dominancia"]),
+                    x="timestamp",
+                    y="btc_dominance",
+                    title="Dominância do BTC no Mercado (%)",
+                    labels={"timestamp": "Data", "btc_dominance": "Dominância (%)"}
+                )
+                return fig
+            fig = cached_figure("dominancia", ['market_global'], build_dominancia)
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("A coluna 'btc_dominance' não existe em market_global.")
+        st.markdown("---")
     
-    # 4) FEAR & GREED INDEX
-    st.subheader("😨 Fear & Greed Index")
-    if "fear_greed_index" in df_sentiment_filtered.columns:
-        fig = px.line(
-            df_sentiment_filtered,
-            x="timestamp",
-            y="fear_greed_index",
-            title="Índice de Sentimento (Fear & Greed)",
-            labels={"timestamp": "Data", "fear_greed_index": "Índice"}
-        )
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("A coluna 'fear_greed_index' não existe na tabela sentiment.")
-    st.markdown("---")
+        # 4) FEAR & GREED INDEX
+        st.subheader("😨 Fear & Greed Index")
+        if "fear_greed_index" in df_sentiment_filtered.columns:
+            def build_fear_greed():
+                fig = px.line(
+                    downsample(df_sentiment_filtered, "timestamp", "fear_greed_index", CHART_POINTS["sentimento"]),
+                    x="timestamp",
+                    y="fear_greed_index",
+                    title="Índice de Sentimento (Fear & Greed)",
+                    labels={"timestamp": "Data", "fear_greed_index": "Índice"}
+                )
+                return fig
+            fig = cached_figure("fear_greed", ['sentiment'], build_fear_greed)
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("A coluna 'fear_greed_index' não existe na tabela sentiment.")
+        st.markdown("---")
 
 
 
@@ -674,20 +1267,14 @@ with tab3:
 # =========================================================
 # 🧠 ABA 4 - Sentimento e Notícias
 # =========================================================
-with tab4:
-    st.markdown("## 🧠 Sentimento e Notícias do Mercado")
-    # 🎯 SEÇÃO 1 - Sentimento (Fear & Greed Index)
-    st.markdown("### 📊 Índice de Medo e Ganância (Fear & Greed)")
-    try:
-        # Assumindo que o df_sentiment já foi carregado e tem os timestamps corretos
-        df_sentiment = load_data_api("sentiment")
-        if not df_sentiment.empty:
-            # Filtro usando as datas globais (start_date e end_date) que são UTC
-            df_sentiment = df_sentiment[
-                (df_sentiment["timestamp"] >= start_date) &
-                (df_sentiment["timestamp"] <= end_date)
-            ].reset_index(drop=True)
-            # A conversão de pd.to_datetime é feita na load_data_api, mantido.
+if tab4.open:
+    with tab4, perf.section("tab4"):
+        st.markdown("## 🧠 Sentimento e Notícias do Mercado")
+        # 🎯 SEÇÃO 1 - Sentimento (Fear & Greed Index)
+        st.markdown("### 📊 Índice de Medo e Ganância (Fear & Greed)")
+        try:
+            # Sentimento já filtrado pelas datas globais (start_date e end_date) que são UTC
+            df_sentiment = data.sentiment
             if not df_sentiment.empty:
                 # Última linha (sentimento mais recente)
                 last_row = df_sentiment.iloc[-1]
@@ -726,74 +1313,204 @@ with tab4:
                     """,
                     unsafe_allow_html=True
                 )
-                # --- Gráfico de evolução ---
-                fig_sentiment = px.line(
-                    df_sentiment,
-                    x="timestamp",
-                    y="fear_greed_index",
-                    markers=True,
-                    title="Evolução do Índice de Sentimento"
+                def build_sentimento():
+                    # --- Gráfico de evolução ---
+                    fig_sentiment = px.line(
+                        downsample(df_sentiment, "timestamp", "fear_greed_index", CHART_POINTS["sentimento"]),
+                        x="timestamp",
+                        y="fear_greed_index",
+                        markers=True,
+                        title="Evolução do Índice de Sentimento"
+                    )
+                    # 1. Ajuste dos nomes dos EIXOS (títulos)
+                    fig_sentiment.update_layout(
+                        # CORREÇÃO APLICADA AQUI: MUDAR O TÍTULO DO EIXO X PARA BRT
+                        xaxis_title="Data e Hora (BRT)", 
+                        # --- FIM DA CORREÇÃO ---
+                        yaxis_title="Índice (0 = Medo, 100 = Ganância)", 
+                        title_x=0.5,
+                        title_font=dict(color="#00BFFF"), # Cor neon no título
+                        plot_bgcolor="#2D2D2D",
+                        paper_bgcolor="#2D2D2D",
+                        font=dict(color="white"),
+                        height=350,
+                        margin=dict(l=20, r=20, t=60, b=40)
+                    )
+                    # 2. Ajuste na exibição do Eixo X (data/hora)
+                    fig_sentiment.update_xaxes(
+                        tickformat="%d/%m/%Y %H:%M", # Formato de exibição mais claro
+                        showgrid=True,
+                        gridcolor='#444444'
+                    )
+                    # Adiciona as faixas de sentimento como fundo (cores mantidas)
+                    fig_sentiment.add_hrect(y0=0, y1=25, fillcolor="#8B0000", opacity=0.1, layer="below", line_width=0, annotation_text="Medo Extremo")
+                    fig_sentiment.add_hrect(y0=25, y1=50, fillcolor="#CC0000", opacity=0.1, layer="below", line_width=0, annotation_text="Medo")
+                    fig_sentiment.add_hrect(y0=50, y1=75, fillcolor="#009900", opacity=0.1, layer="below", line_width=0, annotation_text="Ganância")
+                    fig_sentiment.add_hrect(y0=75, y1=100, fillcolor="#006400", opacity=0.1, layer="below", line_width=0, annotation_text="Ganância Extrema")
+                    return fig_sentiment
+                fig_sentiment = cached_figure("sentimento", ['sentiment'], build_sentimento)
+                st.plotly_chart(fig_sentiment, use_container_width=True)
+            else:
+                st.warning("⚠️ Nenhum dado de sentimento disponível para o período selecionado.")
+        except Exception as e:
+            st.error(f"Erro ao carregar sentimento: {e}")
+        st.markdown("---")
+
+        # SEÇÃO 2 - Últimas Notícias de Mercado
+        st.markdown("### 📰 Últimas Notícias de Mercado")
+        try:
+            # Notícias já ordenadas da mais recente para a mais antiga
+            df_news = data.news
+            if not df_news.empty:
+                df_news = df_news.head(5)
+                for _, row in df_news.iterrows():
+                    headline = row["headline"]
+                    source = row["source"]
+                    link = row["link"]
+                    date = row["date"].strftime("%d/%m/%Y")
+                    st.markdown(
+                        f"""
+                        <div style='background-color:#2F2F2F; padding:10px 15px; border-radius:8px; margin-bottom:8px;'>
+                            <b style='color:#00BFFF;'>{source.upper()}</b>: 
+                            <a href='{link}' target='_blank' style='color:#FFD700; text-decoration:none;'>{headline}</a><br>
+                            <span style='color:#AAAAAA;'>📅 {date} | 🗞️ {source}</span>
+                        </div>
+                        """,
+                        unsafe_allow_html=True
+                    )
+            else:
+                st.warning("⚠️ Nenhuma notícia disponível no momento.")
+        except Exception as e:
+            st.error(f"Erro ao carregar notícias: {e}")
+        st.markdown("---")
+
+        # SEÇÃO 3 - Arquivo de notícias: busca no histórico inteiro (índice invertido em memória)
+        st.markdown("### 🔎 Arquivo de Notícias")
+        try:
+            # Índice atualizado só com as notícias sincronizadas desde a última execução
+            archive = news_index.index("news_events", data.table("news_events"))
+            if len(archive):
+                def reset_news_page():
+                    st.session_state["news_page"] = 1
+                first_day = pd.Timestamp(archive.dates[0]).date()
+                last_day = pd.Timestamp(archive.dates[-1]).date()
+                col_query, col_sources, col_dates = st.columns([2, 1, 1])
+                query = col_query.text_input(
+                    "Buscar nas manchetes e fontes", key="news_query", placeholder="ex.: ETF bitcoin",
+                    on_change=reset_news_page
                 )
-                # 1. Ajuste dos nomes dos EIXOS (títulos)
-                fig_sentiment.update_layout(
-                    # CORREÇÃO APLICADA AQUI: MUDAR O TÍTULO DO EIXO X PARA BRT
-                    xaxis_title="Data e Hora (BRT)", 
-                    # --- FIM DA CORREÇÃO ---
-                    yaxis_title="Índice (0 = Medo, 100 = Ganância)", 
-                    title_x=0.5,
-                    title_font=dict(color="#00BFFF"), # Cor neon no título
-                    plot_bgcolor="#2D2D2D",
-                    paper_bgcolor="#2D2D2D",
-                    font=dict(color="white"),
-                    height=350,
-                    margin=dict(l=20, r=20, t=60, b=40)
+                sources = col_sources.multiselect(
+                    "Fontes", archive.source_names, key="news_sources", on_change=reset_news_page
                 )
-                # 2. Ajuste na exibição do Eixo X (data/hora)
-                fig_sentiment.update_xaxes(
-                    tickformat="%d/%m/%Y %H:%M", # Formato de exibição mais claro
-                    showgrid=True,
-                    gridcolor='#444444'
+                news_dates = col_dates.date_input(
+                    "Período", (first_day, last_day), min_value=first_day, max_value=last_day,
+                    key="news_dates", on_change=reset_news_page
                 )
-                # Adiciona as faixas de sentimento como fundo (cores mantidas)
-                fig_sentiment.add_hrect(y0=0, y1=25, fillcolor="#8B0000", opacity=0.1, layer="below", line_width=0, annotation_text="Medo Extremo")
-                fig_sentiment.add_hrect(y0=25, y1=50, fillcolor="#CC0000", opacity=0.1, layer="below", line_width=0, annotation_text="Medo")
-                fig_sentiment.add_hrect(y0=50, y1=75, fillcolor="#009900", opacity=0.1, layer="below", line_width=0, annotation_text="Ganância")
-                fig_sentiment.add_hrect(y0=75, y1=100, fillcolor="#006400", opacity=0.1, layer="below", line_width=0, annotation_text="Ganância Extrema")
-                st.plotly_chart(fig_sentiment, use_container_width=True)
+                search_start = search_end = None
+                if len(news_dates) == 2:
+                    search_start = pd.Timestamp(news_dates[0])
+                    search_end = pd.Timestamp(news_dates[1]) + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+                # Facetas por dia em períodos curtos, por mês nos longos
+                span_days = ((search_end or pd.Timestamp(last_day)) - (search_start or pd.Timestamp(first_day))).days
+                bucket = "D" if span_days <= 90 else "M"
+                page = st.session_state.get("news_page", 1)
+                with perf.span("busca de notícias", "search") as args:
+                    result = archive.search(query, search_start, search_end, sources, page=page - 1, date_bucket=bucket)
+                    if result.page >= result.pages:
+                        # Página além do fim (a busca ficou menor): mostra a última
+                        result = archive.search(query, search_start, search_end, sources,
+                                                page=result.pages - 1, date_bucket=bucket)
+                        st.session_state["news_page"] = result.pages
+                    args["rows"] = result.total
+                st.caption(f"{result.total:,} notícias encontradas · página {result.page + 1} de {result.pages:,}"
+                           .replace(",", "."))
+                if result.total:
+                    col_chart, col_facets = st.columns([3, 1])
+                    col_chart.bar_chart(result.dates, height=180, color="#00BFFF")
+                    col_facets.dataframe(
+                        result.sources.rename("notícias").rename_axis("fonte").reset_index(),
+                        hide_index=True, height=180
+                    )
+                    for row in result.rows.itertuples():
+                        st.markdown(
+                            f"""
+                            <div style='background-color:#2F2F2F; padding:10px 15px; border-radius:8px; margin-bottom:8px;'>
+                                <b style='color:#00BFFF;'>{html.escape(str(row.source)).upper()}</b>: 
+                                <a href='{html.escape(str(row.link))}' target='_blank' style='color:#FFD700; text-decoration:none;'>{html.escape(str(row.headline))}</a><br>
+                                <span style='color:#AAAAAA;'>📅 {row.date.tz_convert('America/Sao_Paulo').strftime("%d/%m/%Y %H:%M")}</span>
+                            </div>
+                            """,
+                            unsafe_allow_html=True
+                        )
+                    st.number_input("Página", min_value=1, max_value=result.pages, step=1, key="news_page")
             else:
-                st.warning("⚠️ Nenhum dado de sentimento disponível para o período selecionado.")
-        else:
-            st.warning("⚠️ Dados de sentimento não encontrados.")
-    except Exception as e:
-        st.error(f"Erro ao carregar sentimento: {e}")
-    st.markdown("---")
+                st.warning("⚠️ Nenhuma notícia disponível no momento.")
+        except Exception as e:
+            st.error(f"Erro na busca de notícias: {e}")
+        st.markdown("---")
 
-    # SEÇÃO 2 - Últimas Notícias de Mercado
-    st.markdown("### 📰 Últimas Notícias de Mercado")
-    try:
-        df_news = load_data_api("news_events")
-        if not df_news.empty:
-            df_news["date"] = pd.to_datetime(df_news["date"])
-            df_news = df_news.sort_values("date", ascending=False).head(5)
-            for _, row in df_news.iterrows():
-                headline = row["headline"]
-                source = row["source"]
-                link = row["link"]
-                date = row["date"].strftime("%d/%m/%Y")
-                st.markdown(
-                    f"""
-                    <div style='background-color:#2F2F2F; padding:10px 15px; border-radius:8px; margin-bottom:8px;'>
-                        <b style='color:#00BFFF;'>{source.upper()}</b>: 
-                        <a href='{link}' target='_blank' style='color:#FFD700; text-decoration:none;'>{headline}</a><br>
-                        <span style='color:#AAAAAA;'>📅 {date} | 🗞️ {source}</span>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
+        # SEÇÃO 4 - Estudo de eventos: o preço do BTC em torno das notícias do período
+        st.markdown("### 📈 Impacto das Notícias no Preço do BTC")
+        try:
+            archive = news_index.index("news_events", data.table("news_events"))
+            df_prices = data.prices
+            if len(archive) and not df_prices.empty:
+                col_query, col_sources, col_window = st.columns([2, 1, 1])
+                event_query = col_query.text_input("Palavras-chave", key="event_query", placeholder="ex.: regulação")
+                event_sources = col_sources.multiselect("Fontes", archive.source_names, key="event_sources")
+                event_window = col_window.radio(
+                    "Perfil médio", list(event_study.WINDOWS), index=1, horizontal=True, key="event_window"
                 )
-        else:
-            st.warning("⚠️ Nenhuma notícia disponível no momento.")
-    except Exception as e:
-        st.error(f"Erro ao carregar notícias: {e}")
+                # Notícias do período que passam pelos filtros (mesma busca do arquivo)
+                events = archive.match(event_query, start_date, end_date, event_sources)
+                event_version = (data.version('prices_btc', 'news_events'), tuple(news_index.tokens(event_query)),
+                                 tuple(sorted(event_sources)))
+                stats = event_study.summary(
+                    df_prices['timestamp'], df_prices['price_usd'], events, version=event_version
+                )
+                st.caption(f"{len(events):,} notícias no período selecionado. Retornos e volatilidade realizada em %; "
+                           "a linha de base é a média de janelas do mesmo tamanho em qualquer instante do período."
+                           .replace(",", "."))
+                st.dataframe(
+                    stats.rename(columns={
+                        "janela": "Janela", "eventos": "Eventos", "retorno_antes": "Retorno antes (%)",
+                        "retorno_depois": "Retorno depois (%)", "alta_depois": "Alta depois (% eventos)",
+                        "vol_antes": "Vol. antes (%)", "vol_depois": "Vol. depois (%)",
+                        "retorno_base": "Retorno base (%)", "vol_base": "Vol. base (%)",
+                    }).round(3),
+                    hide_index=True, use_container_width=True
+                )
+                def build_eventos():
+                    curve = event_study.profile(
+                        df_prices['timestamp'], df_prices['price_usd'], events,
+                        window=event_window, version=event_version
+                    )
+                    fig_events = go.Figure()
+                    fig_events.add_trace(go.Scatter(
+                        x=curve["horas"], y=curve["retorno_medio"], name="Após notícias",
+                        line=dict(color="#FFD700", width=2.5)
+                    ))
+                    fig_events.add_trace(go.Scatter(
+                        x=curve["horas"], y=curve["base"], name="Linha de base",
+                        line=dict(color="#AAAAAA", dash="dash")
+                    ))
+                    fig_events.add_vline(x=0, line_color="#00BFFF", line_dash="dot")
+                    fig_events.update_layout(
+                        title=f"Retorno médio do BTC em torno das notícias ({event_window})",
+                        xaxis_title="Horas desde a notícia", yaxis_title="Retorno vs. instante da notícia (%)",
+                        title_x=0.5, title_font=dict(color="#00BFFF"),
+                        plot_bgcolor="#2D2D2D", paper_bgcolor="#2D2D2D", font=dict(color="white"),
+                        height=380, margin=dict(l=20, r=20, t=60, b=40)
+                    )
+                    return fig_events
+                fig_events = cached_figure(
+                    "eventos:" + repr(event_version[1:] + (event_window,)), ['prices_btc', 'news_events'], build_eventos
+                )
+                st.plotly_chart(fig_events, use_container_width=True)
+            else:
+                st.warning("⚠️ Sem notícias ou preços no período selecionado.")
+        except Exception as e:
+            st.error(f"Erro no estudo de eventos: {e}")
 
 
 
@@ -802,392 +1519,375 @@ with tab4:
 # ==============================================================================
 # ABA 5 - COMPARATIVOS (Versão Final e Corrigida)
 # ==============================================================================
-with tab5:
-    st.markdown("## 🧭 Comparativos e Contexto de Mercado")
-    st.markdown("O objetivo desta seção é contextualizar o Bitcoin em relação ao mercado cripto mais amplo e a ativos tradicionais.")
-    # CORREÇÃO DE ESCOPO: Carrega dados diários do BTC para uso em toda a aba
-    try:
-        # Tenta carregar os dados do BTC
-        df_btc_daily = load_data_api("prices_btc")
-        # Garante que as colunas essenciais estejam no formato correto
-        df_btc_daily['timestamp'] = pd.to_datetime(df_btc_daily['timestamp'], errors='coerce').dt.normalize()
-        df_btc_daily['price_usd'] = pd.to_numeric(df_btc_daily['price_usd'], errors='coerce')
-        df_btc_daily.dropna(subset=['timestamp', 'price_usd'], inplace=True)
-    except Exception as e:
-        # Fallback para evitar NameError
-        df_btc_daily = pd.DataFrame({'timestamp': [], 'price_usd': []})
-        st.error(f"FATAL: Não foi possível carregar 'df_btc_daily' para a Aba 5: {e}")
-    # Inicializa um DataFrame vazio para a Seção 2, caso o carregamento falhe
-    crypto_df = pd.DataFrame({'date': [], 'symbol': [], 'close': []})
-
-    # 1. Dominância do Bitcoin no Mercado Cripto
-    st.markdown("### 👑 1. Dominância do Bitcoin no Mercado Cripto")
-    try:
-        # Carrega dados de mercado global
-        df_market = load_data_api("market_global")
-        # Assegura que start_date e end_date estejam sem timezone para o filtro
-        start_date_ts = pd.to_datetime(start_date).tz_localize(None)
-        end_date_ts = pd.to_datetime(end_date).tz_localize(None)
-        if not df_market.empty:
-            df_market['timestamp'] = pd.to_datetime(df_market['timestamp'], errors='coerce').dt.tz_localize(None)
-            df_dominance = df_market[
-                (df_market["timestamp"] >= start_date_ts) &
-                (df_market["timestamp"] <= end_date_ts)
-            ].copy()
+if tab5.open:
+    with tab5, perf.section("tab5"):
+        st.markdown("## 🧭 Comparativos e Contexto de Mercado")
+        st.markdown("O objetivo desta seção é contextualizar o Bitcoin em relação ao mercado cripto mais amplo e a ativos tradicionais.")
+
+        # 1. Dominância do Bitcoin no Mercado Cripto
+        st.markdown("### 👑 1. Dominância do Bitcoin no Mercado Cripto")
+        try:
+            # Dados de mercado global já filtrados pelo período
+            df_dominance = data.market
             if 'btc_dominance' in df_dominance.columns and not df_dominance.empty:
                 latest_dominance = df_dominance['btc_dominance'].iloc[-1]
-                if len(df_dominance) >= 2:
-                    previous_dominance = df_dominance['btc_dominance'].iloc[-2]
-                    delta_dominance = latest_dominance - previous_dominance
-                    delta_str = f"{delta_dominance:+.2f} pts"
-                else:
-                    delta_str = "N/A"
+                kpi_dominance = analytics.last_change(
+                    df_dominance['btc_dominance'], version=(data.version('market_global'), 'btc_dominance')
+                )
+                delta_str = f"{kpi_dominance['delta']:+.2f} pts" if kpi_dominance is not None else "N/A"
                 st.metric(
                     label="DOMINÂNCIA ATUAL DO BTC", 
                     value=f"{latest_dominance:.2f} %",
                     delta=delta_str,
                     delta_color="normal" 
                 )
-                fig_dominance = px.line(
-                    df_dominance, x="timestamp", y="btc_dominance",
-                    title="Evolução da Dominância do Bitcoin (BTC Dominance)",
-                    labels={"timestamp": "Data e Hora", "btc_dominance": "Dominância (%)"}
-                )
-                fig_dominance.update_layout(title_x=0.5, title_font=dict(color="#00BFFF"), plot_bgcolor="#2D2D2D", paper_bgcolor="#2D2D2D", font=dict(color="white"), height=380, margin=dict(l=20, r=20, t=60, b=40))
-                fig_dominance.update_traces(line=dict(color="#FFD700", width=2))
-                fig_dominance.update_yaxes(range=[0, 100], tickformat=".2f", showgrid=True, gridcolor='#444444')
+                def build_dominancia_comparativo():
+                    fig_dominance = px.line(
+                        downsample(df_dominance, "timestamp", "btc_dominance", CHART_POINTS["dominancia"]),
+                        x="timestamp", y="btc_dominance",
+                        title="Evolução da Dominância do Bitcoin (BTC Dominance)",
+                        labels={"timestamp": "Data e Hora", "btc_dominance": "Dominância (%)"}
+                    )
+                    fig_dominance.update_layout(title_x=0.5, title_font=dict(color="#00BFFF"), plot_bgcolor="#2D2D2D", paper_bgcolor="#2D2D2D", font=dict(color="white"), height=380, margin=dict(l=20, r=20, t=60, b=40))
+                    fig_dominance.update_traces(line=dict(color="#FFD700", width=2))
+                    fig_dominance.update_yaxes(range=[0, 100], tickformat=".2f", showgrid=True, gridcolor='#444444')
+                    return fig_dominance
+                fig_dominance = cached_figure("dominancia_comparativo", ['market_global'], build_dominancia_comparativo)
                 st.plotly_chart(fig_dominance, use_container_width=True)
             else:
                 st.warning("⚠️ Coluna 'btc_dominance' não encontrada ou dados insuficientes.")
-        else:
-            st.warning("⚠️ Dados de mercado global não encontrados.")
-    except Exception as e:
-        st.error(f"Erro ao carregar Dominância do BTC: {e}")
-    st.markdown("---")
-    # PREPARAÇÃO DE DADOS: Carregamento, Renomeação e Unificação (BTC + Altcoins)
-    try:
-        # 1. Carrega dados das Altcoins. Usa df_btc_daily carregado acima
-        altcoins_df = load_data_api("altcoin_prices") 
-        btc_df = df_btc_daily.copy() # Usa o DataFrame já carregado
-        # --- Processamento BTC ---
-        btc_df = btc_df.rename(columns={'price_usd': 'close', 'timestamp': 'date'})
-        btc_df['symbol'] = 'BTC'
-        btc_df = btc_df[['date', 'symbol', 'close']]
-        # --- Processamento Altcoins ---
-        if not altcoins_df.empty:
-            altcoins_df = altcoins_df.rename(columns={'timestamp': 'date'})
-            crypto_df_altcoins = pd.melt(
-                altcoins_df,
-                id_vars=['date'],
-                value_vars=['eth_usd', 'bnb_usd', 'usdt_usd'],
-                var_name='symbol',
-                value_name='close'
-            )
-            crypto_df_altcoins['symbol'] = crypto_df_altcoins['symbol'].str.split('_').str[0].str.upper()
-            crypto_df = pd.concat([btc_df, crypto_df_altcoins], ignore_index=True)
-        else:
-            crypto_df = btc_df.copy() 
-    except Exception as e:
-        st.warning(f"⚠️ Erro na preparação dos dados para o comparativo (Verifique as chaves 'altcoin_prices'): {e}")
-        crypto_df = pd.DataFrame({'date': [], 'symbol': [], 'close': []}) 
-    # 2. Bitcoin vs. Principais Altcoins (ETH, USDT, BNB)
-    st.markdown("### 💰 2 Bitcoin vs. Principais Altcoins (ETH, USDT, BNB)")
-    try:
-        # Assegura que start_date e end_date estejam sem timezone para o filtro
-        start_date_ts = pd.to_datetime(start_date).tz_localize(None)
-        end_date_ts = pd.to_datetime(end_date).tz_localize(None)
-        if not crypto_df.empty:
-            crypto_df['date'] = pd.to_datetime(crypto_df['date'], errors='coerce').dt.tz_localize(None)
-            # Filtragem inicial
-            filtered_df = crypto_df[
-                (crypto_df['date'] >= start_date_ts) & (crypto_df['date'] <= end_date_ts)
-            ].copy() 
-            
-            # RE-AMOSTRAGEM (SUAVIZAÇÃO) DOS DADOS PARA FREQUÊNCIA DIÁRIA
-            if not filtered_df.empty:
-                filtered_df = filtered_df.set_index('date') 
-                filtered_df_resampled = filtered_df.groupby('symbol')['close'].resample('D').last().reset_index()
-                filtered_df = filtered_df_resampled.dropna(subset=['close'])
-                filtered_df.sort_values(by=['symbol', 'date'], inplace=True) 
-        else:
-            filtered_df = pd.DataFrame()
-        if filtered_df.empty:
-            st.warning("⚠️ Não há dados suficientes no período selecionado para a comparação após a suavização dos dados.")
-        else:
-            # CÁLCULO: NORMALIZAÇÃO DOS DADOS PARA COMPARAR DESEMPENHO (Base 100)
-            initial_prices = filtered_df.groupby('symbol')['close'].first().reset_index()
-            initial_prices.rename(columns={'close': 'initial_close'}, inplace=True)
-            df_normalized = filtered_df.merge(initial_prices, on='symbol')
-            # Calcula o Retorno Normalizado (Base 100)
-            df_normalized['normalized_price'] = (
-                df_normalized['close'] / df_normalized['initial_close']
-            ) * 100
-            crypto_filtered = df_normalized
-            # --- Gráfico de Desempenho Normalizado ---
-            fig_altcoin = px.line(
-                crypto_filtered,
-                x='date',
-                y='normalized_price',
-                color='symbol',
-                title='Comparativo de Desempenho: Bitcoin vs Altcoins (Base 100)',
-                labels={'date': 'Data', 'normalized_price': 'Retorno Normalizado (Base 100)', 'symbol': 'Criptomoeda'}
-            )
-            fig_altcoin.update_layout(
-                xaxis_title="Data",
-                yaxis_title="Retorno Normalizado (Base 100)",
-                legend_title="Criptomoeda"
-            )
-            st.plotly_chart(fig_altcoin, use_container_width=True)
-    except Exception as e:
-        st.error(f"Erro ao carregar comparação de Altcoins: {e}")
+        except Exception as e:
+            st.error(f"Erro ao carregar Dominância do BTC: {e}")
+        st.markdown("---")
+        # Preços diários alinhados (datas × ativos) de BTC, altcoins e ativos tradicionais
+        assets = data.assets
+        # 2. Bitcoin vs. Principais Altcoins (ETH, USDT, BNB)
+        st.markdown("### 💰 2 Bitcoin vs. Principais Altcoins (ETH, USDT, BNB)")
+        try:
+            crypto = assets.select(["BNB", "BTC", "ETH", "USDT"])
+            if not crypto.assets:
+                st.warning("⚠️ Não há dados suficientes no período selecionado para a comparação após a suavização dos dados.")
+            else:
+                # CÁLCULO: NORMALIZAÇÃO DOS DADOS PARA COMPARAR DESEMPENHO (Base 100)
+                crypto_filtered = crypto.to_long(crypto.base100(), 'normalized_price')
+                def build_altcoins():
+                    # --- Gráfico de Desempenho Normalizado ---
+                    fig_altcoin = px.line(
+                        downsample(crypto_filtered, 'date', 'normalized_price', CHART_POINTS["altcoins"], by='symbol'),
+                        x='date',
+                        y='normalized_price',
+                        color='symbol',
+                        title='Comparativo de Desempenho: Bitcoin vs Altcoins (Base 100)',
+                        labels={'date': 'Data', 'normalized_price': 'Retorno Normalizado (Base 100)', 'symbol': 'Criptomoeda'}
+                    )
+                    fig_altcoin.update_layout(
+                        xaxis_title="Data",
+                        yaxis_title="Retorno Normalizado (Base 100)",
+                        legend_title="Criptomoeda"
+                    )
+                    return fig_altcoin
+                fig_altcoin = cached_figure("altcoins", ['prices_btc', 'altcoin_prices'], build_altcoins)
+                st.plotly_chart(fig_altcoin, use_container_width=True)
+        except Exception as e:
+            st.error(f"Erro ao carregar comparação de Altcoins: {e}")
 
-    # 🏛️ 3. Bitcoin vs. Ouro e S&P 500
-    st.markdown("### 🏛️ 3. Bitcoin vs. Ouro e S&P 500")
-    try:
-        # 1. Função de busca e cache para Ativos Tradicionais
-        @st.cache_data(ttl=600)
-        def fetch_traditional_assets(_supabase_conn): 
-            if not _supabase_conn:
-                st.error("Conexão com Supabase indisponível.")
-                return pd.DataFrame()
-            response = _supabase_conn.table("traditional_assets_prices").select("timestamp, symbol, price_usd").execute()
-            df = pd.DataFrame(response.data)
-            # Limpeza e Preparação dos dados
-            df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce').dt.normalize()
-            df = df.rename(columns={'price_usd': 'price'})
-            df['price'] = pd.to_numeric(df['price'], errors='coerce')
-            # CORREÇÃO CRÍTICA: Limpa o símbolo para garantir que 'XAUUSD' seja reconhecido
-            df['symbol'] = df['symbol'].astype(str).str.strip() 
-            df.dropna(subset=['timestamp', 'price', 'symbol'], inplace=True) 
-            return df[['timestamp', 'symbol', 'price']]
-        # Busca os dados (Chama a função passando o objeto de conexão)
-        df_traditional = fetch_traditional_assets(supabase)
-        # 2. Prepara os dados do Bitcoin para a comparação
-        if df_btc_daily.empty:
-            st.warning("Dados do Bitcoin não carregados. Ignorando BTC.")
-            df_btc_comparison = pd.DataFrame()
-        else:
-            df_btc_comparison = df_btc_daily[['timestamp', 'price_usd']].copy()
-            df_btc_comparison = df_btc_comparison.rename(columns={'price_usd': 'price'})
-            df_btc_comparison['symbol'] = 'BTC'
-            df_btc_comparison['symbol'] = df_btc_comparison['symbol'].astype(str).str.strip()
-        # 3. Combina todos os ativos (BTC, SPY, XAUUSD)
-        df_all_assets = pd.concat([df_traditional, df_btc_comparison], ignore_index=True)
-        df_all_assets.sort_values(by='timestamp', inplace=True)
-        df_all_assets.dropna(subset=['price'], inplace=True)
-        df_all_assets['timestamp'] = pd.to_datetime(df_all_assets['timestamp']).dt.tz_localize(None)
-        # 3a. Ajusta a data de início do filtro para garantir que haja um ponto de partida para todos os ativos
-        min_date_available = df_all_assets['timestamp'].min()
-        start_date_ts = pd.to_datetime(start_date).tz_localize(None)
-        end_date_ts = pd.to_datetime(end_date).tz_localize(None)
-        # Garante que a data de início não seja anterior ao mínimo disponível
-        if start_date_ts < min_date_available:
-            start_date_ts = min_date_available
-            
-        # Filtra pelo período selecionado pelo usuário
-        df_all_assets = df_all_assets[
-            (df_all_assets['timestamp'] >= start_date_ts) & (df_all_assets['timestamp'] <= end_date_ts)
-        ].copy()
-        
-        # CORREÇÃO DUPLICIDADE: Remove duplicatas pela chave (timestamp, symbol)
-        df_all_assets.drop_duplicates(subset=['timestamp', 'symbol'], inplace=True)
-        # 4. Normaliza os preços para comparar retornos (Base 100):
-        # 4a. Agrupa e encontra o primeiro preço de cada ativo no período filtrado
-        df_all_assets['initial_price'] = df_all_assets.groupby('symbol')['price'].transform('first')
-        # 4b. Normaliza: (Preço Atual / Preço Inicial) * 100
-        df_all_assets['Retorno Normalizado (Base 100)'] = (
-            df_all_assets['price'] / df_all_assets['initial_price']
-        ) * 100
-        # 4c. Prepara para Plotly (DataFrame final)
-        df_chart = df_all_assets.rename(columns={'symbol': 'Ativo', 'timestamp': 'Data'})
-        df_chart = df_chart[['Data', 'Ativo', 'Retorno Normalizado (Base 100)']]
+        # 🏛️ 3. Bitcoin vs. Ouro e S&P 500
+        st.markdown("### 🏛️ 3. Bitcoin vs. Ouro e S&P 500")
+        try:
+            # Ativos tradicionais (símbolos da tabela) e o BTC, na matriz diária alinhada
+            traditional_symbols = [str(c) for c in data.traditional['symbol'].unique()] if not data.traditional.empty else []
+            if "BTC" not in assets.select(["BTC"]).assets:
+                st.warning("Dados do Bitcoin não carregados. Ignorando BTC.")
+            compared = assets.select(["BTC"] + sorted(traditional_symbols))
+            # Normaliza os preços para comparar retornos (Base 100) a partir do
+            # primeiro preço de cada ativo no período filtrado
+            df_chart = compared.to_long(compared.base100(), 'Retorno Normalizado (Base 100)',
+                                        date_name='Data', asset_name='Ativo')
         
-        # Garante que há dados para plotar
-        if df_chart.empty or len(df_chart['Ativo'].unique()) < 3: 
-            st.warning(f"⚠️ Não há dados suficientes. Apenas {len(df_chart['Ativo'].unique())} ativos encontrados no período selecionado. Verifique os filtros de data e limpe o cache.")
-        else:
-            # 5. Cria o Gráfico de Linhas
-            fig = px.line(
-                df_chart, 
-                x="Data", 
-                y="Retorno Normalizado (Base 100)", 
-                color='Ativo',
-                title="Performance Comparada: Bitcoin vs. Ouro e S&P 500",
-                labels={"Data": "Data"},
-                color_discrete_map={
-                    'BTC': '#f7931a',
-                    'SPY': '#008000',
-                    'XAUUSD': '#FFD700'
-                }
-            )
-            # CORREÇÃO DE VISUALIZAÇÃO: Força o Eixo Y para dar zoom (ajuste o range se necessário)
-            # Este ajuste é crucial para que a linha do Ouro, menos volátil, não seja achatada.
-            fig.update_yaxes(range=[90, 110])
-            fig.update_layout(
-                legend_title_text='Ativo',
-                annotations=[
-                    dict(
-                        xref='paper', yref='paper',
-                        x=0.0, y=-0.2,
-                        text='*Base 100: Todos os ativos são comparados a partir do seu preço no dia inicial DENTRO do período filtrado.',
-                        showarrow=False,
-                        font=dict(size=10, color="grey")
+            # Garante que há dados para plotar
+            if len(compared.assets) < 3: 
+                st.warning(f"⚠️ Não há dados suficientes. Apenas {len(compared.assets)} ativos encontrados no período selecionado. Verifique os filtros de data e limpe o cache.")
+            else:
+                def build_tradicionais():
+                    # 5. Cria o Gráfico de Linhas
+                    fig = px.line(
+                        downsample(df_chart, "Data", "Retorno Normalizado (Base 100)", CHART_POINTS["tradicionais"], by="Ativo"),
+                        x="Data", 
+                        y="Retorno Normalizado (Base 100)", 
+                        color='Ativo',
+                        title="Performance Comparada: Bitcoin vs. Ouro e S&P 500",
+                        labels={"Data": "Data"},
+                        color_discrete_map={
+                            'BTC': '#f7931a',
+                            'SPY': '#008000',
+                            'XAUUSD': '#FFD700'
+                        }
                     )
-                ]
+                    # CORREÇÃO DE VISUALIZAÇÃO: Força o Eixo Y para dar zoom (ajuste o range se necessário)
+                    # Este ajuste é crucial para que a linha do Ouro, menos volátil, não seja achatada.
+                    fig.update_yaxes(range=[90, 110])
+                    fig.update_layout(
+                        legend_title_text='Ativo',
+                        annotations=[
+                            dict(
+                                xref='paper', yref='paper',
+                                x=0.0, y=-0.2,
+                                text='*Base 100: Todos os ativos são comparados a partir do seu preço no dia inicial DENTRO do período filtrado.',
+                                showarrow=False,
+                                font=dict(size=10, color="grey")
+                            )
+                        ]
+                    )
+                    return fig
+                fig = cached_figure("tradicionais", ['prices_btc', 'traditional_assets_prices'], build_tradicionais)
+                st.plotly_chart(fig, use_container_width=True)
+        except Exception as e:
+            st.error(f"Erro ao carregar comparação com Ativos Tradicionais: {e}")
+        st.markdown("---")
+
+        # 🔗 4. Correlação entre ativos (retornos diários)
+        st.markdown("### 🔗 4. Correlação entre Ativos")
+        try:
+            selected_assets = st.multiselect(
+                "Ativos comparados:", options=assets.assets, default=assets.assets, key="correlation_assets"
             )
-            st.plotly_chart(fig, use_container_width=True)
-    except Exception as e:
-        st.error(f"Erro ao carregar comparação com Ativos Tradicionais: {e}")
-    st.markdown("---")
+            subset = assets.select(selected_assets)
+            if len(subset.assets) < 2:
+                st.info("Selecione ao menos dois ativos com cotação no período.")
+            else:
+                def build_correlacao_ativos():
+                    fig_corr = px.imshow(
+                        subset.correlation(), x=subset.assets, y=subset.assets,
+                        zmin=-1, zmax=1, color_continuous_scale="RdBu", text_auto=".2f",
+                        title="Correlação dos Retornos Diários"
+                    )
+                    fig_corr.update_layout(height=420, margin=dict(l=20, r=20, t=60, b=20))
+                    return fig_corr
+                fig_corr = cached_figure(
+                    "correlacao_ativos:" + ",".join(subset.assets),
+                    ['prices_btc', 'altcoin_prices', 'traditional_assets_prices'], build_correlacao_ativos
+                )
+                st.plotly_chart(fig_corr, use_container_width=True)
+                # Retorno acumulado de cada ativo até a sua última cotação no período
+                cumulative = pd.DataFrame(subset.cumulative_returns(), columns=subset.assets).ffill().iloc[-1] * 100
+                st.dataframe(
+                    cumulative.rename("Retorno acumulado (%)").rename_axis("Ativo").reset_index().round(2),
+                    hide_index=True
+                )
+        except Exception as e:
+            st.error(f"Erro ao calcular a correlação entre ativos: {e}")
+        st.markdown("---")
     
     
 
 # ==============================================================================
 # ABA 6 - RESUMO GERAL
 # ==============================================================================
-with tab6:
-    # Carrega dados essenciais
-    df_btc = load_data_api("prices_btc")
-    df_global = load_data_api("market_global")
-    df_sentiment = load_data_api("sentiment")
-    df_news = load_data_api("news_events")
-    if df_btc.empty or df_global.empty:
-        st.warning("⚠️ Dados insuficientes para montar o resumo.")
-        st.stop()
-
-    # Ajustes de data
-    df_btc["timestamp"] = pd.to_datetime(df_btc["timestamp"])
-    df_global["timestamp"] = pd.to_datetime(df_global["timestamp"])
-    df_sentiment["timestamp"] = pd.to_datetime(df_sentiment["timestamp"])
-    df_btc_filtered = df_btc[
-        (df_btc["timestamp"] >= start_date) & (df_btc["timestamp"] <= end_date)
-    ].copy()
-    df_global_filtered = df_global[
-        (df_global["timestamp"] >= start_date) & (df_global["timestamp"] <= end_date)
-    ].copy()
-    df_sentiment_filtered = df_sentiment[
-        (df_sentiment["timestamp"] >= start_date) & (df_sentiment["timestamp"] <= end_date)
-    ].copy()
-
-    # MÉTRICAS PRINCIPAIS (3 cards)
-    st.markdown("### 📌 Indicadores Principais")
-    col1, col2, col3 = st.columns(3)
-    # --- Último preço BTC ---
-    last_btc = df_btc_filtered.iloc[-1]["price_usd"]
-    prev_btc = df_btc_filtered.iloc[-2]["price_usd"]
-    delta_btc = last_btc - prev_btc
-
-    col1.metric("Preço BTC (USD)", f"${last_btc:,.0f}", f"{delta_btc:+.0f}")
-
-    # --- Market Cap ---
-    if "total_market_cap" in df_global_filtered.columns:
-        last_mc = df_global_filtered.iloc[-1]["total_market_cap"]
-        prev_mc = df_global_filtered.iloc[-2]["total_market_cap"]
-        delta_mc = last_mc - prev_mc
-        col2.metric("Market Cap Cripto", f"${last_mc/1e12:.2f} T", f"{delta_mc/1e9:+.2f} B")
-    else:
-        col2.info("Sem Market Cap")
-    # --- Dominância BTC ---
-    if "btc_dominance" in df_global_filtered.columns:
-        last_dom = df_global_filtered.iloc[-1]["btc_dominance"]
-        prev_dom = df_global_filtered.iloc[-2]["btc_dominance"]
-        delta_dom = last_dom - prev_dom
-        col3.metric("Dominância BTC", f"{last_dom:.2f} %", f"{delta_dom:+.2f} pts")
-    else:
-        col3.info("Sem Dominância")
-    st.markdown("---")
-
-    # SENTIMENTO DO MERCADO
-    st.markdown("### 😨 Sentimento Atual (Fear & Greed)")
-    if not df_sentiment_filtered.empty:
-        last_sent = df_sentiment_filtered.iloc[-1]
-        value = last_sent["fear_greed_index"]
-        text = last_sent["sentiment_text"]
-        if value <= 25:
-            emoji, level, color = "😱", "Medo Extremo", "#FF4444"
-        elif value <= 50:
-            emoji, level, color = "😟", "Medo", "#FFAA00"
-        elif value <= 75:
-            emoji, level, color = "🙂", "Ganância", "#33FF66"
-        else:
-            emoji, level, color = "🚀", "Ganância Extrema", "#00FF99"
-        st.markdown(
-            f"""
-            <div style='background-color:{color}22; border-left:6px solid {color};
-                border-radius:8px; padding:12px;'>
-                <h3 style='color:{color};'>{emoji} {level}</h3>
-                <p style='color:white'>
-                    Índice atual: <b>{value}</b> <br>
-                    Interpretação: <b>{text}</b>
-                </p>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
-    st.markdown("---")
-
-    # MINI GRÁFICOS (Sparkline) — Preço, Dominância, Volume
-    st.markdown("### 📈 Mini Gráficos Rápidos")
-    colA, colB, colC = st.columns(3)
-    # Preço BTC
-    with colA:
-        fig_price = px.line(
-            df_btc_filtered.tail(50),
-            x="timestamp", y="price_usd",
-            title="Preço BTC (Últimos dias)"
-        )
-        fig_price.update_layout(height=250, margin=dict(l=10, r=10, t=40, b=10))
-        st.plotly_chart(fig_price, use_container_width=True)
-    # Dominância
-    with colB:
-        if "btc_dominance" in df_global_filtered.columns:
-            fig_dom = px.line(
-                df_global_filtered.tail(50),
-                x="timestamp", y="btc_dominance",
-                title="Dominância BTC"
+if tab6.open:
+    with tab6, perf.section("tab6"):
+        # Dados essenciais, já com datas convertidas e filtradas
+        df_btc_filtered = data.prices
+        df_global_filtered = data.market
+        df_sentiment_filtered = data.sentiment
+        df_news = data.news
+        if df_btc_filtered.empty or df_global_filtered.empty:
+            st.warning("⚠️ Dados insuficientes para montar o resumo.")
+            st.stop()
+
+        # MÉTRICAS PRINCIPAIS (3 cards)
+        st.markdown("### 📌 Indicadores Principais")
+        col1, col2, col3 = st.columns(3)
+        # --- Último preço BTC ---
+        kpi_btc = analytics.last_change(df_btc_filtered["price_usd"], version=(data.version('prices_btc'), 'price_usd'))
+        last_btc, delta_btc = kpi_btc["latest"], kpi_btc["delta"]
+
+        col1.metric("Preço BTC (USD)", f"${last_btc:,.0f}", f"{delta_btc:+.0f}")
+
+        # --- Market Cap ---
+        if "total_market_cap" in df_global_filtered.columns:
+            kpi_mc = analytics.last_change(
+                df_global_filtered["total_market_cap"], version=(data.version('market_global'), 'total_market_cap')
             )
-            fig_dom.update_layout(height=250, margin=dict(l=10, r=10, t=40, b=10))
-            st.plotly_chart(fig_dom, use_container_width=True)
+            last_mc, delta_mc = kpi_mc["latest"], kpi_mc["delta"]
+            col2.metric("Market Cap Cripto", f"${last_mc/1e12:.2f} T", f"{delta_mc/1e9:+.2f} B")
         else:
-            st.info("Sem dados de dominância.")
-
-    # Volume
-    with colC:
-        if "total_volume" in df_global_filtered.columns:
-            fig_vol = px.area(
-                df_global_filtered.tail(50),
-                x="timestamp", y="total_volume",
-                title="Volume de Mercado"
+            col2.info("Sem Market Cap")
+        # --- Dominância BTC ---
+        if "btc_dominance" in df_global_filtered.columns:
+            kpi_dom = analytics.last_change(
+                df_global_filtered["btc_dominance"], version=(data.version('market_global'), 'btc_dominance')
             )
-            fig_vol.update_layout(height=250, margin=dict(l=10, r=10, t=40, b=10))
-            st.plotly_chart(fig_vol, use_container_width=True)
+            last_dom, delta_dom = kpi_dom["latest"], kpi_dom["delta"]
+            col3.metric("Dominância BTC", f"{last_dom:.2f} %", f"{delta_dom:+.2f} pts")
         else:
-            st.info("Sem volume.")
-    st.markdown("---")
-
-    # NOTÍCIAS RECENTES
-    st.markdown("### 📰 Últimas Notícias")
-    if not df_news.empty:
-        df_news["date"] = pd.to_datetime(df_news["date"])
-        df_news = df_news.sort_values("date", ascending=False).head(5)
-        for _, row in df_news.iterrows():
+            col3.info("Sem Dominância")
+        st.markdown("---")
+
+        # SENTIMENTO DO MERCADO
+        st.markdown("### 😨 Sentimento Atual (Fear & Greed)")
+        if not df_sentiment_filtered.empty:
+            last_sent = df_sentiment_filtered.iloc[-1]
+            value = last_sent["fear_greed_index"]
+            text = last_sent["sentiment_text"]
+            if value <= 25:
+                emoji, level, color = "😱", "Medo Extremo", "#FF4444"
+            elif value <= 50:
+                emoji, level, color = "😟", "Medo", "#FFAA00"
+            elif value <= 75:
+                emoji, level, color = "🙂", "Ganância", "#33FF66"
+            else:
+                emoji, level, color = "🚀", "Ganância Extrema", "#00FF99"
             st.markdown(
                 f"""
-                <div style='background-color:#2d2d2d; padding:10px; margin-bottom:10px;
-                    border-radius:8px;'>
-                    <b style='color:#00BFFF'>{row['source'].upper()}</b><br>
-                    <a href='{row['link']}' style='color:#FFD700' target='_blank'>
-                        {row['headline']}
-                    </a><br>
-                    <span style='color:#ccc'>📅 {row['date'].strftime('%d/%m/%Y')}</span>
+                <div style='background-color:{color}22; border-left:6px solid {color};
+                    border-radius:8px; padding:12px;'>
+                    <h3 style='color:{color};'>{emoji} {level}</h3>
+                    <p style='color:white'>
+                        Índice atual: <b>{value}</b> <br>
+                        Interpretação: <b>{text}</b>
+                    </p>
                 </div>
                 """,
                 unsafe_allow_html=True
             )
-    else:
-        st.info("Nenhuma notícia disponível.")
-    st.markdown("---")
-    st.success("Resumo completo carregado com sucesso!")
-    
-            
-    
\ No newline at end of file
+        st.markdown("---")
+
+        # MINI GRÁFICOS (Sparkline) — Preço, Dominância, Volume
+        st.markdown("### 📈 Mini Gráficos Rápidos")
+        colA, colB, colC = st.columns(3)
+        df_btc_spark = rollups.to_frame(data.prices_rollup)
+        df_global_spark = rollups.to_frame(data.market_rollup)
+        # Preço BTC
+        with colA:
+            def build_mini_preco():
+                fig_price = px.line(
+                    df_btc_spark.tail(50),
+                    x="timestamp", y="price_usd",
+                    title="Preço BTC (Últimos dias)"
+                )
+                fig_price.update_layout(height=250, margin=dict(l=10, r=10, t=40, b=10))
+                return fig_price
+            fig_price = cached_figure("mini_preco", ['prices_btc'], build_mini_preco)
+            st.plotly_chart(fig_price, use_container_width=True)
+        # Dominância
+        with colB:
+            if "btc_dominance" in df_global_spark.columns:
+                def build_mini_dominancia():
+                    fig_dom = px.line(
+                        df_global_spark.tail(50),
+                        x="timestamp", y="btc_dominance",
+                        title="Dominância BTC"
+                    )
+                    fig_dom.update_layout(height=250, margin=dict(l=10, r=10, t=40, b=10))
+                    return fig_dom
+                fig_dom = cached_figure("mini_dominancia", ['market_global'], build_mini_dominancia)
+                st.plotly_chart(fig_dom, use_container_width=True)
+            else:
+                st.info("Sem dados de dominância.")
+
+        # Volume
+        with colC:
+            if "total_volume" in df_global_spark.columns:
+                def build_mini_volume():
+                    fig_vol = px.area(
+                        df_global_spark.tail(50),
+                        x="timestamp", y="total_volume",
+                        title="Volume de Mercado"
+                    )
+                    fig_vol.update_layout(height=250, margin=dict(l=10, r=10, t=40, b=10))
+                    return fig_vol
+                fig_vol = cached_figure("mini_volume", ['market_global'], build_mini_volume)
+                st.plotly_chart(fig_vol, use_container_width=True)
+            else:
+                st.info("Sem volume.")
+        st.markdown("---")
+
+        # NOTÍCIAS RECENTES
+        st.markdown("### 📰 Últimas Notícias")
+        if not df_news.empty:
+            for _, row in df_news.head(5).iterrows():
+                st.markdown(
+                    f"""
+                    <div style='background-color:#2d2d2d; padding:10px; margin-bottom:10px;
+                        border-radius:8px;'>
+                        <b style='color:#00BFFF'>{row['source'].upper()}</b><br>
+                        <a href='{row['link']}' style='color:#FFD700' target='_blank'>
+                            {row['headline']}
+                        </a><br>
+                        <span style='color:#ccc'>📅 {row['date'].strftime('%d/%m/%Y')}</span>
+                    </div>
+                    """,
+                    unsafe_allow_html=True
+                )
+        else:
+            st.info("Nenhuma notícia disponível.")
+        st.markdown("---")
+
+        # RELATÓRIO EM PDF (montado em segundo plano; o painel só acompanha o progresso)
+        st.markdown("### 📄 Relatório em PDF")
+        report_figures = {"price": (figure_key("mini_preco", ['prices_btc']), fig_price)}
+        if "btc_dominance" in df_global_spark.columns:
+            report_figures["dom"] = (figure_key("mini_dominancia", ['market_global']), fig_dom)
+        if "total_volume" in df_global_spark.columns:
+            report_figures["vol"] = (figure_key("mini_volume", ['market_global']), fig_vol)
+        report_key = (data.version('prices_btc', 'market_global', 'sentiment', 'news_events'), selected_period)
+        if st.button("Gerar relatório", key="weekly_report_button"):
+            st.session_state["weekly_report_job"] = weekly_report.submit(
+                report_key,
+                frames={"btc": df_btc_filtered, "global": df_global_filtered,
+                        "sentiment": df_sentiment_filtered, "news": df_news},
+                figures=report_figures,
+            )
+        report_job = st.session_state.get("weekly_report_job")
+
+        # Enquanto o relatório é montado, só este fragmento se reexecuta
+        @st.fragment(run_every=1 if report_job is not None and not report_job.done else None)
+        def report_status():
+            if report_job is None:
+                return
+            if not report_job.done:
+                st.progress(report_job.progress, text=report_job.stage)
+            elif report_job.error:
+                st.error(f"Falha ao gerar o relatório: {report_job.error}")
+            elif report_job.key != report_key:
+                st.info("Há dados novos desde o último relatório. Gere novamente para atualizá-lo.")
+            if report_job.done and not report_job.error:
+                if report_job.extension != "pdf":
+                    st.caption("pdfkit/wkhtmltopdf indisponível: relatório entregue em HTML.")
+                st.download_button(
+                    f"Baixar relatório ({report_job.extension.upper()})", report_job.content,
+                    file_name=f"relatorio_semanal_{datetime.now(timezone.utc):%Y%m%d}.{report_job.extension}",
+                    mime=report_job.mime, key="weekly_report_download"
+                )
+            # Concluído durante a sondagem: reexecuta o app para encerrar o run_every
+            if report_job.done and st.session_state.get("weekly_report_polling"):
+                st.session_state["weekly_report_polling"] = False
+                st.rerun()
+            st.session_state["weekly_report_polling"] = not report_job.done
+        report_status()
+        st.markdown("---")
+        st.success("Resumo completo carregado com sucesso!")
+
+
+# ==============================================================================
+# DIAGNÓSTICO DE DESEMPENHO (barra lateral)
+# ==============================================================================
+if show_diagnostics:
+    events = perf.events()
+    with st.sidebar.expander("🩺 Diagnóstico desta execução", expanded=True):
+        # Totais por categoria (busca, cache, carga, transformação, figura, aba)
+        st.dataframe(pd.DataFrame(perf.summary(events)).round(1), hide_index=True)
+        # Spans mais demorados
+        slowest = sorted(events, key=lambda e: -e["dur"])[:15]
+        st.dataframe(pd.DataFrame([{
+            "span": e["name"], "categoria": e["cat"], "ms": round(e["dur"] / 1000, 1),
+            "linhas": e["args"].get("rows"), "cache": e["args"].get("cache"),
+        } for e in slowest]), hide_index=True)
+        st.download_button(
+            "Exportar JSON", json.dumps({"sections": st.session_state["perf_report"], "events": events}, default=str),
+            file_name="diagnostico.json", mime="application/json"
+        )
+        st.download_button(
+            "Exportar Chrome trace", perf.to_chrome_trace(events),
+            file_name="trace.json", mime="application/json"
+        )
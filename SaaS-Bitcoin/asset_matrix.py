@@ -0,0 +1,130 @@
+"""Matriz diária alinhada de preços (datas × ativos) para os comparativos.
+
+Cada ativo vira uma coluna com o fechamento de cada dia (último valor válido)
+e as linhas são a união das datas de todos os ativos; dias sem cotação (fins
+de semana dos ativos tradicionais, por exemplo) ficam como NaN. Sobre essa
+matriz, base 100, retornos acumulados e a matriz de correlação de qualquer
+subconjunto de ativos são operações vetorizadas únicas, sem melt, merge ou
+groupby por símbolo.
+"""
+import numpy as np
+import pandas as pd
+
+import analytics
+
+
+def daily_close(times, values):
+    """Datas e fechamentos diários (último valor válido do dia) de uma série em ordem de tempo."""
+    times = np.asarray(times, dtype="datetime64[ns]")
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values) & ~np.isnat(times)
+    days = times[valid].astype("datetime64[D]")
+    values = values[valid]
+    if len(days) == 0:
+        return days, values
+    last = np.append(np.flatnonzero(days[1:] != days[:-1]), len(days) - 1)
+    return days[last], values[last]
+
+
+class AssetMatrix:
+    """Preços diários alinhados: 'values' tem uma linha por data e uma coluna por ativo."""
+
+    def __init__(self, dates: np.ndarray, assets: list, values: np.ndarray):
+        self.dates = dates
+        self.assets = list(assets)
+        self.values = values
+
+    @classmethod
+    def build(cls, series: dict) -> "AssetMatrix":
+        """Matriz a partir de {ativo: (tempos, valores)}, cada série em ordem de tempo."""
+        closes = {name: daily_close(times, values) for name, (times, values) in series.items()}
+        if closes:
+            dates = np.unique(np.concatenate([days for days, _ in closes.values()]))
+        else:
+            dates = np.array([], dtype="datetime64[D]")
+        values = np.full((len(dates), len(closes)), np.nan)
+        for j, (days, close) in enumerate(closes.values()):
+            values[np.searchsorted(dates, days), j] = close
+        return cls(dates, list(closes), values)
+
+    def select(self, assets) -> "AssetMatrix":
+        """Subconjunto dos ativos pedidos que têm cotação, sem as datas vazias."""
+        columns = [self.assets.index(a) for a in assets if a in self.assets]
+        values = self.values[:, columns]
+        present = ~np.isnan(values).all(axis=0)
+        values = values[:, present]
+        rows = ~np.isnan(values).all(axis=1)
+        return AssetMatrix(self.dates[rows], [self.assets[c] for c, keep in zip(columns, present) if keep], values[rows])
+
+    def base100(self) -> np.ndarray:
+        """Cada coluna dividida pelo seu primeiro valor válido, × 100."""
+        valid = ~np.isnan(self.values)
+        first = valid.argmax(axis=0)
+        initial = self.values[first, np.arange(self.values.shape[1])]
+        return self.values / initial * 100
+
+    def cumulative_returns(self) -> np.ndarray:
+        """Retorno acumulado (fração) desde a primeira cotação de cada ativo."""
+        return self.base100() / 100 - 1
+
+    def returns(self) -> np.ndarray:
+        """Variação diária (fração) de cada ativo em relação ao fechamento válido anterior.
+
+        Dias sem cotação não quebram a série: a segunda-feira de um ativo
+        tradicional é comparada com a sexta. O dia sem cotação fica NaN.
+        """
+        valid = ~np.isnan(self.values)
+        rows = np.where(valid, np.arange(len(self.values))[:, None], 0)
+        previous = self.values[np.maximum.accumulate(rows, axis=0), np.arange(self.values.shape[1])]
+        return self.values[1:] / previous[:-1] - 1
+
+    def correlation(self) -> np.ndarray:
+        """Correlação de Pearson dos retornos diários entre todos os pares de ativos.
+
+        Cada par usa só os dias em que os dois têm retorno, como
+        analytics.correlation; todas as somas saem de produtos de matrizes.
+        """
+        returns = self.returns()
+        mask = ~np.isnan(returns)
+        m = mask.astype(np.float64)
+        # Centralizar antes das somas evita cancelamento numérico
+        x = np.where(mask, returns, 0.0)
+        x = np.where(mask, x - x.sum(axis=0) / np.maximum(m.sum(axis=0), 1), 0.0)
+        n = m.T @ m
+        sx = x.T @ m
+        sxx = (x * x).T @ m
+        sxy = x.T @ x
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = n * sxy - sx * sx.T
+            var = (n * sxx - sx * sx) * (n * sxx - sx * sx).T
+            corr = cov / np.sqrt(var)
+        corr[(n < 2) | ~np.isfinite(corr)] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+    def to_long(self, values: np.ndarray, value_name: str, date_name: str = "date",
+                asset_name: str = "symbol") -> pd.DataFrame:
+        """Formato longo para o Plotly (ativo a ativo, em ordem de data), sem os NaN."""
+        columns, rows = np.nonzero(~np.isnan(values.T))
+        return pd.DataFrame({
+            date_name: self.dates[rows].astype("datetime64[ns]"),
+            asset_name: np.asarray(self.assets, dtype=object)[columns],
+            value_name: values[rows, columns],
+        })
+
+
+@analytics.memoize_by_version
+def comparison_matrix(btc: pd.DataFrame, altcoins: pd.DataFrame, traditional: pd.DataFrame) -> AssetMatrix:
+    """Matriz da Aba 5: BTC, altcoins (colunas '<símbolo>_usd') e ativos tradicionais ('symbol')."""
+    series = {}
+    if not btc.empty:
+        series["BTC"] = (btc["timestamp"], btc["price_usd"])
+    if not altcoins.empty:
+        for column in altcoins.columns:
+            if column.endswith("_usd"):
+                series[column.split("_")[0].upper()] = (altcoins["timestamp"], altcoins[column])
+    if not traditional.empty:
+        codes, symbols = pd.factorize(traditional["symbol"], sort=True)
+        for code, symbol in enumerate(symbols):
+            rows = codes == code
+            series[str(symbol)] = (traditional["timestamp"].to_numpy()[rows], traditional["price"].to_numpy()[rows])
+    return AssetMatrix.build(series)
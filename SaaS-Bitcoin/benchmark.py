@@ -0,0 +1,166 @@
+"""Benchmark do dashboard em escala, sem navegador e sem o Supabase real.
+
+Para cada tamanho de base sintética (ver local_supabase) o app é executado
+com o AppTest do Streamlit em um subprocesso próprio, para que o pico de
+memória de um tamanho não contamine o seguinte. Em cada período da barra
+lateral são medidas uma execução fria (primeira vez do período) e uma quente
+(reexecução), com tempo total, pico de RSS e, por aba, segundos, linhas
+lidas e variação de RSS (relatório de perf). Como o app só executa a aba
+aberta, cada medida abre as seis abas em sequência e soma as execuções. O
+resultado é gravado em JSON; com --baseline os tempos são comparados a uma
+execução anterior e o processo sai com código 1 se alguma medida piorar além
+do limite.
+
+Exemplos:
+    python benchmark.py --sizes 10000 100000 1000000 --output bench.json
+    python benchmark.py --baseline bench.json --threshold 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_PERIODS = ["Últimas 24 Horas", "Últimos 7 Dias", "Últimos 30 Dias", "Últimos 90 Dias"]
+# Piora relativa tolerada antes de acusar regressão (0.2 = 20%)
+DEFAULT_THRESHOLD = 0.2
+# Tempos abaixo disto (segundos) são ruído e não entram na comparação
+MIN_SECONDS = 0.05
+# Rótulos das abas do app (st.session_state["active_tab"])
+TABS = ["Visão Geral", "Preço e Tendências", "Adoção e Uso", "Sentimento e Notícias", "Comparativos",
+        "Relatório Semanal"]
+
+
+def run_worker(rows: int, periods: list) -> list:
+    """Executa o app no processo atual (subprocesso do benchmark) e mede cada período."""
+    from streamlit.testing.v1 import AppTest
+
+    import perf
+
+    results = []
+    app = AppTest.from_file(APP_PATH, default_timeout=3600)
+    for index, period in enumerate(periods):
+        for run in ("cold", "warm"):
+            if index == 0 and run == "cold":
+                # A primeira execução usa o período padrão; seleciona o pedido em seguida
+                app.run()
+            if app.sidebar.selectbox[0].value != period:
+                app.sidebar.selectbox[0].select(period)
+            start = time.perf_counter()
+            report, exceptions = {}, []
+            for tab in TABS:
+                app.session_state["active_tab"] = tab
+                app.run()
+                exceptions += [str(e.value) for e in app.exception]
+                sections = app.session_state["perf_report"] if "perf_report" in app.session_state else {}
+                for name, entry in sections.items():
+                    # A carga acontece em todas as abas: soma as execuções
+                    total = report.setdefault(name, {"seconds": 0.0, "rows": 0, "rss_delta_mb": None})
+                    total["seconds"] += entry["seconds"]
+                    total["rows"] += entry["rows"]
+                    if entry.get("rss_delta_mb") is not None:
+                        total["rss_delta_mb"] = (total["rss_delta_mb"] or 0.0) + entry["rss_delta_mb"]
+            wall = time.perf_counter() - start
+            results.append({
+                "rows": rows,
+                "period": period,
+                "run": run,
+                "wall_s": round(wall, 4),
+                "peak_rss_mb": perf.peak_rss_mb(),
+                "exceptions": exceptions,
+                "sections": report,
+            })
+    return results
+
+
+def run_size(rows: int, periods: list) -> list:
+    """Roda um tamanho num subprocesso isolado, com cache em disco temporário."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, SAAS_BTC_LOCAL_ROWS=str(rows), SAAS_BTC_CACHE_DIR=cache_dir)
+        command = [sys.executable, os.path.abspath(__file__), "--worker", "--sizes", str(rows), "--periods", *periods]
+        completed = subprocess.run(command, env=env, capture_output=True, text=True,
+                                   cwd=os.path.dirname(APP_PATH))
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark com {rows} linhas falhou:\n{completed.stderr[-4000:]}")
+    # O JSON é a última linha da saída (o Streamlit pode escrever avisos antes)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _measures(results: list) -> dict:
+    """Achata os resultados em {(linhas, período, execução, medida): segundos}."""
+    flat = {}
+    for result in results:
+        base = (result["rows"], result["period"], result["run"])
+        flat[base + ("wall_s",)] = result["wall_s"]
+        for name, entry in result["sections"].items():
+            flat[base + (name,)] = entry["seconds"]
+    return flat
+
+
+def compare(results: list, baseline: list, threshold: float) -> list:
+    """Medidas que pioraram mais que 'threshold' em relação ao baseline."""
+    current, previous = _measures(results), _measures(baseline)
+    regressions = []
+    for key, seconds in current.items():
+        before = previous.get(key)
+        if before is None or max(before, seconds) < MIN_SECONDS:
+            continue
+        if seconds > before * (1 + threshold):
+            rows, period, run, measure = key
+            regressions.append({
+                "rows": rows, "period": period, "run": run, "measure": measure,
+                "baseline_s": before, "current_s": seconds, "ratio": round(seconds / before, 3),
+            })
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="linhas de prices_btc em cada cenário (10 mil a 50 milhões)")
+    parser.add_argument("--periods", nargs="+", default=DEFAULT_PERIODS, help="períodos da barra lateral")
+    parser.add_argument("--output", default="benchmark.json", help="arquivo JSON de saída")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="piora relativa tolerada (0.2 = 20%%)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_worker(args.sizes[0], args.periods), ensure_ascii=False))
+        return 0
+
+    results = []
+    for rows in args.sizes:
+        print(f"Executando com {rows:,} linhas...", file=sys.stderr)
+        results.extend(run_size(rows, args.periods))
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "threshold": args.threshold,
+        "results": results,
+    }
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        report["regressions"] = compare(results, baseline, args.threshold)
+        for item in report["regressions"]:
+            print(f"REGRESSÃO {item['rows']:,} linhas | {item['period']} | {item['run']} | {item['measure']}: "
+                  f"{item['baseline_s']:.3f}s -> {item['current_s']:.3f}s", file=sys.stderr)
+        status = 1 if report["regressions"] else 0
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {args.output}", file=sys.stderr)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
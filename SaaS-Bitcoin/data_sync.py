@@ -0,0 +1,388 @@
+"""Sincronização incremental das tabelas do Supabase usadas pelo dashboard.
+
+Cada tabela (janela de tempo e colunas pedidas) é baixada apenas na primeira
+vez. Depois disso o módulo guarda o DataFrame acumulado e a última marca de
+tempo vista (watermark) e, a cada atualização, pede ao Supabase só as linhas
+posteriores a essa marca, anexando-as ao que já está em memória. O histórico
+também é persistido em disco (ver disk_cache), então um servidor recém-iniciado
+parte do que já foi baixado antes.
+"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import disk_cache
+import perf
+import rollups
+
+
+# Coluna usada como watermark de cada tabela (padrão: 'timestamp')
+SYNC_COLUMNS = {
+    "prices_btc": "timestamp",
+    "market_global": "timestamp",
+    "sentiment": "timestamp",
+    "news_events": "date",
+    "altcoin_prices": "timestamp",
+}
+
+# Colunas efetivamente usadas pelo dashboard em cada tabela (select projetado)
+TABLE_COLUMNS = {
+    "prices_btc": ["timestamp", "price_usd", "price_brl"],
+    "market_global": ["timestamp", "total_market_cap", "total_volume", "btc_dominance"],
+    "sentiment": ["timestamp", "fear_greed_index", "sentiment_text"],
+    "news_events": ["date", "headline", "source", "link"],
+    "altcoin_prices": ["timestamp", "eth_usd", "bnb_usd", "usdt_usd"],
+    "traditional_assets_prices": ["timestamp", "symbol", "price_usd"],
+}
+
+# Tipos declarados de cada tabela, impostos na carga (apply_schema): float64 para
+# o preço do BTC e os totais de mercado (escala e diferenças pedem precisão),
+# float32 para índices limitados e ativos secundários, categorias para textos
+# repetidos e tempos como datetime64[ns, UTC]. Colunas fora daqui ficam como vieram.
+TIME_DTYPE = "datetime64[ns, UTC]"
+SCHEMAS = {
+    "prices_btc": {"timestamp": TIME_DTYPE, "price_usd": "float64", "price_brl": "float64"},
+    "market_global": {"timestamp": TIME_DTYPE, "total_market_cap": "float64", "total_volume": "float64",
+                      "btc_dominance": "float32"},
+    "sentiment": {"timestamp": TIME_DTYPE, "fear_greed_index": "float32", "sentiment_text": "category"},
+    "news_events": {"date": TIME_DTYPE, "source": "category"},
+    "altcoin_prices": {"timestamp": TIME_DTYPE, "eth_usd": "float32", "bnb_usd": "float32", "usdt_usd": "float32"},
+    "traditional_assets_prices": {"timestamp": TIME_DTYPE, "symbol": "category", "price_usd": "float32"},
+}
+
+# Colunas que identificam uma linha no cache em disco (padrão: a coluna de watermark);
+# notícias podem repetir o instante
+UNIQUE_COLUMNS = {"news_events": ["date", "link"]}
+
+# Tabelas que mantêm agregados OHLC (ver rollups) junto com o histórico
+ROLLUP_TABLES = {"prices_btc", "market_global"}
+
+# Paginação: limite padrão de linhas por resposta do PostgREST no Supabase
+# e número máximo de páginas buscadas ao mesmo tempo
+PAGE_SIZE = 1000
+MAX_WORKERS = 4
+
+# Estado por processo: {(tabela, colunas): {"df": DataFrame, "low": início carregado,
+#                                          "watermark": str | None, "rollups": {resolução: DataFrame} | None}}
+_store = {}
+_locks = {}
+_lock = threading.Lock()
+
+
+def sync_column(table_name: str) -> str:
+    """Retorna a coluna de ordenação/watermark da tabela."""
+    return SYNC_COLUMNS.get(table_name, "timestamp")
+
+
+def source_id(client) -> str:
+    """Identifica a origem dos dados (backend e banco), separando o cache em disco de cada uma.
+
+    Clientes do app expõem 'source_id' (ver pg_backend e local_supabase); o
+    cliente do Supabase é identificado pela URL do projeto.
+    """
+    source = getattr(client, "source_id", None)
+    if source:
+        return str(source)
+    url = getattr(client, "supabase_url", None)
+    if url:
+        return f"supabase:{url}"
+    return type(client).__name__
+
+
+def _table_lock(key) -> threading.Lock:
+    """Um lock por tabela, para que tabelas diferentes sincronizem em paralelo."""
+    with _lock:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def normalize_timestamps(df: pd.DataFrame) -> pd.DataFrame:
+    """Converte a coluna 'timestamp' para datetime e garante o fuso UTC."""
+    if 'timestamp' in df.columns:
+        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+        # Se o Pandas ainda não souber o fuso horário, força UTC para combinar com os filtros
+        if df['timestamp'].dt.tz is None:
+            df['timestamp'] = df['timestamp'].dt.tz_localize('UTC')
+    return df
+
+
+def apply_schema(df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+    """Converte as colunas da tabela para os tipos de SCHEMAS (as que já estão certas não são tocadas).
+
+    Valores inválidos viram NaN/NaT. Após um concat, categorias com
+    dicionários diferentes voltam a ser uma única categoria.
+    """
+    converted = {}
+    for column, dtype in SCHEMAS.get(table_name, {}).items():
+        if column not in df.columns or df[column].dtype == dtype:
+            continue
+        if dtype == TIME_DTYPE:
+            converted[column] = pd.to_datetime(df[column], errors="coerce", utc=True).dt.as_unit("ns")
+        elif dtype == "category":
+            converted[column] = df[column].astype("category")
+        else:
+            converted[column] = pd.to_numeric(df[column], errors="coerce").astype(dtype)
+    return df.assign(**converted) if converted else df
+
+
+def _watermark(df: pd.DataFrame, column: str):
+    """Maior valor da coluna de watermark, já no formato aceito pelo filtro do Supabase."""
+    if df.empty or column not in df.columns:
+        return None
+    value = df[column].max()
+    if pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return str(value)
+
+
+def normalize_window(start, end, now=None):
+    """Arredonda a janela de tempo para servir de chave estável de cache.
+
+    O início é truncado para a hora cheia. Um fim dentro da última hora (o
+    "agora" dos filtros da barra lateral) vira None, isto é, janela aberta que
+    acompanha a sincronização incremental.
+    """
+    now = now or pd.Timestamp.now(tz='UTC')
+    if start is not None:
+        start = pd.Timestamp(start).floor('h')
+    if end is not None:
+        end = pd.Timestamp(end)
+        end = None if end >= now - pd.Timedelta(hours=1) else end.ceil('h')
+    return start, end
+
+
+def fetch_paginated(make_query, convert=normalize_timestamps, page_size: int = PAGE_SIZE,
+                    max_workers: int = MAX_WORKERS) -> pd.DataFrame:
+    """Busca todas as linhas de uma consulta em páginas paralelas e as une num DataFrame.
+
+    'make_query(count=...)' deve devolver uma consulta nova e já ordenada a cada
+    chamada. A primeira página traz também a contagem total; as demais são
+    pedidas com .range() em um pool limitado de threads. Se a resposta vier sem
+    contagem, as páginas são pedidas uma após a outra até chegar uma página
+    curta. 'convert' é aplicada a cada página assim que ela chega, antes da
+    concatenação. Com rastreamento ativo (ver perf), linhas, páginas e bytes do
+    JSON recebido são anotados no span aberto.
+    """
+    measure = perf.tracing()
+    first = make_query(count="exact").range(0, page_size - 1).execute()
+    rows = len(first.data)
+    total = first.count
+    # O servidor pode ter um limite (max-rows) menor que page_size
+    if 0 < rows < page_size and (total is None or total > rows):
+        page_size = rows
+
+    def payload(data):
+        return len(json.dumps(data, default=str)) if measure else 0
+
+    def fetch_page(offset):
+        response = make_query().range(offset, offset + page_size - 1).execute()
+        return convert(pd.DataFrame(response.data)), payload(response.data)
+
+    pages = [(convert(pd.DataFrame(first.data)), payload(first.data))]
+    if total is None:
+        # Sem contagem não há como dividir o trabalho: segue até uma página curta
+        offset, received = rows, rows
+        while received == page_size and received:
+            response = make_query().range(offset, offset + page_size - 1).execute()
+            received = len(response.data)
+            pages.append((convert(pd.DataFrame(response.data)), payload(response.data)))
+            offset += received
+    else:
+        offsets = range(page_size, total, page_size) if rows else []
+        if offsets:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(offsets))) as pool:
+                pages.extend(pool.map(fetch_page, offsets))
+    frames = [f for f, _ in pages]
+    frames = [f for f in frames if not f.empty] or frames[:1]
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    perf.annotate(rows=len(df), pages=len(pages), bytes=sum(size for _, size in pages))
+    return df
+
+
+def _query(client, table_name: str, columns, column: str, gte=None, gt=None, lt=None, lte=None):
+    """Executa o select projetado, filtrado e ordenado no Supabase (paginado).
+
+    Clientes com fetch_frame() (conexão direta ao Postgres) recebem a mesma
+    consulta e devolvem o DataFrame pronto.
+    """
+    filters = {name: str(value) for name, value in (("gte", gte), ("gt", gt), ("lt", lt), ("lte", lte))
+               if value is not None}
+    if hasattr(client, "fetch_frame"):
+        # Conexão direta ao Postgres (ver pg_backend): COPY para DataFrame, sem JSON nem páginas
+        with perf.span(f"postgres {table_name}", "fetch", table=table_name, **filters):
+            return apply_schema(client.fetch_frame(table_name, columns, column, **filters), table_name)
+    def make_query(count=None):
+        query = client.table(table_name).select(",".join(columns) if columns else "*", count=count)
+        for method, value in (("gte", gte), ("gt", gt), ("lt", lt), ("lte", lte)):
+            if value is not None:
+                value = value.isoformat() if isinstance(value, pd.Timestamp) else value
+                query = getattr(query, method)(column, value)
+        return query.order(column)
+    with perf.span(f"supabase {table_name}", "fetch", table=table_name, **filters):
+        return apply_schema(fetch_paginated(make_query), table_name)
+
+
+def fetch_window(client, table_name: str, columns=None, start=None, after=None) -> pd.DataFrame:
+    """Linhas a partir de 'start' (inclusive) ou posteriores a 'after', direto da origem.
+
+    Não usa nem altera o histórico em memória; serve a quem mantém a própria
+    cópia das tabelas (ver local_store).
+    """
+    column = sync_column(table_name)
+    start = pd.Timestamp(start) if start is not None else None
+    after = after.isoformat() if isinstance(after, pd.Timestamp) else after
+    return _query(client, table_name, tuple(columns) if columns else None, column, gte=start, gt=after)
+
+
+def latest_rows(client, table_name: str, columns=None, n: int = 2) -> pd.DataFrame:
+    """As 'n' linhas mais recentes da tabela, em ordem crescente, numa única consulta mínima.
+
+    Não passa pelo histórico sincronizado: serve aos cartões atualizados ao
+    vivo, que só precisam do último valor e do anterior.
+    """
+    column = sync_column(table_name)
+    with perf.span(f"últimas linhas {table_name}", "fetch", table=table_name, rows=n):
+        if hasattr(client, "fetch_frame"):
+            df = client.fetch_frame(table_name, columns, column, desc=True, limit=n)
+        else:
+            response = (client.table(table_name).select(",".join(columns) if columns else "*")
+                        .order(column, desc=True).limit(n).execute())
+            df = pd.DataFrame(response.data)
+    return apply_schema(df.iloc[::-1].reset_index(drop=True), table_name)
+
+
+def time_slice(df: pd.DataFrame, start=None, end=None, column: str = "timestamp") -> pd.DataFrame:
+    """Recorta [start, end] por busca binária na coluna de tempo, sem criar máscaras.
+
+    A coluna precisa estar em ordem crescente (garantido para as tabelas
+    sincronizadas); o resultado é uma fatia posicional do próprio DataFrame.
+    Colunas que não são datetime não são recortadas.
+    """
+    if df.empty or column not in df.columns or (start is None and end is None):
+        return df
+    times = df[column]
+    if not pd.api.types.is_datetime64_any_dtype(times):
+        return df
+    lo = times.searchsorted(start, side="left") if start is not None else 0
+    hi = times.searchsorted(end, side="right") if end is not None else len(df)
+    return df.iloc[lo:hi]
+
+
+def _sorted(df: pd.DataFrame, column: str) -> pd.DataFrame:
+    """Mantém o histórico ordenado pela coluna de tempo (requisito de time_slice)."""
+    if df.empty or column not in df.columns or not pd.api.types.is_datetime64_any_dtype(df[column]):
+        return df
+    if df[column].is_monotonic_increasing:
+        return df
+    return df.dropna(subset=[column]).sort_values(column, kind="stable", ignore_index=True)
+
+
+def sync_table(client, table_name: str, start=None, end=None, columns=None) -> pd.DataFrame:
+    """Atualiza a tabela em memória com as linhas novas e retorna a janela pedida.
+
+    Apenas as colunas em 'columns' trafegam (select projetado) e a janela vira
+    filtros gte/lte no próprio Supabase. Janelas abertas (end=None) usam o
+    histórico sincronizado: a primeira chamada busca a partir de 'start', as
+    seguintes só as linhas com watermark maior que o último valor visto, e um
+    'start' mais antigo que o já carregado dispara apenas o trecho que falta.
+    Janelas fechadas são históricas e vão direto ao banco.
+    """
+    column = sync_column(table_name)
+    columns = tuple(columns) if columns else None
+    start = pd.Timestamp(start) if start is not None else None
+    if end is not None:
+        return _sorted(_query(client, table_name, columns, column, gte=start, lte=pd.Timestamp(end)), column)
+
+    key = (table_name, columns)
+    # O histórico em disco de uma origem nunca é retomado com outro backend
+    disk_key = (table_name, columns, source_id(client))
+    with _table_lock(key):
+        entry = _store.get(key)
+        if entry is None:
+            # Servidor recém-iniciado: parte do cache em disco, se houver
+            with perf.span(f"disco {table_name}", "cache", table=table_name) as args:
+                cached = disk_cache.load(disk_key, column, UNIQUE_COLUMNS.get(table_name))
+                args.update(cache="miss" if cached is None else "hit", rows=0 if cached is None else len(cached[0]))
+            if cached is not None:
+                df, low, watermark = cached
+                # Caches gravados antes do esquema (ou com outros tipos) são convertidos aqui
+                df = apply_schema(df, table_name)
+                entry = {"df": df, "low": low, "watermark": watermark, "rollups": _build_rollups(table_name, df)}
+        if entry is None:
+            df = _query(client, table_name, columns, column, gte=start)
+            low, watermark = start, _watermark(df, column)
+            aggregates = _build_rollups(table_name, df)
+            disk_cache.save(disk_key, df, low, watermark)
+        else:
+            df, low, watermark = entry["df"], entry["low"], entry["watermark"]
+            previous = watermark
+            aggregates = entry["rollups"]
+            rewrite = False
+            # Trecho anterior ao que já está em memória (período maior selecionado)
+            if low is not None and (start is None or start < low):
+                df_old = _query(client, table_name, columns, column, gte=start, lt=low)
+                if not df_old.empty:
+                    df = apply_schema(pd.concat([df_old, df], ignore_index=True), table_name)
+                    if aggregates is not None:
+                        aggregates = rollups.update_all(aggregates, df_old, older=True)
+                low = start
+                rewrite = True
+            # Linhas novas desde a última sincronização
+            if watermark is not None:
+                df_new = _query(client, table_name, columns, column, gt=watermark)
+            else:
+                df_new = _query(client, table_name, columns, column, gte=low)
+            if not df_new.empty:
+                df = apply_schema(pd.concat([df, df_new], ignore_index=True), table_name) if not df.empty else df_new
+                if aggregates is not None:
+                    aggregates = rollups.update_all(aggregates, df_new)
+            watermark = _watermark(df, column) or watermark
+            if rewrite:
+                disk_cache.save(disk_key, df, low, watermark)
+            elif not df_new.empty:
+                # Outro processo pode ter gravado o mesmo delta: append confere a watermark do disco
+                disk_cache.append(disk_key, df, df_new, low, watermark, previous)
+
+        df = _sorted(df, column)
+        _store[key] = {"df": df, "low": low, "watermark": watermark, "rollups": aggregates}
+        return time_slice(df, start, column=column)
+
+
+def _build_rollups(table_name: str, df: pd.DataFrame):
+    if table_name not in ROLLUP_TABLES:
+        return None
+    return rollups.build_all(df)
+
+
+def rollup(table_name: str, resolution: str, start=None, end=None, columns=None) -> pd.DataFrame:
+    """Agregado OHLC da tabela já sincronizada, recortado pela janela (baldes inteiros).
+
+    A tabela precisa ter sido carregada antes por sync_table com as mesmas colunas.
+    """
+    entry = _store.get((table_name, tuple(columns) if columns else None))
+    if entry is None or entry["rollups"] is None:
+        return pd.DataFrame()
+    aggregate = entry["rollups"][resolution]
+    if aggregate.empty:
+        return aggregate
+    start = pd.Timestamp(start).floor(resolution) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    return aggregate.loc[start:end]
+
+
+def reset(table_name: str = None, disk: bool = False) -> None:
+    """Descarta o estado sincronizado (de uma tabela ou de todas), forçando nova carga completa.
+
+    Com disk=True apaga também o cache em disco.
+    """
+    if disk:
+        disk_cache.clear(table_name)
+    with _lock:
+        if table_name is None:
+            _store.clear()
+        else:
+            for key in [k for k in _store if k[0] == table_name]:
+                del _store[key]
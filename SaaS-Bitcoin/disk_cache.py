@@ -0,0 +1,203 @@
+"""Cache local em disco (Arrow IPC) das tabelas sincronizadas.
+
+Cada tabela sincronizada ganha um diretório com segmentos Arrow e um
+'meta.json' com o início carregado e a watermark, dentro de um diretório por
+origem dos dados (hash do backend e do banco: outro backend nunca retoma o
+histórico e a watermark de um anterior). O diretório base é
+SAAS_BTC_CACHE_DIR ou, sem ele, o cache do usuário (~/.cache/saas-bitcoin). Na partida do servidor os
+segmentos são lidos do disco local e convertidos para um DataFrame (uma cópia
+do histórico, sem parsing), de modo que a primeira renderização depende da
+leitura do disco e não do download do histórico; a sincronização incremental
+só completa o que chegou depois.
+
+Vários processos do app no mesmo host compartilham o diretório: leituras e
+gravações de uma chave passam por um arquivo de lock (criado com O_EXCL), e
+um delta só é anexado se o disco ainda estiver na watermark de onde ele
+partiu; caso contrário a chave é regravada inteira.
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+CACHE_DIR = os.environ.get("SAAS_BTC_CACHE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "saas-bitcoin"
+)
+# Acima deste número de segmentos os deltas são compactados num único arquivo
+MAX_SEGMENTS = 32
+# Espera máxima (s) pelo lock de uma chave; um lock mais velho que LOCK_STALE
+# pertence a um processo que morreu no meio da gravação
+LOCK_WAIT = 30
+LOCK_STALE = 120
+POLL_INTERVAL = 0.05
+
+logger = logging.getLogger(__name__)
+
+
+def _key_dir(key) -> str:
+    """Diretório da chave (tabela, colunas, origem) dentro do cache."""
+    table_name, columns, source = key
+    name = table_name
+    if columns:
+        name += "__" + hashlib.md5(",".join(columns).encode()).hexdigest()[:8]
+    return os.path.join(CACHE_DIR, hashlib.md5(source.encode()).hexdigest()[:12], name)
+
+
+def _segments(path: str) -> list:
+    return sorted(glob.glob(os.path.join(path, "part-*.arrow")))
+
+
+def _write_segment(path: str, index: int, df: pd.DataFrame) -> None:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    target = os.path.join(path, f"part-{index:05d}.arrow")
+    with pa.OSFile(target + ".tmp", "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(target + ".tmp", target)
+
+
+@contextmanager
+def _locked(path: str):
+    """Acesso exclusivo ao diretório da chave entre processos (TimeoutError após LOCK_WAIT)."""
+    os.makedirs(path, exist_ok=True)
+    lock = os.path.join(path, ".lock")
+    deadline = time.monotonic() + LOCK_WAIT
+    while True:
+        try:
+            if time.time() - os.path.getmtime(lock) > LOCK_STALE:
+                os.remove(lock)
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"lock de {path} ocupado há mais de {LOCK_WAIT}s")
+            time.sleep(POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(lock)
+        except FileNotFoundError:
+            pass
+
+
+def _read_meta(path: str):
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_meta(path: str, low, watermark) -> None:
+    meta = {"low": low.isoformat() if low is not None else None, "watermark": watermark}
+    with open(os.path.join(path, "meta.json.tmp"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(os.path.join(path, "meta.json.tmp"), os.path.join(path, "meta.json"))
+
+
+def load(key, column: str = None, unique=None):
+    """Lê (df, low, watermark) do disco, ou None se não houver cache.
+
+    O DataFrame é materializado por inteiro: a sincronização precisa do
+    histórico completo para anexar os deltas. Com 'column' (coluna de tempo),
+    segmentos que não passam da watermark já aplicada pelos anteriores são
+    ignorados e linhas repetidas em 'unique' (padrão: a própria coluna) ficam
+    só na última ocorrência.
+    """
+    path = _key_dir(key)
+    try:
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return None
+        with _locked(path):
+            meta = _read_meta(path)
+            tables = []
+            applied = None
+            for segment in _segments(path):
+                with pa.memory_map(segment, "r") as source:
+                    table = pa.ipc.open_file(source).read_all()
+                if column in table.column_names and table.num_rows:
+                    top = pc.max(table[column]).as_py()
+                    if applied is not None and top is not None and top <= applied:
+                        continue
+                    applied = top if applied is None or (top is not None and top > applied) else applied
+                tables.append(table)
+        if meta is None or not tables:
+            return None
+        df = pa.concat_tables(tables, promote_options="permissive").to_pandas()
+        subset = [c for c in (unique or [column]) if c in df.columns] if column else []
+        if subset:
+            repeated = df.duplicated(subset=subset, keep="last")
+            if repeated.any():
+                df = df[~repeated].reset_index(drop=True)
+        low = pd.Timestamp(meta["low"]) if meta["low"] is not None else None
+        return df, low, meta["watermark"]
+    except Exception as e:
+        logger.warning("Cache em disco de %s ignorado: %s", key[0], e)
+        return None
+
+
+def _save(path: str, df: pd.DataFrame, low, watermark) -> None:
+    for segment in _segments(path):
+        os.remove(segment)
+    _write_segment(path, 0, df)
+    _write_meta(path, low, watermark)
+
+
+def save(key, df: pd.DataFrame, low, watermark) -> None:
+    """Regrava a chave inteira como um único segmento."""
+    path = _key_dir(key)
+    try:
+        with _locked(path):
+            _save(path, df, low, watermark)
+    except Exception as e:
+        logger.warning("Falha ao gravar cache em disco de %s: %s", key[0], e)
+
+
+def append(key, df_full: pd.DataFrame, df_new: pd.DataFrame, low, watermark, previous) -> None:
+    """Grava só as linhas novas como mais um segmento.
+
+    'previous' é a watermark de onde o delta partiu: se o disco já não está
+    nela (outro processo gravou no meio tempo) ou há segmentos demais, a chave
+    é regravada inteira com 'df_full'.
+    """
+    path = _key_dir(key)
+    try:
+        with _locked(path):
+            segments = _segments(path)
+            meta = _read_meta(path)
+            low_text = low.isoformat() if low is not None else None
+            if (not segments or len(segments) >= MAX_SEGMENTS or meta is None
+                    or meta["watermark"] != previous or meta["low"] != low_text):
+                _save(path, df_full, low, watermark)
+                return
+            last = int(os.path.basename(segments[-1])[5:10])
+            _write_segment(path, last + 1, df_new)
+            _write_meta(path, low, watermark)
+    except Exception as e:
+        logger.warning("Falha ao gravar delta em disco de %s: %s", key[0], e)
+
+
+def clear(table_name: str = None) -> None:
+    """Apaga o cache em disco (de uma tabela, em todas as origens, ou inteiro)."""
+    if not os.path.isdir(CACHE_DIR):
+        return
+    if table_name is None:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        return
+    for path in glob.glob(os.path.join(CACHE_DIR, "*", "*")):
+        name = os.path.basename(path)
+        if name == table_name or name.startswith(table_name + "__"):
+            shutil.rmtree(path, ignore_errors=True)
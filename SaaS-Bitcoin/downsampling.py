@@ -0,0 +1,77 @@
+"""Redução de pontos das séries antes de plotar (Largest-Triangle-Three-Buckets).
+
+O LTTB divide a série em baldes e mantém, de cada balde, o ponto que forma o
+maior triângulo com o ponto escolhido no balde anterior e a média do balde
+seguinte. Picos e vales continuam visíveis, mas o navegador recebe no máximo
+'n_out' pontos por série, não importa o tamanho do histórico.
+"""
+import numpy as np
+import pandas as pd
+
+
+# Orçamento padrão de pontos por série em cada gráfico
+DEFAULT_POINTS = 1000
+
+
+def _as_float(values) -> np.ndarray:
+    """Converte datas (ou números) para float64, preservando a ordem."""
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype("int64").to_numpy(dtype=np.float64)
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def lttb_indices(x, y, n_out: int = DEFAULT_POINTS) -> np.ndarray:
+    """Índices (posições) dos pontos escolhidos pelo LTTB, em ordem crescente."""
+    x = _as_float(x)
+    y = _as_float(y)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bordas dos baldes internos: o primeiro e o último ponto são sempre mantidos
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    # Média de cada balde, calculada de uma vez com somas acumuladas
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    counts = np.maximum(ends - starts, 1)
+    avg_x = (cx[ends] - cx[starts]) / counts
+    avg_y = (cy[ends] - cy[starts]) / counts
+    # Balde seguinte do último balde interno é o último ponto da série
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i, (lo, hi) in enumerate(zip(starts, ends)):
+        bx, by = x[lo:hi], y[lo:hi]
+        # Dobro da área do triângulo (a, ponto do balde, média do próximo balde)
+        area = np.abs((x[a] - next_x[i]) * (by - y[a]) - (x[a] - bx) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(area)) if len(area) else lo
+        selected[i + 1] = a
+    return selected
+
+
+def downsample(df: pd.DataFrame, x: str, y, n_out: int = DEFAULT_POINTS, by: str = None) -> pd.DataFrame:
+    """Reduz o DataFrame para no máximo 'n_out' pontos por série antes de plotar.
+
+    'y' pode ser uma coluna ou uma lista; com várias colunas é mantida a união
+    dos pontos escolhidos para cada uma. Com 'by' (ex.: 'symbol') cada grupo é
+    reduzido separadamente. O DataFrame deve estar ordenado por 'x'.
+    """
+    if df.empty:
+        return df
+    if by is not None:
+        parts = [downsample(group, x, y, n_out) for _, group in df.groupby(by, sort=False, observed=True)]
+        return pd.concat(parts) if parts else df
+    if len(df) <= n_out:
+        return df
+    columns = [y] if isinstance(y, str) else list(y)
+    keep = []
+    for column in columns:
+        valid = np.flatnonzero(df[column].notna().to_numpy())
+        chosen = lttb_indices(df[x].iloc[valid], df[column].iloc[valid], n_out)
+        keep.append(valid[chosen])
+    return df.iloc[np.unique(np.concatenate(keep))]
@@ -0,0 +1,150 @@
+"""Estudo de eventos: comportamento do preço do BTC em torno das notícias.
+
+Para cada janela (±1h, ±24h, ±7d) e cada notícia, o preço no instante da
+notícia e nos extremos da janela vem de um as-of join ordenado (último preço
+até o instante, como pd.merge_asof): um único np.searchsorted para todos os
+eventos. A volatilidade realizada de um trecho sai da soma acumulada dos
+quadrados dos retornos logarítmicos (diferença de dois prefixos), então
+nenhuma notícia é processada em laço Python.
+
+Para comparação, as mesmas medidas são calculadas numa grade regular de
+instantes (linha de base): o retorno "normal" de uma janela qualquer do período.
+"""
+import numpy as np
+import pandas as pd
+
+import analytics
+
+
+# Janelas do estudo (rótulo: meia-largura) e passo do perfil médio de cada uma
+WINDOWS = {"±1h": "1h", "±24h": "24h", "±7d": "7D"}
+PROFILE_STEPS = {"±1h": "5min", "±24h": "1h", "±7d": "6h"}
+# Um preço vale para o instante pedido se não for mais velho que esta fração da janela
+TOLERANCE = 0.1
+# Espaçamento da grade de instantes da linha de base
+BASELINE_STEP = "1h"
+
+COLUMNS = ["janela", "eventos", "retorno_antes", "retorno_depois", "alta_depois",
+           "vol_antes", "vol_depois", "retorno_base", "vol_base"]
+
+
+def _ns(values) -> np.ndarray:
+    """Instantes como inteiros (nanossegundos UTC), aceitando datas com ou sem fuso."""
+    index = pd.DatetimeIndex(values)
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    return index.as_unit("ns").asi8
+
+
+class PriceSeries:
+    """Preços em ordem de tempo, com log-preço e soma acumulada dos retornos ao quadrado."""
+
+    def __init__(self, times, prices):
+        times = _ns(times)
+        prices = np.asarray(prices, dtype=np.float64)
+        valid = np.isfinite(prices) & (prices > 0)
+        self.times = times[valid]
+        self.log_prices = np.log(prices[valid])
+        squares = np.diff(self.log_prices, prepend=self.log_prices[:1]) ** 2
+        self.squares = np.cumsum(squares)
+
+    def __len__(self):
+        return len(self.times)
+
+    def asof(self, targets: np.ndarray, tolerance: int):
+        """Índice do último preço até cada instante e se ele está dentro da tolerância."""
+        index = np.searchsorted(self.times, targets, side="right") - 1
+        clipped = np.maximum(index, 0)
+        valid = (index >= 0) & (targets - self.times[clipped] <= tolerance) & (targets <= self.times[-1])
+        return clipped, valid
+
+    def window(self, events: np.ndarray, width: int) -> dict:
+        """Retornos (%) e volatilidade realizada (%) antes e depois de cada evento."""
+        tolerance = int(width * TOLERANCE)
+        at, ok = self.asof(events, tolerance)
+        before, ok_before = self.asof(events - width, tolerance)
+        after, ok_after = self.asof(events + width, tolerance)
+        ok_before &= ok
+        ok_after &= ok
+        lp, sq = self.log_prices, self.squares
+        with np.errstate(invalid="ignore"):
+            return {
+                "retorno_antes": np.where(ok_before, np.expm1(lp[at] - lp[before]) * 100, np.nan),
+                "retorno_depois": np.where(ok_after, np.expm1(lp[after] - lp[at]) * 100, np.nan),
+                "vol_antes": np.where(ok_before, np.sqrt(sq[at] - sq[before]) * 100, np.nan),
+                "vol_depois": np.where(ok_after, np.sqrt(sq[after] - sq[at]) * 100, np.nan),
+            }
+
+    def baseline(self, width: int) -> np.ndarray:
+        """Instantes regulares do período com a janela inteira dentro dos dados."""
+        if len(self.times) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.arange(self.times[0] + width, self.times[-1] - width + 1, pd.Timedelta(BASELINE_STEP).value)
+
+
+def _mean(values: np.ndarray) -> float:
+    values = values[np.isfinite(values)]
+    return float(values.mean()) if len(values) else np.nan
+
+
+@analytics.memoize_by_version
+def summary(price_times, prices, event_times) -> pd.DataFrame:
+    """Médias por janela (WINDOWS) sobre todos os eventos, mais a linha de base.
+
+    'alta_depois' é a fração (%) dos eventos com retorno positivo depois da
+    notícia; 'eventos' conta os que têm preço nos dois lados da janela.
+    """
+    series = PriceSeries(price_times, prices)
+    events = np.sort(_ns(event_times))
+    if len(series) < 2:
+        return pd.DataFrame(columns=COLUMNS)
+    rows = []
+    for label, width in WINDOWS.items():
+        width = pd.Timedelta(width).value
+        stats = series.window(events, width)
+        base = series.window(series.baseline(width), width)
+        after = stats["retorno_depois"]
+        measured = np.isfinite(after) & np.isfinite(stats["retorno_antes"])
+        rows.append({
+            "janela": label,
+            "eventos": int(measured.sum()),
+            "retorno_antes": _mean(stats["retorno_antes"]),
+            "retorno_depois": _mean(after),
+            "alta_depois": float((after[np.isfinite(after)] > 0).mean() * 100) if np.isfinite(after).any() else np.nan,
+            "vol_antes": _mean(stats["vol_antes"]),
+            "vol_depois": _mean(stats["vol_depois"]),
+            "retorno_base": _mean(base["retorno_depois"]),
+            "vol_base": _mean(base["vol_depois"]),
+        })
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+@analytics.memoize_by_version
+def profile(price_times, prices, event_times, window: str = "±24h") -> pd.DataFrame:
+    """Retorno médio (%) em relação ao preço no instante da notícia, de -janela a +janela.
+
+    Uma matriz eventos × deslocamentos de as-of joins; 'base' é o mesmo perfil
+    na grade regular da linha de base.
+    """
+    series = PriceSeries(price_times, prices)
+    events = np.sort(_ns(event_times))
+    width = pd.Timedelta(WINDOWS[window]).value
+    step = pd.Timedelta(PROFILE_STEPS[window]).value
+    offsets = np.arange(-width, width + 1, step)
+    frame = pd.DataFrame({"horas": offsets / pd.Timedelta("1h").value})
+    if len(series) < 2:
+        return frame.assign(retorno_medio=np.nan, base=np.nan, eventos=0)
+    tolerance = int(width * TOLERANCE)
+
+    def average(instants):
+        at, ok = series.asof(instants, tolerance)
+        index, valid = series.asof(instants[:, None] + offsets[None, :], tolerance)
+        relative = np.expm1(series.log_prices[index] - series.log_prices[at][:, None]) * 100
+        relative[~(valid & ok[:, None])] = np.nan
+        counts = np.isfinite(relative).sum(axis=0)
+        with np.errstate(invalid="ignore"):
+            return np.nansum(relative, axis=0) / counts, counts
+
+    frame["retorno_medio"], frame["eventos"] = average(events)
+    frame["base"], _ = average(series.baseline(width))
+    return frame
@@ -0,0 +1,259 @@
+"""Indicadores técnicos incrementais sobre as barras OHLC dos agregados.
+
+SMA, EMA, RSI, bandas de Bollinger, ATR e volatilidade realizada guardam o
+próprio estado (soma da janela, média exponencial, médias de Wilder) e
+processam uma barra por vez em O(1). O conjunto de indicadores de cada série
+e de cada início de janela fica em cache com a sua watermark (início da última
+barra fechada): quando o agregado ganha barras novas, só elas passam pelos
+indicadores. Como o aquecimento e as sementes da EMA e das médias de Wilder
+dependem da primeira barra, janelas com inícios diferentes nunca dividem um
+estado: a mesma janela dá os mesmos valores qualquer que seja a ordem em que
+os períodos foram abertos. Os resultados
+das barras fechadas ficam em arrays NumPy que crescem por duplicação, e cada
+atualização devolve só a faixa pedida. A última barra ainda está aberta (o
+balde continua recebendo ticks): é calculada e o estado é restaurado em
+seguida, para ser refeita na atualização seguinte.
+"""
+import math
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+
+# Parâmetros dos indicadores (janelas em barras da resolução do agregado)
+SMA_WINDOW = 20
+EMA_SPAN = 20
+BOLLINGER_WINDOW = 20
+BOLLINGER_WIDTH = 2.0
+RSI_WINDOW = 14
+ATR_WINDOW = 14
+VOLATILITY_WINDOW = 30
+
+# Colunas produzidas por IndicatorSet.update
+COLUMNS = ["sma", "ema", "bb_upper", "bb_lower", "rsi", "atr", "volatility"]
+
+
+class _Window:
+    """Janela deslizante com soma e soma dos quadrados (deslocadas pelo primeiro valor)."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque()
+        self.shift = None
+        self.total = 0.0
+        self.squares = 0.0
+        self.count = 0
+
+    def push(self, value: float) -> None:
+        self.count += 1
+        if self.shift is None:
+            # O deslocamento evita o cancelamento numérico de soma² - média² em preços altos
+            self.shift = value
+        value -= self.shift
+        self.values.append(value)
+        self.total += value
+        self.squares += value * value
+        if len(self.values) > self.size:
+            old = self.values.popleft()
+            self.total -= old
+            self.squares -= old * old
+
+    def save(self) -> tuple:
+        head = self.values[0] if self.values else None
+        return self.count, len(self.values), head, self.shift, self.total, self.squares
+
+    def restore(self, saved: tuple) -> None:
+        """Desfaz o push feito depois de save() (no máximo um)."""
+        count, length, head, self.shift, self.total, self.squares = saved
+        if self.count != count:
+            self.values.pop()
+            if len(self.values) < length:
+                self.values.appendleft(head)
+            self.count = count
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.size
+
+    def mean(self) -> float:
+        return self.total / len(self.values) + self.shift
+
+    def std(self, ddof: int = 0) -> float:
+        n = len(self.values)
+        variance = (self.squares - self.total * self.total / n) / (n - ddof)
+        return math.sqrt(max(variance, 0.0))
+
+
+class _Wilder:
+    """Média de Wilder: média simples das 'n' primeiras entradas e depois (m·(n-1) + x) / n."""
+
+    def __init__(self, n: int):
+        self.n = n
+        self.count = 0
+        self.value = 0.0
+
+    def push(self, x: float) -> float:
+        self.count += 1
+        if self.count <= self.n:
+            self.value += (x - self.value) / self.count
+        else:
+            self.value = (self.value * (self.n - 1) + x) / self.n
+        return self.value if self.count >= self.n else np.nan
+
+    def save(self) -> tuple:
+        return self.count, self.value
+
+    def restore(self, saved: tuple) -> None:
+        self.count, self.value = saved
+
+
+class IndicatorSet:
+    """Estado de todos os indicadores de uma série de barras OHLC.
+
+    'periods_per_year' anualiza a volatilidade realizada (barras por ano da
+    resolução; o mercado cripto negocia 24/7).
+    """
+
+    def __init__(self, periods_per_year: float):
+        self.annualization = math.sqrt(periods_per_year)
+        self.sma = _Window(SMA_WINDOW)
+        self.bollinger = _Window(BOLLINGER_WINDOW)
+        self.returns = _Window(VOLATILITY_WINDOW)
+        self.ema = None
+        self.gain, self.loss = _Wilder(RSI_WINDOW), _Wilder(RSI_WINDOW)
+        self.atr = _Wilder(ATR_WINDOW)
+        self.previous_close = None
+        # Barras fechadas já processadas: instantes (ns) e resultados, com folga para crescer
+        self.first = None
+        self.watermark = None
+        self.size = 0
+        self.times = np.empty(0, dtype=np.int64)
+        self.values = np.empty((0, len(COLUMNS)), dtype=np.float64)
+
+    def _step(self, high: float, low: float, close: float) -> tuple:
+        """Processa uma barra e devolve os valores de COLUMNS (NaN no aquecimento)."""
+        if math.isnan(close):
+            return (np.nan,) * len(COLUMNS)
+        self.sma.push(close)
+        self.bollinger.push(close)
+        alpha = 2.0 / (EMA_SPAN + 1)
+        self.ema = close if self.ema is None else alpha * close + (1 - alpha) * self.ema
+        high = close if math.isnan(high) else high
+        low = close if math.isnan(low) else low
+
+        rsi = atr = volatility = np.nan
+        if self.previous_close is None:
+            atr = self.atr.push(high - low)
+        else:
+            change = close - self.previous_close
+            average_gain = self.gain.push(max(change, 0.0))
+            average_loss = self.loss.push(max(-change, 0.0))
+            if not math.isnan(average_gain):
+                rsi = 100.0 if average_loss == 0 else 100.0 - 100.0 / (1.0 + average_gain / average_loss)
+            true_range = max(high - low, abs(high - self.previous_close), abs(low - self.previous_close))
+            atr = self.atr.push(true_range)
+            if self.previous_close > 0 and close > 0:
+                self.returns.push(math.log(close / self.previous_close))
+                if self.returns.full:
+                    volatility = self.returns.std(ddof=1) * self.annualization * 100
+        self.previous_close = close
+
+        sma = self.sma.mean() if self.sma.full else np.nan
+        if self.bollinger.full:
+            middle, width = self.bollinger.mean(), BOLLINGER_WIDTH * self.bollinger.std()
+            upper, lower = middle + width, middle - width
+        else:
+            upper = lower = np.nan
+        return (sma, self.ema, upper, lower, rsi, atr, volatility)
+
+    def _append(self, times: np.ndarray, rows: np.ndarray) -> None:
+        """Guarda os resultados de barras fechadas, dobrando a capacidade quando preciso."""
+        needed = self.size + len(rows)
+        if needed > len(self.times):
+            capacity = max(needed, 2 * len(self.times), 1024)
+            self.times = np.resize(self.times, capacity)
+            self.values = np.resize(self.values, (capacity, len(COLUMNS)))
+        self.times[self.size:needed] = times
+        self.values[self.size:needed] = rows
+        self.size = needed
+
+    def _provisional(self, high: float, low: float, close: float) -> tuple:
+        """Valores da barra aberta, restaurando o estado guardado em seguida."""
+        windows = (self.sma, self.bollinger, self.returns, self.gain, self.loss, self.atr)
+        saved = [w.save() for w in windows], self.ema, self.previous_close
+        try:
+            return self._step(high, low, close)
+        finally:
+            for window, state in zip(windows, saved[0]):
+                window.restore(state)
+            self.ema, self.previous_close = saved[1], saved[2]
+
+    def update(self, times, high, low, close) -> pd.DataFrame:
+        """Incorpora as barras posteriores à watermark e devolve os indicadores de 'times'.
+
+        'times' é o índice do agregado (crescente); a última barra é tratada
+        como aberta. Barras anteriores à watermark não são reprocessadas e o
+        resultado só cobre a faixa de 'times', sem montar o histórico inteiro.
+        """
+        times = pd.DatetimeIndex(times)
+        ns = times.as_unit("ns").asi8
+        high, low, close = (np.asarray(v, dtype=np.float64) for v in (high, low, close))
+        start = times.searchsorted(self.watermark, side="right") if self.watermark is not None else 0
+        last = len(times) - 1
+        if start < last:
+            rows = np.array([self._step(high[i], low[i], close[i]) for i in range(start, last)], dtype=np.float64)
+            self._append(ns[start:last], rows)
+            self.watermark = times[last - 1]
+            if self.first is None:
+                self.first = times[start]
+        if len(times) == 0:
+            return pd.DataFrame(columns=COLUMNS, index=times, dtype=np.float64)
+        lo = np.searchsorted(self.times[:self.size], ns[0], side="left")
+        index, values = self.times[lo:self.size], self.values[lo:self.size]
+        if self.watermark is None or times[last] > self.watermark:
+            open_bar = self._provisional(high[last], low[last], close[last])
+            index = np.append(index, ns[last])
+            values = np.vstack([values, open_bar])
+        index = pd.DatetimeIndex(index.view("datetime64[ns]"), name=times.name).as_unit(times.unit)
+        if times.tz is not None:
+            index = index.tz_localize("UTC").tz_convert(times.tz)
+        return pd.DataFrame(values, columns=COLUMNS, index=index)
+
+
+# Estados mantidos (série e início de janela); os usados há mais tempo são descartados
+MAX_STATES = 32
+
+_states = OrderedDict()
+_lock = threading.Lock()
+
+
+def compute(key, bars: pd.DataFrame, column: str, resolution: str) -> pd.DataFrame:
+    """Indicadores da coluna 'column' de um agregado OHLC (formato de rollups.build).
+
+    'key' identifica a série (ex.: tabela e resolução). O estado é semeado na
+    primeira barra de 'bars' e guardado sob (key, primeira barra): chamadas
+    seguintes com o mesmo início só processam as barras novas. Passe barras
+    que comecem num instante estável (ex.: o início normalizado da janela) e
+    recorte o resultado depois.
+    """
+    times = bars.index
+    periods_per_year = pd.Timedelta(days=365) / pd.Timedelta(resolution)
+    if len(times) == 0:
+        return IndicatorSet(periods_per_year).update(times, [], [], [])
+    state_key = (key, times[0])
+    with _lock:
+        state = _states.get(state_key)
+        if state is None:
+            state = _states[state_key] = IndicatorSet(periods_per_year)
+            while len(_states) > MAX_STATES:
+                _states.popitem(last=False)
+        _states.move_to_end(state_key)
+        return state.update(times, bars[f"{column}_high"], bars[f"{column}_low"], bars[f"{column}_close"])
+
+
+def reset() -> None:
+    """Descarta todos os estados (o próximo cálculo parte do histórico inteiro)."""
+    with _lock:
+        _states.clear()
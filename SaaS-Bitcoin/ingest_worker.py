@@ -0,0 +1,97 @@
+"""Worker de ingestão: espelha as tabelas do Supabase na base local (local_store).
+
+Roda fora do Streamlit, como um processo próprio, e a cada intervalo busca
+apenas as linhas novas de cada tabela. Os painéis abertos leem a base local,
+então o Supabase recebe as consultas de um único processo, qualquer que seja
+o número de sessões.
+
+A origem segue a mesma configuração do app: SAAS_BTC_LOCAL_ROWS (base
+sintética), [database] backend = "postgres" ou [supabase] no
+.streamlit/secrets.toml.
+
+Exemplos:
+    python ingest_worker.py                    # ciclo a cada 60 s
+    python ingest_worker.py --once --days 365  # carga única do último ano
+"""
+import argparse
+import logging
+import os
+import time
+
+import pandas as pd
+
+import data_sync
+import local_store
+import local_supabase
+
+
+DEFAULT_INTERVAL = 60
+# Histórico da primeira carga (o maior período da barra lateral é 90 dias)
+DEFAULT_DAYS = 120
+SECRETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml")
+
+logger = logging.getLogger("ingest_worker")
+
+
+def read_secrets(path: str = SECRETS_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    import tomllib
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def make_client(secrets: dict):
+    """Cliente da origem, escolhido como no app."""
+    client = local_supabase.from_env()
+    if client is not None:
+        return client
+    database = secrets.get("database", {})
+    if database.get("backend") == "postgres":
+        import pg_backend
+        return pg_backend.connect(database["dsn"], pool_size=int(database.get("pool_size", 2)))
+    from supabase import create_client
+    return create_client(secrets["supabase"]["url"], secrets["supabase"]["key"])
+
+
+def store_path(secrets: dict) -> str:
+    return os.environ.get("SAAS_BTC_STORE") or secrets.get("store", {}).get("path") or local_store.DEFAULT_PATH
+
+
+def run_once(client, path: str, days: int) -> dict:
+    """Um ciclo de espelhamento de todas as tabelas; retorna linhas gravadas por tabela."""
+    conn = local_store.connect(path)
+    since = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=days) if days else None
+    written = {}
+    for table_name, columns in data_sync.TABLE_COLUMNS.items():
+        try:
+            written[table_name] = local_store.mirror(conn, client, table_name, columns, since=since)
+        except Exception as e:
+            # Uma tabela com erro não interrompe as demais; tenta de novo no próximo ciclo
+            logger.warning("Falha ao espelhar %s: %s", table_name, e)
+    return written
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="segundos entre ciclos")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="histórico da primeira carga (0 = tudo)")
+    parser.add_argument("--once", action="store_true", help="executa um único ciclo e sai")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    secrets = read_secrets()
+    client = make_client(secrets)
+    path = store_path(secrets)
+    logger.info("Espelhando tabelas em %s", path)
+    while True:
+        start = time.monotonic()
+        written = run_once(client, path, args.days)
+        logger.info("Ciclo concluído em %.1fs: %s", time.monotonic() - start, written)
+        if args.once:
+            break
+        time.sleep(max(0.0, args.interval - (time.monotonic() - start)))
+
+
+if __name__ == "__main__":
+    main()
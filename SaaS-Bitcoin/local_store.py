@@ -0,0 +1,198 @@
+"""Base analítica local (SQLite) com o espelho das tabelas do Supabase.
+
+O processo ingest_worker.py mantém a base atualizada em segundo plano,
+buscando só as linhas posteriores ao maior timestamp já gravado. Com a base
+configurada (SAAS_BTC_STORE ou [store] path no secrets.toml) o app lê daqui:
+as janelas viram WHERE na coluna de tempo indexada e os agregados OHLC são
+calculados em SQL (GROUP BY no balde de tempo). Assim o número de sessões
+abertas não multiplica as consultas ao Supabase.
+
+Os tempos são gravados como inteiros (nanossegundos UTC), o que torna o
+balde de uma resolução uma simples divisão inteira.
+"""
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+import data_sync
+import perf
+
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data_store", "store.sqlite")
+
+_local = threading.local()
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Conexão da thread atual com a base (WAL: leitores não bloqueiam o worker)."""
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        connections[path] = conn
+    return conn
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_type(series: pd.Series) -> str:
+    if pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(series):
+        return "REAL"
+    return "TEXT"
+
+
+def _to_store(df: pd.DataFrame, column: str) -> pd.DataFrame:
+    """Prepara o DataFrame para gravação: coluna de tempo em nanossegundos UTC."""
+    df = df.copy()
+    times = pd.to_datetime(df[column], errors="coerce", utc=True)
+    df = df[times.notna()]
+    df[column] = times[times.notna()].dt.as_unit("ns").astype("int64")
+    return df
+
+
+def _ensure_table(conn, table_name: str, df: pd.DataFrame, column: str) -> None:
+    fields = ", ".join(f"{_quote(c)} {_sql_type(df[c])}" for c in df.columns)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table_name)} ({fields})")
+    # Chave natural: tempo (e símbolo, nas tabelas com vários ativos)
+    key = [column] + (["symbol"] if "symbol" in df.columns else [])
+    conn.execute(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {_quote(table_name + '_key')} "
+        f"ON {_quote(table_name)} ({', '.join(map(_quote, key))})"
+    )
+
+
+def _exists(conn, table_name: str) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)).fetchone()
+    return row is not None
+
+
+def watermark(conn, table_name: str):
+    """Maior tempo gravado da tabela (Timestamp UTC) ou None se ainda vazia."""
+    if not _exists(conn, table_name):
+        return None
+    column = data_sync.sync_column(table_name)
+    value = conn.execute(f"SELECT MAX({_quote(column)}) FROM {_quote(table_name)}").fetchone()[0]
+    return pd.Timestamp(value, tz="UTC") if value is not None else None
+
+
+def mirror(conn, client, table_name: str, columns=None, since=None) -> int:
+    """Copia para a base as linhas novas da tabela e retorna quantas foram gravadas.
+
+    A primeira carga começa em 'since' (None = histórico inteiro); as
+    seguintes pedem só o que veio depois da watermark gravada.
+    """
+    column = data_sync.sync_column(table_name)
+    last = watermark(conn, table_name)
+    if last is not None:
+        df = data_sync.fetch_window(client, table_name, columns, after=last)
+    else:
+        df = data_sync.fetch_window(client, table_name, columns, start=since)
+    if df.empty or column not in df.columns:
+        return 0
+    df = _to_store(df, column)
+    with conn:
+        _ensure_table(conn, table_name, df, column)
+        placeholders = ", ".join("?" for _ in df.columns)
+        before = conn.total_changes
+        conn.executemany(
+            f"INSERT OR IGNORE INTO {_quote(table_name)} ({', '.join(map(_quote, df.columns))}) VALUES ({placeholders})",
+            df.astype(object).where(df.notna(), None).itertuples(index=False, name=None),
+        )
+        return conn.total_changes - before
+
+
+def _window(column: str, start=None, end=None):
+    """Cláusula WHERE da janela e seus parâmetros (em nanossegundos)."""
+    conditions, params = [], []
+    if start is not None:
+        conditions.append(f"{_quote(column)} >= ?")
+        params.append(pd.Timestamp(start).value)
+    if end is not None:
+        conditions.append(f"{_quote(column)} <= ?")
+        params.append(pd.Timestamp(end).value)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+
+def _from_store(df: pd.DataFrame, column: str) -> pd.DataFrame:
+    if column in df.columns:
+        df[column] = pd.to_datetime(df[column].astype("int64"), unit="ns", utc=True)
+    return df
+
+
+def load(path: str, table_name: str, columns=None, start=None, end=None) -> pd.DataFrame:
+    """Linhas da janela [start, end], ordenadas pelo tempo (mesmo formato de data_sync)."""
+    conn = connect(path)
+    if not _exists(conn, table_name):
+        return pd.DataFrame(columns=list(columns or []))
+    column = data_sync.sync_column(table_name)
+    fields = ", ".join(map(_quote, columns)) if columns else "*"
+    where, params = _window(column, start, end)
+    with perf.span(f"base local {table_name}", "fetch", table=table_name) as args:
+        df = pd.read_sql_query(
+            f"SELECT {fields} FROM {_quote(table_name)}{where} ORDER BY {_quote(column)}", conn, params=params
+        )
+        args["rows"] = len(df)
+    return data_sync.apply_schema(_from_store(df, column), table_name)
+
+
+def latest_rows(path: str, table_name: str, columns=None, n: int = 2) -> pd.DataFrame:
+    """As 'n' linhas mais recentes, em ordem crescente."""
+    conn = connect(path)
+    if not _exists(conn, table_name):
+        return pd.DataFrame(columns=list(columns or []))
+    column = data_sync.sync_column(table_name)
+    fields = ", ".join(map(_quote, columns)) if columns else "*"
+    df = pd.read_sql_query(
+        f"SELECT {fields} FROM {_quote(table_name)} ORDER BY {_quote(column)} DESC LIMIT ?", conn, params=[n]
+    )
+    return data_sync.apply_schema(_from_store(df.iloc[::-1].reset_index(drop=True), column), table_name)
+
+
+def aggregate(path: str, table_name: str, resolution: str, start=None, end=None, columns=None) -> pd.DataFrame:
+    """Agregado OHLC calculado em SQL, no mesmo formato de rollups.build.
+
+    Máxima, mínima, soma e contagem saem do GROUP BY; abertura e fechamento
+    vêm das linhas com o menor e o maior tempo de cada balde.
+    """
+    conn = connect(path)
+    column = data_sync.sync_column(table_name)
+    if not _exists(conn, table_name):
+        return pd.DataFrame()
+    if columns is None:
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table_name)})")]
+    declared = {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({_quote(table_name)})")}
+    values = [c for c in columns if c != column and declared.get(c) in ("REAL", "INTEGER")]
+    start = pd.Timestamp(start).floor(resolution) if start is not None else None
+    where, params = _window(column, start, end)
+    step = pd.Timedelta(resolution).value
+    t = _quote(column)
+    stats = ", ".join(f"MAX({_quote(c)}) AS {_quote(c + '_high')}, MIN({_quote(c)}) AS {_quote(c + '_low')}, "
+                      f"SUM({_quote(c)}) AS {_quote(c + '_sum')}" for c in values)
+    select = ", ".join(f"f.{_quote(c)} AS {_quote(c + '_open')}, b.{_quote(c + '_high')}, b.{_quote(c + '_low')}, "
+                       f"l.{_quote(c)} AS {_quote(c + '_close')}, b.{_quote(c + '_sum')}" for c in values)
+    query = (
+        f"WITH b AS (SELECT ({t} / {step}) * {step} AS bucket, MIN({t}) AS first_ts, MAX({t}) AS last_ts, "
+        f"{stats + ', ' if stats else ''}COUNT(*) AS count FROM {_quote(table_name)}{where} GROUP BY bucket) "
+        f"SELECT b.bucket, {select + ', ' if select else ''}b.count FROM b "
+        f"JOIN {_quote(table_name)} f ON f.{t} = b.first_ts "
+        f"JOIN {_quote(table_name)} l ON l.{t} = b.last_ts ORDER BY b.bucket"
+    )
+    with perf.span(f"agregado local {table_name}", "fetch", table=table_name, resolution=resolution) as args:
+        df = pd.read_sql_query(query, conn, params=params)
+        args["rows"] = len(df)
+    df.index = pd.to_datetime(df.pop("bucket").astype("int64"), unit="ns", utc=True).rename(column)
+    for name in df.columns:
+        df[name] = df[name].astype(np.int64 if name == "count" else np.float64)
+    return df
@@ -0,0 +1,318 @@
+"""Substituto local do Supabase, com dados de mercado sintéticos.
+
+Implementa o subconjunto do cliente 'supabase' usado pelo dashboard:
+client.table(nome).select(...).gt/gte/lt/lte/eq(...).order(...).range(...)
+.limit(...).execute(), devolvendo um objeto com 'data' (lista de dicts, datas
+em ISO 8601 como no PostgREST) e 'count'. As tabelas são geradas em colunas
+NumPy, ordenadas pelo tempo, então filtros de janela viram busca binária e só
+a página pedida é convertida em dicts; o limite de linhas por resposta do
+PostgREST também é reproduzido.
+
+Uso: defina SAAS_BTC_LOCAL_ROWS (linhas de 'prices_btc', de 10 mil a 50
+milhões) e o app passa a ler daqui em vez do projeto no Supabase. A geração é
+determinística para a mesma semente e o mesmo instante final.
+"""
+import os
+import threading
+import types
+
+import numpy as np
+import pandas as pd
+
+
+# Limite padrão de linhas por resposta do PostgREST (max-rows)
+MAX_ROWS = 1000
+
+SENTIMENT_LEVELS = ["Extreme Fear", "Fear", "Neutral", "Greed", "Extreme Greed"]
+NEWS_SOURCES = ["CoinDesk", "Cointelegraph", "Decrypt", "The Block", "Bloomberg", "Reuters"]
+NEWS_TOPICS = [
+    "Bitcoin supera resistência e renova máxima do mês",
+    "ETFs de Bitcoin registram entrada líquida de capital",
+    "Mineradores aumentam reservas após ajuste de dificuldade",
+    "Regulação de criptoativos avança no Congresso",
+    "Baleias movimentam grandes volumes para exchanges",
+    "Volatilidade do BTC cai ao menor nível em semanas",
+    "Ethereum e altcoins acompanham alta do Bitcoin",
+    "Dólar forte pressiona mercado de criptomoedas",
+    "Hashrate da rede Bitcoin atinge novo recorde",
+    "Investidores institucionais ampliam exposição a cripto",
+]
+TRADITIONAL_ASSETS = {"SPY": 500.0, "XAUUSD": 2300.0}
+
+
+def _minutes(end: pd.Timestamp, n: int, step: str) -> np.ndarray:
+    """'n' instantes (datetime64[ns], UTC) espaçados por 'step' terminando em 'end'."""
+    step_ns = pd.Timedelta(step).value
+    return end.value - step_ns * np.arange(n - 1, -1, -1, dtype=np.int64)
+
+
+def _random_walk(rng, n: int, start: float, sigma: float) -> np.ndarray:
+    return start * np.exp(np.cumsum(rng.normal(0.0, sigma, n)))
+
+
+def generate(table_name: str, rows: int, end: pd.Timestamp, seed: int = 0) -> dict:
+    """Gera as colunas da tabela: {coluna: array} mais '_time' e '_categories'.
+
+    'rows' é o número de linhas por minuto de 'prices_btc'; as demais tabelas
+    seguem a cadência de cada fonte (minuto, hora, meia hora ou dia).
+    """
+    rng = np.random.default_rng([seed, sum(map(ord, table_name))])
+    # O preço do BTC é a base das tabelas derivadas: mesma semente em todas
+    btc_rng = np.random.default_rng([seed, 0])
+    if table_name in ("prices_btc", "market_global", "altcoin_prices"):
+        ts = _minutes(end, rows, "1min")
+        btc = _random_walk(btc_rng, rows, 60_000.0, 0.0008)
+    if table_name == "prices_btc":
+        brl_rate = _random_walk(rng, rows, 5.3, 0.0002)
+        columns = {"timestamp": ts, "price_usd": btc, "price_brl": btc * brl_rate}
+    elif table_name == "market_global":
+        dominance = np.clip(55.0 + np.cumsum(rng.normal(0.0, 0.01, rows)), 40.0, 70.0)
+        columns = {
+            "timestamp": ts,
+            "total_market_cap": btc * 19.7e6 / (dominance / 100),
+            "total_volume": rng.lognormal(np.log(1.5e9), 0.3, rows),
+            "btc_dominance": dominance,
+        }
+    elif table_name == "altcoin_prices":
+        columns = {
+            "timestamp": ts,
+            "eth_usd": btc * _random_walk(rng, rows, 0.05, 0.0004),
+            "bnb_usd": btc * _random_walk(rng, rows, 0.01, 0.0004),
+            "usdt_usd": 1.0 + rng.normal(0.0, 0.0005, rows),
+        }
+    elif table_name == "sentiment":
+        n = max(rows // 60, 48)
+        # Processo autorregressivo em torno de 50 (choques com decaimento
+        # exponencial, via convolução), limitado a [0, 100]
+        kernel = 0.95 ** np.arange(120)
+        index = 50.0 + np.convolve(rng.normal(0.0, 3.0, n), kernel)[:n]
+        index = np.clip(np.rint(index), 0, 100).astype(np.int64)
+        columns = {
+            "timestamp": _minutes(end.floor("h"), n, "1h"),
+            "fear_greed_index": index,
+            "sentiment_text": np.digitize(index, [25, 45, 55, 75]),
+        }
+        return {**columns, "_time": "timestamp", "_categories": {"sentiment_text": SENTIMENT_LEVELS}}
+    elif table_name == "news_events":
+        n = max(rows // 30, 50)
+        ids = np.arange(n)
+        return {
+            "date": _minutes(end.floor("30min"), n, "30min"),
+            "headline": rng.integers(0, len(NEWS_TOPICS), n),
+            "source": rng.integers(0, len(NEWS_SOURCES), n),
+            "link": ids,
+            "_time": "date",
+            "_categories": {"headline": NEWS_TOPICS, "source": NEWS_SOURCES, "link": "https://example.com/news/{}"},
+        }
+    elif table_name == "traditional_assets_prices":
+        days = max(rows // 1440, 30)
+        dates = _minutes(end.floor("D"), days, "1D")
+        symbols = list(TRADITIONAL_ASSETS)
+        prices = np.column_stack([_random_walk(rng, days, p, 0.01) for p in TRADITIONAL_ASSETS.values()])
+        # Linhas intercaladas por data (ordem por timestamp, depois símbolo)
+        return {
+            "timestamp": np.repeat(dates, len(symbols)),
+            "symbol": np.tile(np.arange(len(symbols)), days),
+            "price_usd": prices.ravel(),
+            "_time": "timestamp",
+            "_categories": {"symbol": symbols},
+        }
+    else:
+        raise KeyError(f"Tabela desconhecida: {table_name}")
+    return {**columns, "_time": "timestamp", "_categories": {}}
+
+
+class _Table:
+    """Colunas de uma tabela gerada, ordenadas pela coluna de tempo."""
+
+    def __init__(self, name: str, generated: dict):
+        self.name = name
+        self.time_column = generated.pop("_time")
+        self.categories = generated.pop("_categories")
+        self.columns = generated
+
+    def __len__(self):
+        return len(self.columns[self.time_column])
+
+    def encode(self, column: str, value):
+        """Converte o valor de um filtro para a representação interna da coluna."""
+        if column not in self.columns:
+            raise KeyError(f"Coluna '{column}' não existe em {self.name}")
+        if column == self.time_column:
+            value = pd.Timestamp(value)
+            if value.tz is None:
+                value = value.tz_localize("UTC")
+            return value.value
+        labels = self.categories.get(column)
+        if isinstance(labels, list):
+            return labels.index(value) if value in labels else -1
+        if isinstance(labels, str):
+            return int(str(value).rsplit("/", 1)[-1])
+        return value
+
+    def decode(self, column: str, values: np.ndarray) -> list:
+        """Valores da página no formato JSON devolvido pelo PostgREST."""
+        if column == self.time_column:
+            text = np.datetime_as_string(values.astype("datetime64[ns]"), unit="s")
+            return [t + "+00:00" for t in text]
+        labels = self.categories.get(column)
+        if isinstance(labels, list):
+            return [labels[i] for i in values]
+        if isinstance(labels, str):
+            return [labels.format(i) for i in values]
+        return values.tolist()
+
+
+class _Query:
+    """Consulta encadeável no estilo do postgrest-py (apenas o que o app usa)."""
+
+    _OPS = {"gt": np.greater, "gte": np.greater_equal, "lt": np.less, "lte": np.less_equal, "eq": np.equal}
+
+    def __init__(self, client, table_name: str):
+        self._client = client
+        self._table_name = table_name
+        self._columns = None
+        self._count = None
+        self._filters = []
+        self._order = None
+        self._range = None
+        self._limit = None
+
+    def select(self, *columns, count=None):
+        names = [c.strip() for c in ",".join(columns).split(",") if c.strip()]
+        self._columns = None if not names or names == ["*"] else names
+        self._count = count
+        return self
+
+    def _filter(self, op, column, value):
+        self._filters.append((op, column, value))
+        return self
+
+    def gt(self, column, value):
+        return self._filter("gt", column, value)
+
+    def gte(self, column, value):
+        return self._filter("gte", column, value)
+
+    def lt(self, column, value):
+        return self._filter("lt", column, value)
+
+    def lte(self, column, value):
+        return self._filter("lte", column, value)
+
+    def eq(self, column, value):
+        return self._filter("eq", column, value)
+
+    def order(self, column, desc=False):
+        self._order = (column, desc)
+        return self
+
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
+
+    def limit(self, size):
+        self._limit = size
+        return self
+
+    def _positions(self, table: _Table) -> np.ndarray:
+        """Posições das linhas que passam nos filtros, na ordem pedida."""
+        times = table.columns[table.time_column]
+        lo, hi = 0, len(table)
+        others = []
+        # Filtros na coluna de tempo: busca binária (a tabela está ordenada por ela)
+        for op, column, value in self._filters:
+            value = table.encode(column, value)
+            if column != table.time_column:
+                others.append((op, column, value))
+            elif op in ("gt", "gte", "eq"):
+                lo = max(lo, int(np.searchsorted(times, value, side="right" if op == "gt" else "left")))
+            if column == table.time_column and op in ("lt", "lte", "eq"):
+                hi = min(hi, int(np.searchsorted(times, value, side="left" if op == "lt" else "right")))
+        positions = np.arange(lo, max(lo, hi))
+        for op, column, value in others:
+            positions = positions[self._OPS[op](table.columns[column][positions], value)]
+        if self._order is not None:
+            column, desc = self._order
+            if column != table.time_column:
+                positions = positions[np.argsort(table.columns[column][positions], kind="stable")]
+            if desc:
+                positions = positions[::-1]
+        return positions
+
+    def execute(self):
+        table = self._client._table(self._table_name)
+        positions = self._positions(table)
+        total = len(positions)
+        start, end = self._range if self._range is not None else (0, total - 1)
+        size = min(end - start + 1, self._client.max_rows)
+        if self._limit is not None:
+            size = min(size, self._limit)
+        page = positions[start:start + max(size, 0)]
+        names = self._columns or list(table.columns)
+        values = {name: table.decode(name, table.columns[name][page]) for name in names}
+        data = [dict(zip(names, row)) for row in zip(*values.values())] if len(page) else []
+        self._client.rows_served += len(data)
+        return types.SimpleNamespace(data=data, count=total if self._count else None)
+
+
+class LocalClient:
+    """Cliente que imita o supabase.Client sobre tabelas geradas localmente.
+
+    'rows' é o número de linhas de 'prices_btc' (e das demais tabelas por
+    minuto); 'end' fixa o instante final (padrão: o minuto atual). Cada tabela
+    é gerada na primeira consulta e mantida em memória.
+    """
+
+    def __init__(self, rows: int = 100_000, seed: int = 0, end=None, max_rows: int = MAX_ROWS):
+        self.rows = int(rows)
+        self.seed = seed
+        self.end = pd.Timestamp(end) if end is not None else pd.Timestamp.now(tz="UTC").floor("min")
+        if self.end.tz is None:
+            self.end = self.end.tz_localize("UTC")
+        self.max_rows = max_rows
+        # Origem dos dados para o cache em disco: as tabelas dependem de linhas, semente e fim
+        self.source_id = f"local:{self.rows}:{self.seed}:{self.end.isoformat()}"
+        # Total de linhas devolvidas (útil para medir o tráfego de cada cenário)
+        self.rows_served = 0
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _table(self, table_name: str) -> _Table:
+        with self._lock:
+            if table_name not in self._tables:
+                self._tables[table_name] = _Table(table_name, generate(table_name, self.rows, self.end, self.seed))
+            return self._tables[table_name]
+
+    def table(self, table_name: str) -> _Query:
+        return _Query(self, table_name)
+
+    def dataframe(self, table_name: str) -> pd.DataFrame:
+        """Tabela inteira como DataFrame (para testes da camada de cálculo sem o app)."""
+        table = self._table(table_name)
+        data = {}
+        for name, values in table.columns.items():
+            if name == table.time_column:
+                data[name] = pd.to_datetime(values, utc=True)
+            elif name in table.categories:
+                data[name] = table.decode(name, values)
+            else:
+                data[name] = values
+        return pd.DataFrame(data)
+
+
+def env_settings():
+    """(linhas, semente) de SAAS_BTC_LOCAL_ROWS/SAAS_BTC_LOCAL_SEED, ou None sem base local."""
+    rows = os.environ.get("SAAS_BTC_LOCAL_ROWS")
+    if not rows:
+        return None
+    return int(float(rows)), int(os.environ.get("SAAS_BTC_LOCAL_SEED", "0"))
+
+
+def from_env():
+    """Cliente local se SAAS_BTC_LOCAL_ROWS estiver definido, senão None."""
+    settings = env_settings()
+    if settings is None:
+        return None
+    rows, seed = settings
+    return LocalClient(rows=rows, seed=seed)
@@ -0,0 +1,269 @@
+"""Índice invertido em memória sobre as manchetes e fontes de news_events.
+
+Cada notícia vira um documento com os termos da manchete e da fonte (minúsculos
+e sem acentos). As listas de documentos de cada termo (postings) são arrays
+NumPy com o peso do termo no documento, então uma busca é: juntar as postings
+dos termos da consulta, pontuar por BM25, aplicar os filtros de data e fonte
+e ordenar só a página pedida. Os documentos ficam em ordem de data, de modo
+que o filtro de datas é uma faixa de ids (busca binária).
+
+O índice cresce de forma incremental: update() recebe a tabela sincronizada
+(em ordem de data) e indexa só as linhas posteriores à última data indexada.
+A tokenização roda uma vez por manchete distinta; a expansão para os
+documentos e o agrupamento por termo são vetorizados.
+"""
+import math
+import re
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+# Parâmetros do BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Peso de um termo da fonte em relação a um termo da manchete
+SOURCE_WEIGHT = 0.5
+PAGE_SIZE = 10
+# Palavras que não ajudam a distinguir notícias (comparadas já sem acento)
+STOP_WORDS = frozenset(
+    "a ao aos as com da das de do dos e em na nas no nos o os para pela pelo por que se um uma "
+    "the of and to in on for is at by an as".split()
+)
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokens(text) -> list:
+    """Termos do texto: minúsculos, sem acentos e sem palavras vazias."""
+    if not isinstance(text, str):
+        return []
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [t for t in _TOKEN.findall(text) if t not in STOP_WORDS]
+
+
+class _Postings:
+    """Documentos e pesos de um termo: blocos anexados a cada atualização, unidos na leitura."""
+
+    def __init__(self):
+        self.blocks = []
+
+    def append(self, ids: np.ndarray, weights: np.ndarray) -> None:
+        self.blocks.append((ids, weights))
+
+    def arrays(self):
+        if len(self.blocks) > 1:
+            ids, weights = zip(*self.blocks)
+            self.blocks = [(np.concatenate(ids), np.concatenate(weights))]
+        return self.blocks[0]
+
+
+class SearchResult:
+    """Página de uma busca mais o total de acertos e as facetas (sobre todos os acertos)."""
+
+    def __init__(self, rows: pd.DataFrame, total: int, page: int, page_size: int,
+                 dates: pd.Series, sources: pd.Series):
+        self.rows = rows
+        self.total = total
+        self.page = page
+        self.pages = max(math.ceil(total / page_size), 1)
+        self.dates = dates
+        self.sources = sources
+
+
+class NewsIndex:
+    """Índice de busca das notícias, atualizado de forma incremental."""
+
+    def __init__(self):
+        self.terms = {}
+        self.postings = []
+        self.lengths = np.empty(0, dtype=np.float32)
+        self.dates = np.empty(0, dtype="datetime64[ns]")
+        self.source_names = []
+        self.source_codes = np.empty(0, dtype=np.int32)
+        # Manchetes e links em arrays de objetos: montar a página é um gather de poucas posições
+        self.headlines = np.empty(0, dtype=object)
+        self.links = np.empty(0, dtype=object)
+        self.watermark = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _term_pairs(self, values: pd.Series, first_id: int):
+        """(documento, termo) de cada ocorrência de termo nos textos, tokenizando cada texto distinto uma vez."""
+        codes, uniques = pd.factorize(values.astype(object), use_na_sentinel=True)
+        vocabulary = self.terms
+        per_text = [[vocabulary.setdefault(t, len(vocabulary)) for t in tokens(text)] for text in uniques]
+        counts = np.array([len(t) for t in per_text] + [0], dtype=np.int64)
+        flat = np.fromiter((t for terms in per_text for t in terms), dtype=np.int64, count=int(counts.sum()))
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        # Sem texto (código -1) aponta para a entrada vazia no fim
+        codes = np.where(codes < 0, len(uniques), codes)
+        per_doc = counts[codes]
+        docs = np.repeat(np.arange(len(codes), dtype=np.int64) + first_id, per_doc)
+        offsets = np.arange(per_doc.sum()) - np.repeat(np.cumsum(per_doc) - per_doc, per_doc)
+        return docs, flat[np.repeat(starts[codes], per_doc) + offsets], per_doc
+
+    def update(self, news: pd.DataFrame) -> "NewsIndex":
+        """Indexa as linhas de 'news' (colunas date, headline, source, link) posteriores à watermark."""
+        if news.empty:
+            return self
+        news = news if news["date"].is_monotonic_increasing else news.sort_values("date", kind="stable")
+        dates = pd.DatetimeIndex(news["date"]).as_unit("ns")
+        if dates.tz is not None:
+            dates = dates.tz_convert("UTC").tz_localize(None)
+        with self._lock:
+            start = dates.searchsorted(self.watermark, side="right") if self.watermark is not None else 0
+            if start >= len(news):
+                return self
+            new, dates = news.iloc[start:], dates[start:]
+            first_id = len(self.dates)
+
+            headline_docs, headline_terms, headline_counts = self._term_pairs(new["headline"], first_id)
+            source_docs, source_terms, source_counts = self._term_pairs(new["source"], first_id)
+            docs = np.concatenate([headline_docs, source_docs])
+            terms = np.concatenate([headline_terms, source_terms])
+            weights = np.concatenate([np.ones(len(headline_docs), np.float32),
+                                      np.full(len(source_docs), SOURCE_WEIGHT, np.float32)])
+            # Soma as repetições do mesmo termo no documento e agrupa por termo (documentos em ordem)
+            pairs, inverse = np.unique(terms * (first_id + len(new)) + docs, return_inverse=True)
+            weights = np.bincount(inverse, weights=weights).astype(np.float32)
+            docs, terms = pairs % (first_id + len(new)), pairs // (first_id + len(new))
+            self.postings.extend(_Postings() for _ in range(len(self.terms) - len(self.postings)))
+            bounds = np.flatnonzero(np.diff(terms)) + 1
+            for lo, hi in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(terms)]])):
+                self.postings[terms[lo]].append(docs[lo:hi], weights[lo:hi])
+
+            lengths = headline_counts + SOURCE_WEIGHT * source_counts
+            self.lengths = np.concatenate([self.lengths, lengths.astype(np.float32)])
+            self.dates = np.concatenate([self.dates, dates.to_numpy()])
+            sources = new["source"].astype(object).fillna("").to_numpy()
+            names = {name: i for i, name in enumerate(self.source_names)}
+            for name in pd.unique(sources):
+                names.setdefault(name, len(names))
+            self.source_names = list(names)
+            self.source_codes = np.concatenate([
+                self.source_codes, np.array([names[s] for s in sources], dtype=np.int32)
+            ])
+            self.headlines = np.concatenate([self.headlines, new["headline"].to_numpy(dtype=object)])
+            self.links = np.concatenate([self.links, new["link"].to_numpy(dtype=object)])
+            self.watermark = dates[-1]
+        return self
+
+    def _scores(self, query_terms: list) -> np.ndarray:
+        """BM25 de todos os documentos (zero onde nenhum termo da consulta aparece)."""
+        n = len(self.dates)
+        scores = np.zeros(n, dtype=np.float32)
+        average = float(self.lengths.mean()) if n else 0.0
+        for term in dict.fromkeys(query_terms):
+            term_id = self.terms.get(term)
+            if term_id is None:
+                continue
+            ids, weights = self.postings[term_id].arrays()
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[ids] / average)
+            scores[ids] += idf * weights * (BM25_K1 + 1) / (weights + norm)
+        return scores
+
+    def _match(self, query, start, end, sources):
+        """Ids dos acertos (em ordem de data) e as pontuações BM25 (None para a consulta vazia)."""
+        lo = self.dates.searchsorted(_naive(start), side="left") if start is not None else 0
+        hi = self.dates.searchsorted(_naive(end), side="right") if end is not None else len(self.dates)
+        query_terms = tokens(query)
+        if query_terms:
+            scores = self._scores(query_terms)
+            ids = lo + np.flatnonzero(scores[lo:hi] > 0)
+        else:
+            scores = None
+            ids = np.arange(lo, hi)
+        if sources:
+            codes = [i for i, name in enumerate(self.source_names) if name in set(sources)]
+            ids = ids[np.isin(self.source_codes[ids], codes)]
+        return ids, scores
+
+    def match(self, query: str = "", start=None, end=None, sources=None) -> np.ndarray:
+        """Datas (UTC, sem fuso, em ordem) de todas as notícias que a busca encontraria."""
+        with self._lock:
+            ids, _ = self._match(query, start, end, sources)
+            return self.dates[ids]
+
+    def search(self, query: str = "", start=None, end=None, sources=None, page: int = 0,
+               page_size: int = PAGE_SIZE, date_bucket: str = "D") -> SearchResult:
+        """Notícias que contêm algum termo da consulta, das mais relevantes para as menos.
+
+        Empates (e a consulta vazia, que lista tudo) ficam da mais recente para
+        a mais antiga. 'start'/'end' e 'sources' filtram os acertos; as facetas
+        contam os acertos filtrados por data ('date_bucket': "D" dia, "M" mês)
+        e por fonte. 'page' começa em 0.
+        """
+        with self._lock:
+            n = len(self.dates)
+            ids, scores = self._match(query, start, end, sources)
+
+            # Chave única de ordenação: pontuação (quantizada) e, no empate, o id (= data)
+            key = ids.astype(np.int64)
+            if scores is not None:
+                key = key + np.rint(scores[ids].astype(np.float64) * 1e4).astype(np.int64) * max(n, 1)
+            page = max(int(page), 0)
+            first, last = page * page_size, min((page + 1) * page_size, len(ids))
+            if first < last and scores is None:
+                selected = ids[::-1][first:last]
+            elif first < last:
+                top = np.argpartition(-key, last - 1)[:last] if last < len(ids) else np.arange(len(ids))
+                top = top[np.argsort(-key[top], kind="stable")][first:last]
+                selected = ids[top]
+            else:
+                selected = ids[:0]
+
+            rows = pd.DataFrame({
+                "date": pd.DatetimeIndex(self.dates[selected]).tz_localize("UTC"),
+                "headline": self.headlines[selected],
+                "source": np.asarray(self.source_names, dtype=object)[self.source_codes[selected]],
+                "link": self.links[selected],
+                "score": scores[selected] if scores is not None else np.nan,
+            })
+            # Os ids estão em ordem de data: cada balde é uma sequência contígua (sem ordenar)
+            buckets = self.dates[ids].astype(f"datetime64[{date_bucket}]")
+            starts = np.concatenate([[0], np.flatnonzero(buckets[1:] != buckets[:-1]) + 1]) if len(ids) else ids
+            counts = np.diff(np.append(starts, len(ids)))
+            dates = pd.Series(counts, index=pd.DatetimeIndex(buckets[starts].astype("datetime64[ns]"), name="date"),
+                              name="noticias")
+            per_source = np.bincount(self.source_codes[ids], minlength=len(self.source_names))
+            sources_facet = pd.Series(per_source, index=pd.Index(self.source_names, name="source"), name="noticias")
+            sources_facet = sources_facet[sources_facet > 0].sort_values(ascending=False)
+        return SearchResult(rows, len(ids), page, page_size, dates, sources_facet)
+
+
+def _naive(value) -> np.datetime64:
+    """Instante em UTC sem fuso, como as datas guardadas no índice."""
+    value = pd.Timestamp(value)
+    if value.tz is not None:
+        value = value.tz_convert("UTC").tz_localize(None)
+    return np.datetime64(value.as_unit("ns"))
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def index(key, news: pd.DataFrame) -> NewsIndex:
+    """Índice da tabela identificada por 'key', atualizado com as linhas novas de 'news'.
+
+    Se 'news' começa depois da primeira notícia indexada (outro recorte da
+    tabela), o índice é refeito do zero.
+    """
+    with _lock:
+        current = _indexes.get(key)
+        if current is None or (len(current) and not news.empty and _naive(news["date"].min()) > current.dates[0]):
+            current = _indexes[key] = NewsIndex()
+    return current.update(news)
+
+
+def reset() -> None:
+    """Descarta todos os índices."""
+    with _lock:
+        _indexes.clear()
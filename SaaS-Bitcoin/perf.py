@@ -0,0 +1,166 @@
+"""Medições leves por seção do script: tempo, linhas lidas e variação de memória.
+
+Cada execução do app chama begin_run() e envolve a carga de dados e cada aba
+em section(nome). As linhas lidas são somadas por touch(), chamado uma vez
+quando uma tabela é carregada ou um recorte é calculado (ver DashboardData).
+A memória de uma seção é a variação da memória residente atual entre o início
+e o fim (o pico do processo só sobe, então não distingue as seções; ele fica
+no total da execução, ver peak_rss_mb). O relatório fica em
+st.session_state["perf_report"], onde o benchmark o lê.
+
+Com o rastreamento ligado (begin_run(trace=True)), span() registra eventos
+com duração (buscas, cache, transformações, construção de figuras) no
+formato do Chrome Trace (chrome://tracing, Perfetto). Threads auxiliares
+entram no mesmo rastro com attach(current()).
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+_local = threading.local()
+
+
+def peak_rss_mb():
+    """Pico de memória residente do processo em MB (None se indisponível)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS em bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def rss_mb():
+    """Memória residente atual do processo em MB (None fora do Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def begin_run(trace: bool = False) -> dict:
+    """Inicia o relatório da execução atual do script e o retorna.
+
+    Com trace=True os spans desta execução passam a ser guardados (ver events()).
+    """
+    _local.report = {}
+    _local.section = None
+    _local.trace = [] if trace else None
+    _local.stack = []
+    return _local.report
+
+
+def current():
+    """Estado de rastreamento da thread atual, para repassar a threads auxiliares."""
+    return getattr(_local, "report", None), getattr(_local, "trace", None)
+
+
+def attach(state) -> None:
+    """Faz a thread atual registrar no rastro de outra (ver current())."""
+    _local.report, _local.trace = state
+    _local.section = None
+    _local.stack = []
+
+
+def tracing() -> bool:
+    """Indica se a thread atual está registrando spans."""
+    return getattr(_local, "trace", None) is not None
+
+
+def events() -> list:
+    """Eventos registrados até agora na execução atual (vazio sem rastreamento)."""
+    return list(getattr(_local, "trace", None) or [])
+
+
+@contextmanager
+def span(name: str, category: str = "app", **args):
+    """Registra a duração do bloco como um evento do rastro.
+
+    Devolve o dicionário de argumentos do evento, que o bloco pode completar
+    (linhas, bytes, acerto de cache...). Sem rastreamento ativo não mede nada.
+    """
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        yield args
+        return
+    _local.stack.append(args)
+    start = time.perf_counter()
+    start_us = time.time() * 1e6
+    try:
+        yield args
+    finally:
+        _local.stack.pop()
+        trace.append({
+            "name": name, "cat": category, "ph": "X",
+            "ts": start_us, "dur": (time.perf_counter() - start) * 1e6,
+            "pid": os.getpid(), "tid": threading.get_ident(), "args": args,
+        })
+
+
+def annotate(**args) -> None:
+    """Acrescenta argumentos ao span aberto mais interno desta thread."""
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1].update(args)
+
+
+def summary(trace: list) -> list:
+    """Totais por categoria: eventos, tempo, linhas, bytes e acertos/faltas de cache."""
+    totals = {}
+    for event in trace:
+        entry = totals.setdefault(event["cat"], {
+            "categoria": event["cat"], "eventos": 0, "ms": 0.0, "linhas": 0, "bytes": 0, "hits": 0, "misses": 0,
+        })
+        entry["eventos"] += 1
+        entry["ms"] += event["dur"] / 1000
+        entry["linhas"] += event["args"].get("rows", 0)
+        entry["bytes"] += event["args"].get("bytes", 0)
+        cache = event["args"].get("cache")
+        if cache in ("hit", "miss"):
+            entry["hits" if cache == "hit" else "misses"] += 1
+    return sorted(totals.values(), key=lambda e: -e["ms"])
+
+
+def to_chrome_trace(trace: list) -> str:
+    """Serializa o rastro no formato JSON do Chrome Trace."""
+    return json.dumps({"traceEvents": trace, "displayTimeUnit": "ms"}, default=str)
+
+
+def touch(rows: int) -> None:
+    """Soma linhas lidas à seção em andamento (fora de uma seção, não faz nada)."""
+    section = getattr(_local, "section", None)
+    if section is not None:
+        section["rows"] += rows
+
+
+@contextmanager
+def section(name: str):
+    """Mede o bloco: segundos, linhas lidas e variação da memória residente (MB)."""
+    report = getattr(_local, "report", None)
+    if report is None:
+        report = begin_run()
+    entry = {"seconds": 0.0, "rows": 0}
+    previous = getattr(_local, "section", None)
+    _local.section = entry
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    try:
+        with span(name, "section"):
+            yield entry
+    finally:
+        # Também registra seções interrompidas por st.stop()
+        entry["seconds"] = time.perf_counter() - start
+        rss_after = rss_mb()
+        entry["rss_delta_mb"] = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        report[name] = entry
+        _local.section = previous
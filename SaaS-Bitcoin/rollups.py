@@ -0,0 +1,95 @@
+"""Agregados OHLC em várias resoluções (1 minuto, 1 hora, 1 dia).
+
+Para cada coluna numérica a tabela agregada guarda abertura, máxima, mínima,
+fechamento e soma do balde (colunas '<col>_open', '<col>_high', '<col>_low',
+'<col>_close', '<col>_sum') e uma coluna 'count' com o número de linhas. Como
+todos esses valores se combinam entre baldes, os agregados são atualizados
+de forma incremental quando chegam linhas novas, sem reprocessar o histórico.
+"""
+import numpy as np
+import pandas as pd
+
+
+# Resoluções da mais fina para a mais grossa (frequências do pandas)
+RESOLUTIONS = ["1min", "1h", "1D"]
+# Número mínimo de pontos que um gráfico deve ter na resolução escolhida
+MIN_POINTS = 150
+
+_STATS = {"open": "first", "high": "max", "low": "min", "close": "last", "sum": "sum"}
+
+
+def build(df: pd.DataFrame, resolution: str, column: str = "timestamp") -> pd.DataFrame:
+    """Agrega as linhas brutas em baldes da resolução dada (índice = início do balde)."""
+    values = [c for c in df.columns if c != column and pd.api.types.is_numeric_dtype(df[c])]
+    if df.empty or column not in df.columns:
+        return pd.DataFrame(columns=[f"{c}_{s}" for c in values for s in _STATS] + ["count"])
+    buckets = df[column].dt.floor(resolution).rename(column)
+    # Agregados sempre em float64, mesmo para colunas guardadas em float32
+    grouped = df[values].astype(np.float64, copy=False).groupby(buckets, sort=True)
+    out = grouped.agg(list(_STATS.values()))
+    out.columns = [f"{c}_{s}" for c in values for s in _STATS]
+    out["count"] = grouped.size()
+    return out
+
+
+def combine(left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
+    """Une dois agregados consecutivos ('left' mais antigo), fundindo o balde em comum."""
+    if left.empty:
+        return right
+    if right.empty:
+        return left
+    if left.index[-1] != right.index[0]:
+        return pd.concat([left, right])
+    a, b = left.iloc[-1], right.iloc[0]
+    merged = b.copy()
+    for name in left.columns:
+        if name.endswith("_open"):
+            merged[name] = a[name] if pd.notna(a[name]) else b[name]
+        elif name.endswith("_close"):
+            merged[name] = b[name] if pd.notna(b[name]) else a[name]
+        elif name.endswith("_high"):
+            merged[name] = np.fmax(a[name], b[name])
+        elif name.endswith("_low"):
+            merged[name] = np.fmin(a[name], b[name])
+        elif name.endswith("_sum") or name == "count":
+            merged[name] = a[name] + b[name]
+    out = pd.concat([left.iloc[:-1], merged.to_frame().T.astype(left.dtypes), right.iloc[1:]])
+    out.index.name = left.index.name
+    return out
+
+
+def build_all(df: pd.DataFrame, column: str = "timestamp") -> dict:
+    """Agregados de todas as resoluções para um DataFrame bruto."""
+    return {resolution: build(df, resolution, column) for resolution in RESOLUTIONS}
+
+
+def update_all(rollups: dict, df_new: pd.DataFrame, column: str = "timestamp", older: bool = False) -> dict:
+    """Incorpora linhas novas (ou, com older=True, um trecho mais antigo) aos agregados."""
+    updated = {}
+    for resolution, current in rollups.items():
+        delta = build(df_new, resolution, column)
+        updated[resolution] = combine(delta, current) if older else combine(current, delta)
+    return updated
+
+
+def pick_resolution(start, end, min_points: int = MIN_POINTS) -> str:
+    """Resolução mais grossa que ainda dá pelo menos 'min_points' pontos na janela."""
+    if start is None:
+        return RESOLUTIONS[-1]
+    span = pd.Timestamp(end) - pd.Timestamp(start)
+    for resolution in reversed(RESOLUTIONS):
+        if span / pd.Timedelta(resolution) >= min_points:
+            return resolution
+    return RESOLUTIONS[0]
+
+
+def to_frame(rollup: pd.DataFrame, stat: str = "close", column: str = "timestamp") -> pd.DataFrame:
+    """Converte o agregado em colunas com os nomes originais ('mean' = soma / contagem)."""
+    values = [c[:-len("_close")] for c in rollup.columns if c.endswith("_close")]
+    data = {column: rollup.index}
+    for c in values:
+        if stat == "mean":
+            data[c] = (rollup[f"{c}_sum"] / rollup["count"]).to_numpy()
+        else:
+            data[c] = rollup[f"{c}_{stat}"].to_numpy()
+    return pd.DataFrame(data)
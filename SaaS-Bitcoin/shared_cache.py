@@ -0,0 +1,192 @@
+"""Cache de DataFrames compartilhado entre réplicas do app (Arrow IPC em disco).
+
+O st.cache_data vale só dentro de um processo: com várias réplicas atrás de um
+balanceador, cada uma buscaria e transformaria as mesmas tabelas. Aqui cada
+entrada é um arquivo Arrow IPC num diretório comum (volume compartilhado ou
+disco local do host), lida por qualquer réplica. Cada leitura converte a entrada
+inteira para pandas (uma cópia), então as entradas devem ser os recortes já
+prontos para uso, não tabelas das quais se usa só uma parte:
+
+- a chave é o hash das partes informadas (função, tabela, janela, esquema...)
+  mais FORMAT_VERSION, então uma mudança de formato não lê entradas antigas;
+- cada entrada guarda o instante de gravação e o TTL; expirada, vira falta e
+  é apagada na próxima varredura (no máximo uma a cada SWEEP_INTERVAL, marcada
+  pela data de modificação de um arquivo '.sweep' no diretório);
+- numa falta só uma réplica carrega (arquivo de lock criado com O_EXCL); as
+  demais esperam a entrada aparecer e a leem, de modo que a origem recebe uma
+  consulta por TTL, não uma por réplica.
+
+Outro armazenamento (ex.: um servidor chave-valor) pode ser usado passando ao
+SharedCache um objeto com os métodos de ArrowDirectory (read/write/lock/unlock/sweep).
+
+Configuração: SAAS_BTC_SHARED_CACHE=<diretório> ou, no secrets.toml,
+[shared_cache] path = "..." e ttl = 600.
+"""
+import hashlib
+import logging
+import os
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+import perf
+
+
+FORMAT_VERSION = 1
+DEFAULT_TTL = 600
+# Espera máxima (s) pela carga feita por outra réplica antes de carregar por conta própria
+LOCK_WAIT = 30
+# Um lock mais velho que isto pertence a uma réplica que morreu no meio da carga
+LOCK_STALE = 120
+POLL_INTERVAL = 0.1
+# Intervalo mínimo (s) entre varreduras: cada uma abre todas as entradas do diretório
+SWEEP_INTERVAL = 300
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(*parts) -> str:
+    """Chave estável (entre processos) para as partes informadas."""
+    text = repr((FORMAT_VERSION,) + parts)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class ArrowDirectory:
+    """Entradas Arrow IPC num diretório; os metadados do esquema levam gravação e TTL."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key: str, suffix: str = ".arrow") -> str:
+        return os.path.join(self.path, key + suffix)
+
+    @staticmethod
+    def _expired(reader) -> bool:
+        meta = reader.schema.metadata or {}
+        return time.time() - float(meta.get(b"written", 0)) > float(meta.get(b"ttl", 0))
+
+    def read(self, key: str):
+        """DataFrame da entrada (convertido por inteiro), ou None se não existir ou tiver expirado."""
+        try:
+            with pa.memory_map(self._file(key), "r") as source:
+                reader = pa.ipc.open_file(source)
+                if self._expired(reader):
+                    return None
+                return reader.read_all().to_pandas()
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+
+    def write(self, key: str, df: pd.DataFrame, ttl: float) -> None:
+        table = pa.Table.from_pandas(df)
+        meta = dict(table.schema.metadata or {})
+        meta.update({b"written": str(time.time()).encode(), b"ttl": str(ttl).encode()})
+        table = table.replace_schema_metadata(meta)
+        target = self._file(key)
+        # Grava num temporário e troca de uma vez: leitores nunca veem arquivo pela metade
+        temporary = f"{target}.{os.getpid()}.tmp"
+        with pa.OSFile(temporary, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temporary, target)
+
+    def lock(self, key: str) -> bool:
+        """Tenta ser a réplica que carrega a entrada; False se outra já está carregando."""
+        path = self._file(key, ".lock")
+        try:
+            if time.time() - os.path.getmtime(path) > LOCK_STALE:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    def unlock(self, key: str) -> None:
+        try:
+            os.remove(self._file(key, ".lock"))
+        except FileNotFoundError:
+            pass
+
+    def sweep(self) -> None:
+        """Apaga as entradas expiradas, se nenhuma réplica varreu nos últimos SWEEP_INTERVAL segundos."""
+        stamp = self._file("", ".sweep")
+        try:
+            if time.time() - os.path.getmtime(stamp) < SWEEP_INTERVAL:
+                return
+        except FileNotFoundError:
+            pass
+        with open(stamp, "a"):
+            os.utime(stamp)
+        for name in os.listdir(self.path):
+            if not name.endswith(".arrow"):
+                continue
+            path = os.path.join(self.path, name)
+            try:
+                # Só o esquema é lido: os dados da entrada não são materializados
+                with pa.memory_map(path, "r") as source:
+                    expired = self._expired(pa.ipc.open_file(source))
+                if expired:
+                    os.remove(path)
+            except (OSError, pa.ArrowInvalid):
+                pass
+
+
+class SharedCache:
+    """get_or_load() com TTL e carga única entre réplicas."""
+
+    def __init__(self, storage, ttl: float = DEFAULT_TTL):
+        self.storage = storage
+        self.ttl = ttl
+
+    def get_or_load(self, parts: tuple, load, ttl: float = None) -> pd.DataFrame:
+        """Entrada das 'parts', carregada com 'load()' (por uma só réplica) se faltar ou expirar."""
+        key = make_key(*parts)
+        ttl = self.ttl if ttl is None else ttl
+        with perf.span(f"compartilhado {parts[0]}", "cache", cache="hit") as args:
+            df = self.storage.read(key)
+            if df is not None:
+                args["rows"] = len(df)
+                return df
+            args["cache"] = "miss"
+            deadline = time.monotonic() + LOCK_WAIT
+            owner = self.storage.lock(key)
+            while not owner:
+                # Outra réplica está carregando: espera a entrada dela
+                time.sleep(POLL_INTERVAL)
+                df = self.storage.read(key)
+                if df is not None:
+                    args.update(cache="wait", rows=len(df))
+                    return df
+                if time.monotonic() > deadline:
+                    break
+                owner = self.storage.lock(key)
+            try:
+                # Outra réplica pode ter gravado a entrada entre a leitura e o lock
+                df = self.storage.read(key) if owner else None
+                if df is None:
+                    df = load()
+                    # Frames vazios (tabela vazia ou erro na carga) não são espalhados pelas réplicas
+                    if not df.empty:
+                        try:
+                            self.storage.write(key, df, ttl)
+                            self.storage.sweep()
+                        except Exception as e:
+                            # Falha no compartilhamento não impede o app de usar o resultado
+                            logger.warning("Falha ao gravar cache compartilhado de %s: %s", parts[0], e)
+                args["rows"] = len(df)
+                return df
+            finally:
+                if owner:
+                    self.storage.unlock(key)
+
+
+def from_config(path: str = None, ttl: float = DEFAULT_TTL):
+    """SharedCache no diretório SAAS_BTC_SHARED_CACHE (ou 'path'); None se não configurado."""
+    path = os.environ.get("SAAS_BTC_SHARED_CACHE") or path
+    if not path:
+        return None
+    return SharedCache(ArrowDirectory(path), ttl=ttl)
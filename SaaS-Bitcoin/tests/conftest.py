@@ -0,0 +1,54 @@
+"""Configuração comum dos testes: módulos do app importáveis e cache em disco temporário."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_sync  # noqa: E402
+import disk_cache  # noqa: E402
+
+
+class FrameClient:
+    """Origem em memória com a interface de pg_backend.PostgresClient (fetch_frame)."""
+
+    def __init__(self, tables: dict, source_id: str = "memória"):
+        self.tables = tables
+        self.source_id = source_id
+
+    def fetch_frame(self, table_name, columns=None, column=None, desc=False, limit=None, **filters):
+        df = self.tables[table_name]
+        for name, value in filters.items():
+            if value is None:
+                continue
+            value = pd.Timestamp(value)
+            times = df[column]
+            mask = {"gte": times >= value, "gt": times > value, "lt": times < value, "lte": times <= value}[name]
+            df = df[mask]
+        df = df.sort_values(column, ascending=not desc)
+        if limit is not None:
+            df = df.head(limit)
+        return df[list(columns)].reset_index(drop=True) if columns else df.reset_index(drop=True)
+
+
+def price_frame(start: str, periods: int, seed: int = 0) -> pd.DataFrame:
+    """prices_btc sintética: um preço por minuto."""
+    rng = np.random.default_rng(seed)
+    price = 60000 * np.exp(np.cumsum(rng.normal(0, 0.001, periods)))
+    return pd.DataFrame({
+        "timestamp": pd.date_range(start, periods=periods, freq="1min", tz="UTC"),
+        "price_usd": price,
+        "price_brl": price * 5,
+    })
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """Cada teste com o próprio diretório de cache e sem estado sincronizado em memória."""
+    monkeypatch.setattr(disk_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    data_sync.reset()
+    yield
+    data_sync.reset()
@@ -0,0 +1,43 @@
+import types
+
+import pandas as pd
+import pytest
+
+import data_sync
+
+
+class PagedQuery:
+    """Consulta do PostgREST com limite de linhas por resposta e contagem opcional."""
+
+    def __init__(self, rows: list, count, max_rows: int, requests: list):
+        self.rows = rows
+        self.count = count
+        self.max_rows = max_rows
+        self.requests = requests
+        self.bounds = (0, len(rows) - 1)
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def execute(self):
+        start, end = self.bounds
+        self.requests.append(start)
+        data = self.rows[start:min(end + 1, start + self.max_rows)]
+        return types.SimpleNamespace(data=data, count=len(self.rows) if self.count else None)
+
+
+def _rows(n: int) -> list:
+    start = pd.Timestamp("2026-01-01", tz="UTC")
+    return [{"timestamp": (start + pd.Timedelta(minutes=i)).isoformat(), "price_usd": float(i)} for i in range(n)]
+
+
+@pytest.mark.parametrize("count", [True, False])
+@pytest.mark.parametrize("n, max_rows", [(2500, 1000), (2000, 1000), (2300, 400), (300, 1000), (0, 1000)])
+def test_fetch_paginated_returns_every_row(count, n, max_rows):
+    rows, requests = _rows(n), []
+    df = data_sync.fetch_paginated(lambda **_: PagedQuery(rows, count, max_rows, requests),
+                                   page_size=1000)
+    assert len(df) == n
+    if n:
+        assert df["price_usd"].tolist() == [float(i) for i in range(n)]
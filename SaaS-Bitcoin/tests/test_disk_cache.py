@@ -0,0 +1,69 @@
+import pandas as pd
+
+import data_sync
+import disk_cache
+from conftest import FrameClient, price_frame
+
+
+COLUMNS = data_sync.TABLE_COLUMNS["prices_btc"]
+
+
+def _as_process(state: dict):
+    """Troca o estado em memória de data_sync, como se fosse outro processo do app."""
+    data_sync._store.clear()
+    data_sync._store.update(state)
+
+
+def test_two_writers_do_not_duplicate_deltas():
+    prices = price_frame("2026-01-01", 120)
+    client = FrameClient({"prices_btc": prices})
+
+    # Dois processos partem do mesmo histórico
+    data_sync.sync_table(client, "prices_btc", columns=COLUMNS)
+    first = dict(data_sync._store)
+    _as_process({})
+    data_sync.sync_table(client, "prices_btc", columns=COLUMNS)
+    second = dict(data_sync._store)
+
+    # Chegam linhas novas e os dois anexam o mesmo delta
+    client.tables["prices_btc"] = pd.concat([prices, price_frame("2026-01-01 02:00", 30, seed=1)],
+                                            ignore_index=True)
+    _as_process(first)
+    data_sync.sync_table(client, "prices_btc", columns=COLUMNS)
+    _as_process(second)
+    data_sync.sync_table(client, "prices_btc", columns=COLUMNS)
+
+    # Reinício: só o disco
+    _as_process({})
+    df, _, _ = disk_cache.load(("prices_btc", tuple(COLUMNS), client.source_id), "timestamp")
+    full = client.fetch_frame("prices_btc", COLUMNS, "timestamp")
+    assert len(df) == len(full)
+    assert not df["timestamp"].duplicated().any()
+    reloaded = data_sync.sync_table(client, "prices_btc", columns=COLUMNS)
+    assert len(reloaded) == len(full)
+
+
+def test_load_skips_segments_already_applied_and_duplicate_times():
+    key = ("prices_btc", tuple(COLUMNS), "memória")
+    prices = price_frame("2026-01-01", 60)
+    watermark = prices["timestamp"].max().isoformat()
+    disk_cache.save(key, prices, None, watermark)
+    # Segmentos gravados sem lock por versões antigas: um repetido e um parcialmente sobreposto
+    path = disk_cache._key_dir(key)
+    disk_cache._write_segment(path, 1, prices.tail(10))
+    disk_cache._write_segment(path, 2, pd.concat([prices.tail(5), price_frame("2026-01-01 01:00", 5, seed=2)]))
+
+    df, _, _ = disk_cache.load(key, "timestamp")
+    assert len(df) == 65
+    assert df["timestamp"].is_monotonic_increasing and not df["timestamp"].duplicated().any()
+
+
+def test_sources_do_not_share_the_disk_cache():
+    old = FrameClient({"prices_btc": price_frame("2026-01-01", 60)}, source_id="postgres:a:5432/db/public")
+    new = FrameClient({"prices_btc": price_frame("2025-12-01", 90, seed=3)}, source_id="supabase:https://b")
+    data_sync.sync_table(old, "prices_btc", columns=COLUMNS)
+
+    # Reinício com outro backend: nada do histórico nem da watermark do anterior
+    _as_process({})
+    df = data_sync.sync_table(new, "prices_btc", columns=COLUMNS)
+    pd.testing.assert_frame_equal(df, data_sync.apply_schema(new.tables["prices_btc"], "prices_btc"))
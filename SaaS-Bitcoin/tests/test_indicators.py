@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+import indicators
+import rollups
+from conftest import price_frame
+
+
+def _bars(prices: pd.DataFrame, start) -> pd.DataFrame:
+    return rollups.build(prices, "5min").loc[start:]
+
+
+def test_period_values_do_not_depend_on_the_period_opened_before():
+    prices = price_frame("2026-01-01", 6000, seed=4)
+    start_a, start_b = pd.Timestamp("2026-01-01 06:00", tz="UTC"), pd.Timestamp("2026-01-02 12:00", tz="UTC")
+    key = ("prices_btc", "5min")
+
+    indicators.reset()
+    indicators.compute(key, _bars(prices, start_a), "price_usd", "5min")
+    after_a = indicators.compute(key, _bars(prices, start_b), "price_usd", "5min")
+
+    indicators.reset()
+    alone = indicators.compute(key, _bars(prices, start_b), "price_usd", "5min")
+    pd.testing.assert_frame_equal(after_a, alone)
+
+
+def test_incremental_update_matches_a_fresh_computation():
+    prices = price_frame("2026-01-01", 3000, seed=5)
+    key = ("prices_btc", "5min")
+    indicators.reset()
+    for end in range(1000, 3001, 250):
+        incremental = indicators.compute(key, _bars(prices.iloc[:end], None), "price_usd", "5min")
+    bars = _bars(prices, None)
+    fresh = indicators.IndicatorSet(365 * 288).update(
+        bars.index, bars["price_usd_high"], bars["price_usd_low"], bars["price_usd_close"]
+    )
+    assert np.allclose(incremental.to_numpy(), fresh.to_numpy(), equal_nan=True)
+    pd.testing.assert_index_equal(incremental.index, fresh.index)
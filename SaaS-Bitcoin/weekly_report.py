@@ -0,0 +1,326 @@
+"""Relatório semanal em PDF (aba "Relatório Semanal").
+
+Em vez de abrir um Kaleido/Chromium novo para cada gráfico:
+
+- um único renderizador Kaleido fica aberto no processo (um Chromium com
+  várias abas) e atende todos os relatórios de todas as sessões;
+- os gráficos do relatório são renderizados num lote só, em paralelo nas abas;
+- as imagens ficam em cache pela chave do gráfico (id, versão dos dados e
+  período, a mesma do cached_figure do app): sem dados novos nada é
+  renderizado de novo;
+- a montagem roda numa thread de fundo; o painel só acompanha o progresso.
+
+O HTML é convertido em PDF pelo pdfkit, que exige o wkhtmltopdf instalado no
+sistema; sem ele o relatório é entregue em HTML, com as imagens embutidas. O
+Kaleido (v1) exige um Chrome/Chromium no host: se a renderização falhar, os
+gráficos que não saíram viram o aviso de "indisponível" no relatório.
+"""
+import asyncio
+import base64
+import html
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pandas as pd
+
+
+# Abas do Chromium usadas em paralelo no lote de gráficos
+RENDER_TABS = 4
+# Tamanho das imagens no PDF (px) e fator de escala
+IMAGE_OPTIONS = {"format": "png", "width": 900, "height": 350, "scale": 2}
+IMAGE_CACHE_SIZE = 64
+# Relatórios prontos guardados (um por versão dos dados)
+JOB_CACHE_SIZE = 8
+# Títulos dos gráficos, na ordem do relatório
+FIGURE_TITLES = {
+    "price": "Preço BTC",
+    "dom": "Dominância BTC",
+    "vol": "Volume de Mercado",
+}
+
+logger = logging.getLogger(__name__)
+
+
+# --- FORMATAÇÃO ---
+def _safe_val(df: pd.DataFrame, col: str):
+    """Último valor não nulo de uma coluna do DataFrame (None se não houver)."""
+    if df is None or df.empty or col not in df.columns:
+        return None
+    values = pd.to_numeric(df[col], errors="coerce").dropna()
+    return float(values.iloc[-1]) if not values.empty else None
+
+
+def fmt_money(value) -> str:
+    """Formata como dinheiro (ex: $57,250.00)."""
+    return "N/A" if value is None else f"${value:,.2f}"
+
+
+def fmt_money_trillion(value) -> str:
+    """Formata grandes valores em trilhões (ex: $2.35 T)."""
+    return "N/A" if value is None else f"${value / 1e12:.2f} T"
+
+
+def fmt_percent(value) -> str:
+    """Formata como porcentagem (ex: 57.25 %)."""
+    return "N/A" if value is None else f"{value:.2f} %"
+
+
+def fmt_delta(value, suffix: str = "") -> str:
+    """Formata como delta com sinal (ex: +1,250.00)."""
+    return "N/A" if value is None else f"{value:+,.2f}{suffix}"
+
+
+# --- RENDERIZAÇÃO ---
+class Renderer:
+    """Kaleido persistente: o Chromium é aberto uma vez e reaproveitado.
+
+    O Kaleido é assíncrono; um laço asyncio próprio, numa thread de fundo,
+    mantém o navegador vivo entre os relatórios. render() pode ser chamado de
+    qualquer thread e bloqueia só quem chamou.
+    """
+
+    def __init__(self, tabs: int = RENDER_TABS):
+        self.tabs = tabs
+        self._kaleido = None
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="kaleido", daemon=True).start()
+
+    async def _open(self):
+        if self._kaleido is None:
+            try:
+                import kaleido
+            except ImportError as e:
+                raise RuntimeError("Kaleido não instalado. Tente: pip install -U kaleido") from e
+            browser = kaleido.Kaleido(n=self.tabs)
+            await browser.open()
+            self._kaleido = browser
+        return self._kaleido
+
+    async def _render(self, figures: list, options: dict) -> list:
+        browser = await self._open()
+        try:
+            return await asyncio.gather(*(browser.calc_fig(fig, opts=dict(options)) for fig in figures))
+        except Exception:
+            # Navegador em estado incerto (ex: Chromium encerrado): reabre no próximo lote
+            self._kaleido = None
+            await browser.close()
+            raise
+
+    def render(self, figures: list, **options) -> list:
+        """PNGs (bytes) das figuras Plotly, renderizadas num único lote."""
+        if not figures:
+            return []
+        future = asyncio.run_coroutine_threadsafe(self._render(list(figures), {**IMAGE_OPTIONS, **options}), self._loop)
+        return future.result()
+
+    def close(self) -> None:
+        if self._kaleido is not None:
+            browser, self._kaleido = self._kaleido, None
+            asyncio.run_coroutine_threadsafe(browser.close(), self._loop).result()
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+_images = OrderedDict()
+_images_lock = threading.Lock()
+
+
+def get_renderer() -> Renderer:
+    """Renderizador compartilhado pelo processo (criado no primeiro relatório)."""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = Renderer()
+        return _renderer
+
+
+def render_images(figures: dict, progress=None) -> dict:
+    """{nome: PNG} para {nome: (chave, figura)}; só as chaves fora do cache são renderizadas.
+
+    Gráficos que o renderizador não consegue gerar (ex.: Kaleido sem Chrome no
+    host) ficam fora do resultado, e build_html mostra o aviso no lugar deles.
+    """
+    images, missing = {}, {}
+    with _images_lock:
+        for name, (key, fig) in figures.items():
+            if key in _images:
+                _images.move_to_end(key)
+                images[name] = _images[key]
+            elif fig is not None:
+                missing[name] = (key, fig)
+    if progress:
+        progress(0.1, f"Renderizando {len(missing)} de {len(figures)} gráficos")
+    if not missing:
+        return images
+    renderer = get_renderer()
+    try:
+        rendered = dict(zip(missing, renderer.render([fig for _, fig in missing.values()])))
+    except Exception as e:
+        # Lote falhou: tenta gráfico a gráfico e deixa de fora os que não renderizam
+        logger.warning("Falha ao renderizar o lote de gráficos do relatório: %s", e)
+        rendered = {}
+        for name, (_, fig) in missing.items():
+            try:
+                rendered[name] = renderer.render([fig])[0]
+            except Exception as e:
+                logger.warning("Gráfico '%s' indisponível no relatório: %s", name, e)
+    with _images_lock:
+        for name, png in rendered.items():
+            images[name] = _images[missing[name][0]] = png
+        while len(_images) > IMAGE_CACHE_SIZE:
+            _images.popitem(last=False)
+    return images
+
+
+# --- MONTAGEM ---
+STYLE = """
+body { font-family: 'Inter', Arial, sans-serif; color: #2c3e50; background: #f8f9fa; margin: 0; }
+.container { max-width: 900px; margin: 20px auto; padding: 30px; background: #ffffff; border-radius: 12px; }
+h1 { text-align: center; border-bottom: 3px solid #ffd700; padding-bottom: 12px; }
+.section { margin-top: 35px; }
+.cards { display: flex; flex-wrap: wrap; gap: 20px; }
+.card { flex: 1 1 200px; border: 1px solid #e0e0e0; border-left: 6px solid #f39c12; border-radius: 10px; padding: 18px; }
+.card h3 { margin: 0 0 10px; font-size: 13px; text-transform: uppercase; letter-spacing: 0.5px; color: #6c757d; }
+.card p { margin: 0; font-size: 22px; font-weight: 700; }
+.card p:last-child { margin-top: 5px; font-size: 13px; font-weight: normal; }
+.graph-container { margin-bottom: 30px; text-align: center; }
+.graph-container img { width: 100%; height: auto; }
+.graph-unavailable { padding: 15px; background: #fff0f0; border-radius: 8px; color: #e74c3c; }
+.news-item { border-bottom: 1px dashed #ced4da; padding: 10px 0; }
+.news-item a { color: #2c3e50; text-decoration: none; font-weight: 600; }
+.footer { margin-top: 40px; border-top: 1px dashed #adb5bd; padding-top: 15px; text-align: center; font-size: 12px; color: #6c757d; }
+"""
+
+
+def _card(title: str, value: str, detail: str) -> str:
+    return f"<div class='card'><h3>{title}</h3><p>{value}</p><p>{detail}</p></div>"
+
+
+def build_html(df_btc, df_global, df_sentiment, df_news, images: dict) -> str:
+    """HTML do relatório, espelhando a aba "Relatório Semanal"."""
+    last_btc = _safe_val(df_btc, "price_usd")
+    first_btc = None if df_btc is None or df_btc.empty else _safe_val(df_btc.head(1), "price_usd")
+    delta_btc = None if last_btc is None or first_btc is None else last_btc - first_btc
+    cards = [
+        _card("Preço BTC", fmt_money(last_btc), f"Variação no período: {fmt_delta(delta_btc)}"),
+        _card("Market Cap Global", fmt_money_trillion(_safe_val(df_global, "total_market_cap")),
+              "Valor total do mercado"),
+        _card("Dominância BTC", fmt_percent(_safe_val(df_global, "btc_dominance")), "Peso do Bitcoin no mercado"),
+    ]
+    if df_sentiment is not None and not df_sentiment.empty:
+        last = df_sentiment.iloc[-1]
+        cards.append(_card("Fear & Greed", f"{last['fear_greed_index']:.0f}", html.escape(str(last["sentiment_text"]))))
+
+    graphs = []
+    for name, title in FIGURE_TITLES.items():
+        if name in images:
+            encoded = base64.b64encode(images[name]).decode("ascii")
+            body = f"<img src='data:image/png;base64,{encoded}'>"
+        else:
+            body = f"<div class='graph-unavailable'>Gráfico de {title} indisponível.</div>"
+        graphs.append(f"<div class='graph-container'><h3 class='graph-title'>{title}</h3>{body}</div>")
+
+    news = []
+    if df_news is not None and not df_news.empty:
+        for _, row in df_news.head(5).iterrows():
+            date = row["date"].strftime("%d/%m/%Y") if pd.notna(row["date"]) else "Data N/A"
+            news.append(
+                f"<div class='news-item'><b>{html.escape(str(row['source']).upper())}</b> · {date}<br>"
+                f"<a href='{html.escape(str(row['link']))}'>{html.escape(str(row['headline']))}</a></div>"
+            )
+    if not news:
+        news.append("<p>Nenhuma notícia disponível.</p>")
+
+    generated = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<style>{STYLE}</style></head><body><div class='container'>"
+        "<h1>Relatório de Mercado Cripto</h1>"
+        f"<div class='section'><h2>Métricas</h2><div class='cards'>{''.join(cards)}</div></div>"
+        f"<div class='section'><h2>Análise Gráfica</h2>{''.join(graphs)}</div>"
+        f"<div class='section'><h2>Últimas Notícias</h2>{''.join(news)}</div>"
+        f"<div class='footer'>Gerado em: {generated}. Todas as métricas em UTC.</div>"
+        "</div></body></html>"
+    )
+
+
+def to_pdf(document: str):
+    """PDF do HTML via pdfkit/wkhtmltopdf, ou None se não estiverem instalados."""
+    try:
+        import pdfkit
+        return pdfkit.from_string(document, False, options={"encoding": "UTF-8", "page-size": "A4", "quiet": ""})
+    except (ImportError, OSError):
+        return None
+
+
+# --- EXECUÇÃO EM SEGUNDO PLANO ---
+class ReportJob:
+    """Estado de um relatório em montagem, lido pelo painel a cada atualização."""
+
+    def __init__(self, key):
+        self.key = key
+        self.progress = 0.0
+        self.stage = "Na fila"
+        self.content = None
+        self.mime = None
+        self.extension = None
+        self.error = None
+        self.finished = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.finished.is_set()
+
+    def update(self, progress: float, stage: str) -> None:
+        self.progress, self.stage = progress, stage
+
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="relatorio")
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def _run(job: ReportJob, frames: dict, figures: dict) -> None:
+    try:
+        images = render_images(figures, progress=job.update)
+        job.update(0.7, "Montando o relatório")
+        document = build_html(frames.get("btc"), frames.get("global"), frames.get("sentiment"),
+                              frames.get("news"), images)
+        job.update(0.85, "Gerando o PDF")
+        pdf = to_pdf(document)
+        if pdf is not None:
+            job.content, job.mime, job.extension = pdf, "application/pdf", "pdf"
+        else:
+            job.content, job.mime, job.extension = document.encode("utf-8"), "text/html", "html"
+        job.update(1.0, "Concluído")
+    except Exception as e:
+        job.error = str(e)
+        with _jobs_lock:
+            # Falhas não ficam em cache: um novo pedido tenta de novo
+            if _jobs.get(job.key) is job:
+                del _jobs[job.key]
+    finally:
+        job.finished.set()
+
+
+def submit(key, frames: dict, figures: dict) -> ReportJob:
+    """Agenda o relatório e retorna seu ReportJob sem esperar a montagem.
+
+    'key' identifica a versão dos dados: um pedido com a mesma chave devolve
+    o relatório já pronto (ou em andamento), de qualquer sessão. 'frames' tem
+    os DataFrames btc/global/sentiment/news; 'figures' é {nome: (chave da
+    imagem, figura Plotly)}, com nomes de FIGURE_TITLES.
+    """
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is not None:
+            _jobs.move_to_end(key)
+            return job
+        job = _jobs[key] = ReportJob(key)
+        while len(_jobs) > JOB_CACHE_SIZE:
+            _jobs.popitem(last=False)
+    _executor.submit(_run, job, frames, figures)
+    return job